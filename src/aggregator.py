@@ -1,49 +1,171 @@
 import pandas as pd
-import os
+import numpy as np
+from colunar import ler_consolidado, ler_consolidado_em_lotes
+from validator import DataValidator
+from instrumentacao import etapa, anotar, salvar_relatorio
+from comandos import parser_aggregator
 
 INPUT_FILE = "data/consolidado.csv"
 OUTPUT_FILE = "data/despesas_agregadas.csv"
+CHAVES = ['RAZAO_SOCIAL', 'UF']
+TAMANHO_LOTE = 100000
 
-def gerar_agregacao():
-    print("--- Iniciando Agregação de Despesas (Item 2.3) ---")
-    
-    if not os.path.exists(INPUT_FILE):
-        print(f"[ERRO] Arquivo {INPUT_FILE} não encontrado. Rode o processor.py primeiro.")
-        return
-
-    # Lê o consolidado.csv
-    df = pd.read_csv(INPUT_FILE, sep=';', encoding='utf-8')
-    
+def _filtrar_validos(df):
     # Validação simples - remove linhas sem RAZAO_SOCIAL
-    df = df[df['RAZAO_SOCIAL'].notna() & (df['RAZAO_SOCIAL'] != '')]
-
-    print("Calculando estatísticas por Operadora/UF...")
-    
-    # Agrupa por Razão Social e UF
-    # Calcula: Total, Média Trimestral, Desvio Padrão
-    agregado = df.groupby(['RAZAO_SOCIAL', 'UF'])['VALOR_DESPESA'].agg(
-        TOTAL_DESPESAS='sum',
-        MEDIA_TRIMESTRAL='mean',
-        DESVIO_PADRAO='std', # Item 2.3 pede desvio padrão
-        QTD_LANCAMENTOS='count'
-    ).reset_index()
+    return df[df['RAZAO_SOCIAL'].notna() & (df['RAZAO_SOCIAL'] != '')]
+
+def _validar_cnpj(df, validador, modo):
+    """Aplica a validação de CNPJ; 'marcar' vira a coluna CNPJ_INVALIDO (0/1) para somar por grupo."""
+    df, invalidos = validador.aplicar(df, modo)
+    if modo == 'marcar':
+        df['CNPJ_INVALIDO'] = (~df.pop('CNPJ_VALIDO')).astype('int64')
+    return df.drop(columns='CNPJ'), invalidos
+
+def _estado_lote(df):
+    """Estado parcial de um lote por Operadora/UF: n, soma, média e M2 (soma dos desvios²)."""
+    grupos = df.groupby(CHAVES, observed=True)['VALOR_DESPESA']
+    estado = grupos.agg(n='count', soma='sum', media='mean', var='var')
+    # var é amostral (ddof=1); M2 = var * (n - 1), e 0 para grupo de um lançamento
+    estado['m2'] = (estado.pop('var') * (estado['n'] - 1)).fillna(0.0)
+    if 'CNPJ_INVALIDO' in df:
+        estado['invalidos'] = df.groupby(CHAVES, observed=True)['CNPJ_INVALIDO'].sum()
+    # Chaves como texto comum: categorias diferentes entre lotes não atrapalham o alinhamento
+    estado.index = pd.MultiIndex.from_arrays(
+        [estado.index.get_level_values(c).astype(object) for c in CHAVES], names=CHAVES)
+    return estado
+
+def _combinar_estados(a, b):
+    """Junta dois estados parciais (fórmula de Chan para média e M2)."""
+    if a is None: return b
+    indice = a.index.union(b.index)
+    a = a.reindex(indice, fill_value=0)
+    b = b.reindex(indice, fill_value=0)
+    n = a['n'] + b['n']
+    delta = b['media'] - a['media']
+    # n > 0 sempre: todo grupo do índice veio de pelo menos um dos lados
+    estado = pd.DataFrame({
+        'n': n,
+        'soma': a['soma'] + b['soma'],
+        'media': a['media'] + delta * b['n'] / n,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['n'] * b['n'] / n,
+    }, index=indice)
+    if 'invalidos' in a:
+        estado['invalidos'] = a['invalidos'] + b['invalidos']
+    return estado
+
+def agregar_em_lotes(tamanho_lote=TAMANHO_LOTE, cnpj_invalidos=None):
+    """Agregação em uma passada, lote a lote: a memória depende do número de grupos, não de linhas.
+
+    Retorna (agregado, qtd_cnpj_invalidos), ou None se não houver consolidado.
+    """
+    estado = None
+    lidos = False
+    validador = DataValidator() if cnpj_invalidos else None
+    qtd_invalidos = 0
+    colunas = CHAVES + ['VALOR_DESPESA'] + (['CNPJ'] if validador else [])
+    for lote in ler_consolidado_em_lotes(colunas, tamanho_lote):
+        lidos = True
+        anotar(linhas_entrada=len(lote))
+        lote = _filtrar_validos(lote)
+        if validador:
+            lote, invalidos = _validar_cnpj(lote, validador, cnpj_invalidos)
+            qtd_invalidos += invalidos
+        if len(lote):
+            estado = _combinar_estados(estado, _estado_lote(lote))
+    if not lidos:
+        return None
+    if estado is None:
+        colunas_saida = ['TOTAL_DESPESAS', 'MEDIA_TRIMESTRAL', 'DESVIO_PADRAO', 'QTD_LANCAMENTOS']
+        if cnpj_invalidos == 'marcar':
+            colunas_saida.append('QTD_CNPJ_INVALIDO')
+        return pd.DataFrame(columns=CHAVES + colunas_saida), qtd_invalidos
+
+    # Mesma ordem de grupos do groupby (chaves ordenadas) antes da ordenação por total
+    estado = estado.sort_index()
+    n = estado['n'].astype('int64')
+    desvio = np.sqrt(estado['m2'].clip(lower=0) / (n - 1)).where(n > 1)
+    agregado = pd.DataFrame({
+        'TOTAL_DESPESAS': estado['soma'],
+        'MEDIA_TRIMESTRAL': estado['media'],
+        'DESVIO_PADRAO': desvio,
+        'QTD_LANCAMENTOS': n,
+    })
+    if 'invalidos' in estado:
+        agregado['QTD_CNPJ_INVALIDO'] = estado['invalidos'].astype('int64')
+    return agregado.reset_index(), qtd_invalidos
+
+def gerar_agregacao(em_lotes=False, cnpj_invalidos=None, consolidado=None, exportar=True):
+    """Gera as estatísticas por Operadora/UF e retorna o DataFrame agregado.
+
+    consolidado (DataFrame já em memória, ex.: pipeline.py) dispensa a
+    leitura do disco; com exportar=False o CSV agregado não é gravado.
+    """
+    print("--- Iniciando Agregação de Despesas (Item 2.3) ---")
+
+    if em_lotes and consolidado is None:
+        print("Calculando estatísticas por Operadora/UF (streaming, em lotes)...")
+        resultado = agregar_em_lotes(cnpj_invalidos=cnpj_invalidos)
+        if resultado is None:
+            print(f"[ERRO] Arquivo {INPUT_FILE} não encontrado. Rode o processor.py primeiro.")
+            return
+        agregado, qtd_invalidos = resultado
+    else:
+        # Lê o consolidado (Parquet se disponível), só com as colunas usadas
+        colunas = ['RAZAO_SOCIAL', 'UF', 'VALOR_DESPESA'] + (['CNPJ'] if cnpj_invalidos else [])
+        df = consolidado[colunas] if consolidado is not None else ler_consolidado(colunas)
+        if df is None:
+            print(f"[ERRO] Arquivo {INPUT_FILE} não encontrado. Rode o processor.py primeiro.")
+            return
+
+        anotar(linhas_entrada=len(df))
+        df = _filtrar_validos(df)
+        if cnpj_invalidos:
+            df, qtd_invalidos = _validar_cnpj(df, DataValidator(), cnpj_invalidos)
+
+        print("Calculando estatísticas por Operadora/UF...")
+
+        # Agrupa por Razão Social e UF
+        # Calcula: Total, Média Trimestral, Desvio Padrão
+        grupos = df.groupby(CHAVES)
+        agregado = grupos['VALOR_DESPESA'].agg(
+            TOTAL_DESPESAS='sum',
+            MEDIA_TRIMESTRAL='mean',
+            DESVIO_PADRAO='std', # Item 2.3 pede desvio padrão
+            QTD_LANCAMENTOS='count'
+        )
+        if cnpj_invalidos == 'marcar':
+            # Lançamentos do grupo com CNPJ inválido (módulo 11)
+            agregado['QTD_CNPJ_INVALIDO'] = grupos['CNPJ_INVALIDO'].sum()
+        agregado = agregado.reset_index()
+
+    if cnpj_invalidos:
+        acao = 'removidas' if cnpj_invalidos == 'remover' else 'contadas em QTD_CNPJ_INVALIDO'
+        print(f"[INFO] Linhas com CNPJ inválido (módulo 11): {qtd_invalidos} ({acao}).")
 
     # Preenche NaN no desvio padrão (caso de registro único) com 0
     agregado['DESVIO_PADRAO'] = agregado['DESVIO_PADRAO'].fillna(0)
 
     # Ordenação: Maior valor total para menor
     agregado = agregado.sort_values(by='TOTAL_DESPESAS', ascending=False)
-    
+
     # Formatação (arredondar para 2 casas)
     cols_float = ['TOTAL_DESPESAS', 'MEDIA_TRIMESTRAL', 'DESVIO_PADRAO']
     agregado[cols_float] = agregado[cols_float].round(2)
 
-    # Salva o arquivo
-    agregado.to_csv(OUTPUT_FILE, index=False, sep=';', encoding='utf-8')
-    
-    print(f"SUCESSO! Arquivo gerado: {OUTPUT_FILE}")
+    anotar(linhas_saida=len(agregado))
+    if exportar:
+        # Salva o arquivo
+        agregado.to_csv(OUTPUT_FILE, index=False, sep=';', encoding='utf-8')
+        print(f"SUCESSO! Arquivo gerado: {OUTPUT_FILE}")
     print("Top 5 Maiores Despesas:")
     print(agregado.head())
+    return agregado
+
+def cli(argv=None, prog=None):
+    args = parser_aggregator(prog).parse_args(argv)
+    with etapa('aggregator', streaming=args.streaming):
+        gerar_agregacao(em_lotes=args.streaming, cnpj_invalidos=args.cnpj)
+    salvar_relatorio('aggregator')
 
 if __name__ == "__main__":
-    gerar_agregacao()
\ No newline at end of file
+    cli()
@@ -1,68 +1,50 @@
+import re
+import sys
 import sqlite3
-import pandas as pd
+from instrumentacao import etapa, salvar_relatorio
+from schema import schema_compacto
+from consultas import DB_PATH, PARAMETROS, ConsultasAnaliticas, montar, normalizar_parametros, consultas_padrao
+from comandos import parser_analytics_queries
 
-DB_PATH = "sql/teste_ans.db"
+# UF que não existe no cadastro: com ela os relatórios filtrados têm de voltar vazios
+UF_INEXISTENTE = 'ZZ'
+# Palavras que podem seguir o nome da tabela e não são alias
+PALAVRAS_RESERVADAS = {'ON', 'WHERE', 'GROUP', 'ORDER', 'JOIN', 'LEFT', 'INNER', 'HAVING', 'LIMIT', 'USING'}
 
-def run_queries():
-    conn = sqlite3.connect(DB_PATH)
+def queries_do_banco(conn, parametros=None):
+    """Relatórios escritos para o esquema do banco (normal ou compacto): {nome: (sql, params)}."""
+    compacto = schema_compacto(conn.cursor())
+    parametros = parametros or {}
+    return {nome: montar(nome, compacto, normalizar_parametros(nome, parametros.get(nome, {})))
+            for nome in PARAMETROS}
+
+def run_queries(inicio='1T2025', fim='3T2025', limite=5, ufs=None, consultas=None):
+    """Imprime os três relatórios (consultas parametrizadas e com cache do consultas.py)."""
+    consultas = consultas or consultas_padrao()
+    filtro_uf = f" [UF: {', '.join(ufs)}]" if ufs else ""
     
     print("--- RELATÓRIO ANALÍTICO SQL (Item 3.4) ---\n")
 
     # ---------------------------------------------------------
-    # QUERY 1: Top 5 Operadoras com Maior Crescimento (%)
-    # Lógica: Comparar Soma do 1T2025 vs 3T2025
+    # QUERY 1: Top N Operadoras com Maior Crescimento (%)
+    # Lógica: Comparar Soma do trimestre inicial vs final (padrão 1T2025 vs 3T2025)
     # Desafio PDF: "Considerar operadoras que não tem dados em todos trimestres" -> Inner Join filtra isso.
     # ---------------------------------------------------------
-    print("1. Top 5 Operadoras com Maior Crescimento (1T2025 vs 3T2025):")
-    query1 = """
-    WITH despesas_trimestrais AS (
-        -- Agrupa despesas por operadora e trimestre
-        SELECT reg_ans, trimestre, SUM(valor_despesa) as total
-        FROM despesas
-        GROUP BY reg_ans, trimestre
-    ),
-    inicio AS (
-        SELECT * FROM despesas_trimestrais WHERE trimestre = '1T2025'
-    ),
-    fim AS (
-        SELECT * FROM despesas_trimestrais WHERE trimestre = '3T2025'
-    )
-    SELECT 
-        op.razao_social,
-        inicio.total as valor_inicial,
-        fim.total as valor_final,
-        ROUND(((fim.total - inicio.total) * 1.0 / inicio.total) * 100, 2) as crescimento_pct
-    FROM inicio
-    JOIN fim ON inicio.reg_ans = fim.reg_ans
-    JOIN operadoras op ON inicio.reg_ans = op.reg_ans
-    WHERE inicio.total > 1000 -- Filtro para evitar distorções com valores irrisórios (ex: cresceu de R$1 pra R$10)
-    ORDER BY crescimento_pct DESC
-    LIMIT 5;
-    """
-    df1 = pd.read_sql_query(query1, conn)
+    print(f"1. Top {limite} Operadoras com Maior Crescimento ({inicio} vs {fim}){filtro_uf}:")
+    with etapa('analytics.query1') as registro:
+        df1 = consultas.crescimento(inicio, fim, limite, ufs)
+        registro['linhas_saida'] = len(df1)
     print(df1.to_string(index=False))
     print("-" * 50)
 
     # ---------------------------------------------------------
-    # QUERY 2: Distribuição de Despesas por UF (Top 5)
+    # QUERY 2: Distribuição de Despesas por UF (Top N)
     # Desafio PDF: Calcular também a média por operadora na mesma query
     # ---------------------------------------------------------
-    print("\n2. Top 5 Estados com Maiores Despesas (Total + Média por Operadora):")
-    query2 = """
-    SELECT 
-        op.uf,
-        SUM(d.valor_despesa) as total_despesas,
-        AVG(d.valor_despesa) as media_por_lancamento,
-        -- Cálculo da média por operadora (Total do UF / Qtd Operadoras Únicas no UF)
-        SUM(d.valor_despesa) / COUNT(DISTINCT op.reg_ans) as media_por_operadora
-    FROM despesas d
-    JOIN operadoras op ON d.reg_ans = op.reg_ans
-    WHERE op.uf != 'ND'
-    GROUP BY op.uf
-    ORDER BY total_despesas DESC
-    LIMIT 5;
-    """
-    df2 = pd.read_sql_query(query2, conn)
+    print(f"\n2. Top {limite} Estados com Maiores Despesas (Total + Média por Operadora){filtro_uf}:")
+    with etapa('analytics.query2') as registro:
+        df2 = consultas.distribuicao_uf(limite, ufs)
+        registro['linhas_saida'] = len(df2)
     # Formatação visual
     df2['total_despesas'] = df2['total_despesas'].apply(lambda x: f"R$ {x:,.2f}")
     df2['media_por_operadora'] = df2['media_por_operadora'].apply(lambda x: f"R$ {x:,.2f}")
@@ -73,41 +55,109 @@ def run_queries():
     # QUERY 3: Operadoras acima da média em >= 2 trimestres
     # Trade-off: Usa CTEs para clareza e manutenibilidade.
     # ---------------------------------------------------------
-    print("\n3. Contagem de Operadoras com Performance Acima da Média (>= 2 Trimestres):")
-    query3 = """
-    WITH totais_operadora_trimestre AS (
-        -- Quanto cada operadora gastou por trimestre
-        SELECT reg_ans, trimestre, SUM(valor_despesa) as total_op
-        FROM despesas
-        GROUP BY reg_ans, trimestre
-    ),
-    media_mercado_trimestre AS (
-        -- Qual foi a média do mercado naquele trimestre
-        SELECT trimestre, AVG(total_op) as media_mercado
-        FROM totais_operadora_trimestre
-        GROUP BY trimestre
-    ),
-    operadoras_acima AS (
-        -- Filtra quem ficou acima da média
-        SELECT t.reg_ans
-        FROM totais_operadora_trimestre t
-        JOIN media_mercado_trimestre m ON t.trimestre = m.trimestre
-        WHERE t.total_op > m.media_mercado
-    )
-    -- Conta quantas vezes cada operadora apareceu acima da média e filtra >= 2
-    SELECT COUNT(*) as qtd_operadoras_consistentes
-    FROM (
-        SELECT reg_ans
-        FROM operadoras_acima
-        GROUP BY reg_ans
-        HAVING COUNT(*) >= 2
-    );
-    """
-    df3 = pd.read_sql_query(query3, conn)
+    print(f"\n3. Contagem de Operadoras com Performance Acima da Média (>= 2 Trimestres){filtro_uf}:")
+    with etapa('analytics.query3') as registro:
+        df3 = consultas.acima_media(ufs=ufs)
+        registro['linhas_saida'] = len(df3)
     print(f"Resultado: {df3.iloc[0,0]} operadoras.")
     print("-" * 50)
 
+def planos_de_execucao(conn, parametros=None):
+    """EXPLAIN QUERY PLAN de cada relatório: {nome: [linhas do plano]}."""
+    return {nome: [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", valores)]
+            for nome, (sql, valores) in queries_do_banco(conn, parametros).items()}
+
+def varreduras_completas(sql, plano):
+    """Linhas do plano que leem uma tabela inteira (SCAN sem índice).
+
+    SCAN de CTE/subquery é ignorado: elas já são o resultado agregado.
+    """
+    ctes = set(re.findall(r'(\w+)\s+AS\s*\(', sql, flags=re.IGNORECASE))
+    # Alias -> origem (ex.: "FROM totais_operadora_trimestre t")
+    origens = {}
+    for origem, alias in re.findall(r'(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, flags=re.IGNORECASE):
+        origens[origem] = origem
+        if alias and alias.upper() not in PALAVRAS_RESERVADAS:
+            origens[alias] = origem
+    problemas = []
+    for detalhe in plano:
+        m = re.match(r'SCAN (\S+)', detalhe)
+        if not m or 'INDEX' in detalhe or m.group(1).startswith('('):
+            continue
+        if origens.get(m.group(1), m.group(1)) in ctes:
+            continue
+        problemas.append(detalhe)
+    return problemas
+
+def verificar_planos(ufs=None):
+    """Falha (exit 1) se algum relatório voltar a fazer full table scan.
+
+    Com ufs, confere também os planos com o filtro de UF.
+    """
+    parametros = {nome: {'ufs': ufs} for nome in PARAMETROS} if ufs else None
+    conn = sqlite3.connect(DB_PATH)
+    queries = queries_do_banco(conn, parametros)
+    planos = planos_de_execucao(conn, parametros)
     conn.close()
 
+    falhou = False
+    for nome, plano in planos.items():
+        problemas = varreduras_completas(queries[nome][0], plano)
+        print(f"[{'ERRO' if problemas else 'ok'}] {nome}")
+        for detalhe in plano:
+            print(f"      {detalhe}")
+        falhou |= bool(problemas)
+    if falhou:
+        print("\n[ERRO] Plano com full table scan. Confira os índices em schema.py.")
+        sys.exit(1)
+
+def verificar_filtro_uf(ufs=None):
+    """Falha (exit 1) se algum relatório ignorar o filtro de UF.
+
+    Com uma UF inexistente os três relatórios têm de voltar vazios (ou
+    zero); com ufs (padrão: a UF com mais operadoras) toda linha do
+    crescimento e da distribuição tem de ser de uma operadora dessas UFs.
+    """
+    consultas = ConsultasAnaliticas(DB_PATH)
+    with consultas.pool.conexao() as conn:
+        if not ufs:
+            ufs = [conn.execute("SELECT uf FROM operadoras WHERE uf != 'ND' GROUP BY uf "
+                                "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]]
+        # Razões sociais das operadoras nas UFs pedidas (o crescimento não traz a UF)
+        permitidas = {linha[0] for linha in conn.execute(
+            f"SELECT razao_social FROM operadoras WHERE uf IN ({', '.join('?' * len(ufs))})", ufs)}
+
+        problemas = []
+        if len(consultas.crescimento(limite=1000, ufs=[UF_INEXISTENTE])):
+            problemas.append(f"crescimento: linhas com uf={UF_INEXISTENTE}")
+        if len(consultas.distribuicao_uf(limite=1000, ufs=[UF_INEXISTENTE])):
+            problemas.append(f"distribuicao_uf: linhas com uf={UF_INEXISTENTE}")
+        if consultas.acima_media(ufs=[UF_INEXISTENTE]).iloc[0, 0]:
+            problemas.append(f"acima_media: contagem com uf={UF_INEXISTENTE}")
+        nomes = consultas.crescimento(limite=1000, ufs=ufs)['razao_social']
+        intrusas = sorted({str(n) for n in nomes[~nomes.isin(permitidas)]})
+        if intrusas:
+            problemas.append(f"crescimento: operadoras fora de {','.join(ufs)}: {', '.join(intrusas[:5])}")
+        outras_ufs = set(consultas.distribuicao_uf(limite=1000, ufs=ufs)['uf']) - set(ufs)
+        if outras_ufs:
+            problemas.append(f"distribuicao_uf: UFs fora do filtro: {', '.join(sorted(outras_ufs))}")
+    consultas.fechar()
+
+    for problema in problemas:
+        print(f"[ERRO] Filtro de UF ignorado em {problema}")
+    if problemas:
+        sys.exit(1)
+    print(f"[ok] filtro de UF ({', '.join(ufs)} e {UF_INEXISTENTE})")
+
+def cli(argv=None, prog=None):
+    args = parser_analytics_queries(prog).parse_args(argv)
+    ufs = [uf.strip().upper() for uf in args.uf.split(',') if uf.strip()] if args.uf else None
+    if args.check_plans:
+        verificar_planos(ufs)
+        verificar_filtro_uf(ufs)
+    else:
+        run_queries(args.inicio, args.fim, args.limite, ufs)
+        salvar_relatorio('analytics_queries')
+
 if __name__ == "__main__":
-    run_queries()
\ No newline at end of file
+    cli()
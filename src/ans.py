@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import statistics
+import subprocess
+from comandos import PARSERS
+
+# Ponto de entrada único do pipeline: python src/ans.py <comando> [opções]
+# (ou PYTHONPATH=src python -m ans <comando>). Este módulo e o comandos.py
+# (opções de cada comando) só usam a biblioteca padrão: o --help e a
+# validação das opções não importam nada pesado. pandas, numpy, pyarrow,
+# requests e lxml entram quando o script do comando é importado para
+# executar, e cada comando importa só o seu.
+COMANDOS = {
+    'extract': ('extraction', "Baixa os ZIPs dos demonstrativos contábeis da ANS para data/raw."),
+    'process': ('processor', "ETL dos trimestres: data/consolidado.csv e Parquet por ANO/TRIMESTRE."),
+    'aggregate': ('aggregator', "Estatísticas por Operadora/UF: data/despesas_agregadas.csv."),
+    'load': ('db_loader', "Cria sql/teste_ans.db e carrega consolidado e agregado."),
+    'report': ('analytics_queries', "Relatórios SQL (crescimento, UF, acima da média)."),
+    'pipeline': ('pipeline', "process + aggregate + load num único processo, sem CSVs intermediários."),
+}
+# Não podem ser importados só para montar o --help / despachar o comando
+MODULOS_PESADOS = ('pandas', 'numpy', 'pyarrow', 'requests', 'lxml')
+# Limite do "startup --verificar": acréscimo sobre um "python -c pass" de
+# ans, ans --help e ans <comando> --help (nenhum deles importa o script)
+LIMITE_PARTIDA_S = 0.1
+# ...e, com baseline salvo (--salvar-baseline), acréscimo sobre o do baseline
+TOLERANCIA_BASELINE_S = 0.03
+BASELINE_FILE = "data/benchmark/startup.json"
+REPETICOES = 5
+
+def construir_parser():
+    comandos = '\n'.join(f"  {nome:<10} {descricao}" for nome, (_, descricao) in COMANDOS.items())
+    parser = argparse.ArgumentParser(
+        prog='ans', formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Pipeline dos dados da ANS (extração, ETL, agregação, banco e relatórios).",
+        epilog=f"comandos:\n{comandos}\n  {'startup':<10} Mede o tempo de partida da CLI (--verificar para o limite).\n\n"
+               "Opções de cada comando: ans <comando> --help")
+    parser.add_argument('comando', nargs='?', choices=list(COMANDOS) + ['startup'], metavar='comando',
+                        help="um dos comandos abaixo")
+    return parser
+
+def _executavel():
+    return [sys.executable, os.path.abspath(__file__)]
+
+def _tempo_mediano(comando, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def _casos():
+    """Casos medidos: {nome: argumentos do ans}."""
+    casos = {'ans': [], 'ans --help': ['--help']}
+    casos.update({f"ans {nome} --help": [nome, '--help'] for nome in COMANDOS})
+    return casos
+
+def modulos_pesados_na_partida(argumentos):
+    """Módulos pesados carregados por ans <argumentos> (num processo novo, sem contar a saída do --help)."""
+    codigo = ("import sys, ans\n"
+              "try:\n"
+              f"    ans.main({argumentos!r})\n"
+              "except SystemExit:\n"
+              "    pass\n"
+              f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules), file=sys.stderr)")
+    saida = subprocess.run([sys.executable, '-c', codigo], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return [m for m in saida.stderr.strip().splitlines()[-1:][0].split(',') if m] if saida.stderr.strip() else []
+
+def medir_partida(repeticoes=REPETICOES):
+    """Tempo de partida (mediana, processos novos) da CLI e do --help de cada comando.
+
+    O acréscimo de cada caso é sobre um "python -c pass" medido na mesma
+    execução; 'modulos_pesados' lista, por caso, o que foi importado sem
+    precisar.
+    """
+    base = _tempo_mediano([sys.executable, '-c', 'pass'], repeticoes)
+    casos = _casos()
+    tempos = {nome: _tempo_mediano(_executavel() + argumentos, repeticoes) for nome, argumentos in casos.items()}
+    pesados = {nome: modulos_pesados_na_partida(argumentos) for nome, argumentos in casos.items()}
+    return {'python_s': round(base, 4),
+            'comandos': {nome: {'tempo_s': round(t, 4), 'acrescimo_s': round(t - base, 4)}
+                         for nome, t in tempos.items()},
+            'modulos_pesados': {nome: m for nome, m in pesados.items() if m}}
+
+def carregar_baseline(caminho=BASELINE_FILE):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f).get('comandos', {})
+
+def falhas_partida(medicao, baseline=None):
+    """Casos fora do limite (acréscimo absoluto e, com baseline, acréscimo sobre o dele)."""
+    falhas = []
+    for nome, m in medicao['comandos'].items():
+        if m['acrescimo_s'] > LIMITE_PARTIDA_S:
+            falhas.append(f"{nome}: +{m['acrescimo_s'] * 1000:.0f} ms (limite +{LIMITE_PARTIDA_S * 1000:.0f} ms)")
+        base = (baseline or {}).get(nome)
+        if base and m['acrescimo_s'] > base['acrescimo_s'] + TOLERANCIA_BASELINE_S:
+            falhas.append(f"{nome}: +{m['acrescimo_s'] * 1000:.0f} ms "
+                          f"(baseline +{base['acrescimo_s'] * 1000:.0f} ms)")
+    for nome, modulos in medicao['modulos_pesados'].items():
+        falhas.append(f"{nome} importa {', '.join(modulos)}")
+    return falhas
+
+def startup(argv):
+    parser = argparse.ArgumentParser(prog='ans startup', description="Mede o tempo de partida da CLI.")
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES,
+                        help=f"Execuções por caso (vale a mediana). Padrão: {REPETICOES}")
+    parser.add_argument('--verificar', action='store_true',
+                        help=f"Sai com código 1 se ans, ans --help ou algum ans <comando> --help passar de "
+                             f"+{LIMITE_PARTIDA_S * 1000:.0f} ms sobre um python -c pass (ou de "
+                             f"+{TOLERANCIA_BASELINE_S * 1000:.0f} ms sobre o baseline) ou importar "
+                             f"{', '.join(MODULOS_PESADOS)}.")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f"Arquivo de baseline. Padrão: {BASELINE_FILE}")
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava as medições como novo baseline.")
+    parser.add_argument('--json', metavar='ARQUIVO', help="Também grava as medições em JSON.")
+    args = parser.parse_args(argv)
+
+    medicao = medir_partida(args.repeticoes)
+    baseline = {} if args.salvar_baseline else carregar_baseline(args.baseline)
+    print(f"python -c pass: {medicao['python_s'] * 1000:.0f} ms (base)")
+    for nome, m in medicao['comandos'].items():
+        referencia = f", baseline +{baseline[nome]['acrescimo_s'] * 1000:.0f} ms" if nome in baseline else ""
+        print(f"   {nome:<22} {m['tempo_s'] * 1000:7.0f} ms (+{m['acrescimo_s'] * 1000:.0f} ms{referencia})")
+    falhas = falhas_partida(medicao, baseline)
+    for falha in falhas:
+        print(f"[ERRO] {falha}")
+    if not falhas:
+        print(f"[ok] Partida dentro do limite (+{LIMITE_PARTIDA_S * 1000:.0f} ms) e sem módulos pesados.")
+    for caminho in filter(None, [args.json, args.baseline if args.salvar_baseline else None]):
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(medicao, f, indent=2)
+    if args.salvar_baseline:
+        print(f"[v] Baseline salvo em {args.baseline}")
+    if args.verificar and falhas:
+        return 1
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = construir_parser()
+    # Só o primeiro argumento é do ans; o resto vai inteiro para o comando
+    args = parser.parse_args(argv[:1])
+    if args.comando is None:
+        parser.print_help()
+        return 0
+    if args.comando == 'startup':
+        return startup(argv[1:])
+    modulo, _ = COMANDOS[args.comando]
+    prog = f"ans {args.comando}"
+    # Opções validadas (e --help respondido) antes de importar o script e suas dependências
+    PARSERS[modulo](prog).parse_args(argv[1:])
+    importlib.import_module(modulo).cli(argv[1:], prog=prog)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
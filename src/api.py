@@ -0,0 +1,285 @@
+import re
+import json
+import asyncio
+import argparse
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from consultas import ConsultasAnaliticas, DB_PATH, TAMANHO_POOL
+from schema import schema_compacto, busca_disponivel, periodo
+
+# API HTTP local (somente leitura) sobre o banco do db_loader, só com a
+# biblioteca padrão: asyncio para as conexões (keep-alive) e as consultas
+# SQLite num pool de threads, com as conexões somente leitura do
+# consultas.py. Respostas em JSON.
+HOST = "127.0.0.1"
+PORTA = 8000
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 1000
+TAMANHO_MAX_CABECALHO = 16 * 1024
+# Corpo (ignorado) que ainda é lido para manter a conexão; acima disso ela é fechada
+TAMANHO_MAX_CORPO = 64 * 1024
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+          431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+class ErroParametro(ValueError):
+    """Parâmetro de consulta inválido (vira HTTP 400)."""
+
+def _parametro(params, nome, padrao=None):
+    valores = params.get(nome)
+    return valores[-1].strip() if valores else padrao
+
+def _inteiro(params, nome, padrao, minimo=0, maximo=None):
+    texto = _parametro(params, nome)
+    if texto is None or texto == '':
+        return padrao
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise ErroParametro(f"'{nome}' deve ser inteiro")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise ErroParametro(f"'{nome}' fora do intervalo [{minimo}, {maximo if maximo is not None else '...'}]")
+    return valor
+
+def _ufs(params):
+    texto = _parametro(params, 'uf')
+    return [uf.strip().upper() for uf in texto.split(',') if uf.strip()] if texto else None
+
+def _trimestre(params, nome, padrao=None):
+    texto = _parametro(params, nome, padrao)
+    if texto is not None and periodo(texto) is None:
+        raise ErroParametro(f"'{nome}' deve estar no formato 1T2025")
+    return texto.upper() if texto else texto
+
+def _registros(cursor):
+    colunas = [c[0] for c in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+def _registros_df(df):
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+def _pagina(itens, limite, chave):
+    """Resposta de keyset: o cursor 'apos' é a chave da última linha devolvida."""
+    proximo = itens[limite - 1][chave] if len(itens) > limite else None
+    itens = itens[:limite]
+    for item in itens:
+        item.pop('_chave', None)
+    return {'itens': itens, 'proximo': proximo}
+
+class ApiAns:
+    """Rotas da API; cada método recebe os parâmetros da query string e devolve um dict."""
+
+    def __init__(self, caminho=DB_PATH, tamanho_pool=TAMANHO_POOL):
+        self.consultas = ConsultasAnaliticas(caminho, tamanho_pool)
+        self.rotas = {
+            '/operadoras': self.operadoras,
+            '/uf': self.distribuicao_uf,
+            '/crescimento': self.crescimento,
+            '/despesas': self.despesas,
+            '/agregadas': self.agregadas,
+            '/versao': self.versao,
+        }
+
+    def operadoras(self, params):
+        """Busca por razão social (FTS5, prefixo por palavra) ou CNPJ (completo ou prefixo)."""
+        termo = _parametro(params, 'q', '')
+        limite = _inteiro(params, 'limite', LIMITE_PADRAO, 1, LIMITE_MAXIMO)
+        if not termo:
+            raise ErroParametro("informe 'q' (razão social ou CNPJ)")
+        digitos = re.sub(r'\D', '', termo)
+        with self.consultas.pool.conexao() as conn:
+            cursor = conn.cursor()
+            colunas = "op.reg_ans, op.cnpj, op.razao_social, op.uf, op.modalidade"
+            if digitos and not re.search(r'[^\d./\-\s]', termo):
+                # Só dígitos e pontuação de CNPJ: GLOB de prefixo usa idx_operadoras_cnpj
+                cursor.execute(f"SELECT {colunas} FROM operadoras op WHERE op.cnpj GLOB ? ORDER BY op.cnpj LIMIT ?",
+                               (digitos + '*', limite))
+            elif busca_disponivel(cursor):
+                palavras = re.findall(r'\w+', termo)
+                if not palavras:
+                    raise ErroParametro("'q' sem palavras para buscar")
+                # Cada palavra vira um prefixo entre aspas (nada da sintaxe do FTS5 passa do usuário)
+                expressao = ' '.join(f'"{p}"*' for p in palavras)
+                cursor.execute(f"""
+                SELECT {colunas} FROM operadoras_busca
+                JOIN operadoras op ON op.reg_ans = operadoras_busca.reg_ans
+                WHERE operadoras_busca MATCH ? ORDER BY operadoras_busca.rank LIMIT ?
+                """, (expressao, limite))
+            else:
+                # Banco sem a tabela de busca (carga anterior a ela ou SQLite sem FTS5)
+                cursor.execute(f"SELECT {colunas} FROM operadoras op WHERE op.razao_social LIKE ? LIMIT ?",
+                               (f"%{termo}%", limite))
+            return {'itens': _registros(cursor)}
+
+    def distribuicao_uf(self, params):
+        """Despesas por UF (total, média por lançamento e por operadora)."""
+        limite = _inteiro(params, 'limite', 27, 1, LIMITE_MAXIMO)
+        return {'itens': _registros_df(self.consultas.distribuicao_uf(limite, _ufs(params)))}
+
+    def crescimento(self, params):
+        """Ranking de crescimento entre dois trimestres quaisquer (inicio/fim)."""
+        inicio = _trimestre(params, 'inicio', '1T2025')
+        fim = _trimestre(params, 'fim', '3T2025')
+        limite = _inteiro(params, 'limite', 10, 1, LIMITE_MAXIMO)
+        minimo = _inteiro(params, 'valor_minimo', 1000)
+        df = self.consultas.crescimento(inicio, fim, limite, _ufs(params), minimo)
+        return {'inicio': inicio, 'fim': fim, 'itens': _registros_df(df)}
+
+    def despesas(self, params):
+        """Lançamentos paginados por keyset (id > apos), com filtro por reg_ans e trimestre.
+
+        Usa a rowid (= id do DDL), que existe também nas tabelas recriadas pelo to_sql do import_data.
+        """
+        limite = _inteiro(params, 'limite', LIMITE_PADRAO, 1, LIMITE_MAXIMO)
+        apos = _inteiro(params, 'apos', 0)
+        reg_ans = _parametro(params, 'reg_ans')
+        trimestre = _trimestre(params, 'trimestre')
+        with self.consultas.pool.conexao() as conn:
+            cursor = conn.cursor()
+            compacto = schema_compacto(cursor)
+            filtros, valores = ["d.rowid > ?"], [apos]
+            if reg_ans:
+                filtros.append("d.reg_ans = ?")
+                valores.append(int(reg_ans) if compacto and reg_ans.isdigit() else reg_ans)
+            if trimestre:
+                filtros.append("d.periodo = ?" if compacto else "d.trimestre = ?")
+                valores.append(periodo(trimestre) if compacto else trimestre)
+            if compacto:
+                select = """SELECT d.rowid as id, d.reg_ans, (d.periodo % 10) || 'T' || (d.periodo / 10) as trimestre,
+                d.periodo / 10 as ano, d.valor_centavos / 100.0 as valor_despesa, ds.descricao
+                FROM despesas d LEFT JOIN descricoes ds ON ds.id = d.descricao_id"""
+            else:
+                select = "SELECT d.rowid as id, d.reg_ans, d.trimestre, d.ano, d.valor_despesa, d.descricao FROM despesas d"
+            cursor.execute(f"{select} WHERE {' AND '.join(filtros)} ORDER BY d.rowid LIMIT ?", valores + [limite + 1])
+            return _pagina(_registros(cursor), limite, 'id')
+
+    def agregadas(self, params):
+        """despesas_agregadas paginada por keyset (rowid), com filtro opcional de UF."""
+        limite = _inteiro(params, 'limite', LIMITE_PADRAO, 1, LIMITE_MAXIMO)
+        apos = _inteiro(params, 'apos', 0)
+        ufs = _ufs(params)
+        filtro = f" AND uf IN ({', '.join('?' * len(ufs))})" if ufs else ""
+        with self.consultas.pool.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            SELECT rowid as _chave, razao_social, uf, total_despesas, media_trimestral, desvio_padrao, qtd_lancamentos
+            FROM despesas_agregadas WHERE rowid > ?{filtro} ORDER BY rowid LIMIT ?
+            """, [apos] + (ufs or []) + [limite + 1])
+            return _pagina(_registros(cursor), limite, '_chave')
+
+    def versao(self, params):
+        """Versão dos dados (muda a cada carga do db_loader) e estatísticas do cache."""
+        return {'versao': self.consultas.versao(), 'cache_acertos': self.consultas.acertos,
+                'cache_falhas': self.consultas.falhas}
+
+    def responder(self, caminho, params):
+        """(status, corpo) da requisição; roda numa thread do executor."""
+        rota = self.rotas.get(caminho.rstrip('/') or '/')
+        if rota is None:
+            return 404, {'erro': f"rota inexistente: {caminho}", 'rotas': sorted(self.rotas)}
+        try:
+            return 200, rota(params)
+        except ErroParametro as e:
+            return 400, {'erro': str(e)}
+        except Exception as e:
+            return 500, {'erro': repr(e)}
+
+async def _ler_requisicao(leitor):
+    """Linha de requisição, cabeçalhos e se eles foram lidos até o fim; None se o cliente fechou a conexão.
+
+    Cabeçalhos acima de TAMANHO_MAX_CABECALHO ficam pela metade no
+    leitor: a conexão não pode ser reaproveitada.
+    """
+    linha = await leitor.readline()
+    if not linha:
+        return None
+    cabecalhos = {}
+    tamanho = len(linha)
+    completos = False
+    while tamanho <= TAMANHO_MAX_CABECALHO:
+        cabecalho = await leitor.readline()
+        tamanho += len(cabecalho)
+        if cabecalho in (b'\r\n', b'\n', b''):
+            completos = True
+            break
+        nome, _, valor = cabecalho.decode('latin1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    partes = linha.decode('latin1').split()
+    return (partes + ['', '', ''])[:3], cabecalhos, completos
+
+async def _descartar_corpo(leitor, cabecalhos):
+    """Lê e descarta o corpo da requisição (nenhuma rota usa).
+
+    Retorna False se o corpo não pôde ser consumido (chunked, tamanho
+    inválido ou acima de TAMANHO_MAX_CORPO): o resto dele seria lido como
+    a próxima requisição, então a conexão tem de ser fechada.
+    """
+    if 'transfer-encoding' in cabecalhos:
+        return False
+    tamanho = cabecalhos.get('content-length', '0')
+    if not tamanho.isdigit() or int(tamanho) > TAMANHO_MAX_CORPO:
+        return False
+    if int(tamanho):
+        await leitor.readexactly(int(tamanho))
+    return True
+
+def _resposta(status, corpo, manter):
+    dados = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+    cabecalho = (f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+                 "Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(dados)}\r\n"
+                 f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+    return cabecalho.encode('latin1') + dados
+
+async def atender(api, executor, leitor, escritor):
+    """Requisições de uma conexão (keep-alive) até o cliente fechar ou pedir Connection: close."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            requisicao = await _ler_requisicao(leitor)
+            if requisicao is None:
+                break
+            (metodo, alvo, versao), cabecalhos, completos = requisicao
+            conexao = cabecalhos.get('connection', '').lower()
+            manter = conexao == 'keep-alive' or (versao == 'HTTP/1.1' and conexao != 'close')
+            if not completos:
+                status, corpo, manter = 431, {'erro': "cabeçalhos grandes demais"}, False
+            else:
+                # O corpo precisa sair do leitor antes da próxima requisição da conexão
+                manter = await _descartar_corpo(leitor, cabecalhos) and manter
+                if metodo != 'GET':
+                    status, corpo = 405, {'erro': "só GET"}
+                else:
+                    url = urlsplit(alvo)
+                    status, corpo = await loop.run_in_executor(executor, api.responder, url.path, parse_qs(url.query))
+            escritor.write(_resposta(status, corpo, manter))
+            await escritor.drain()
+            if not manter:
+                break
+    # ValueError: linha acima do limite do StreamReader (64 KiB)
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        escritor.close()
+
+async def servir(api, host=HOST, porta=PORTA):
+    executor = ThreadPoolExecutor(max_workers=TAMANHO_POOL)
+    servidor = await asyncio.start_server(partial(atender, api, executor), host, porta)
+    print(f"API em http://{host}:{porta} (rotas: {', '.join(sorted(api.rotas))})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+        api.consultas.fechar()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP local (JSON) sobre sql/teste_ans.db.")
+    parser.add_argument('--host', default=HOST, help=f"Padrão: {HOST}")
+    parser.add_argument('--porta', type=int, default=PORTA, help=f"Padrão: {PORTA}")
+    parser.add_argument('--banco', default=DB_PATH, help=f"Banco SQLite. Padrão: {DB_PATH}")
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(ApiAns(args.banco), args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,175 @@
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from datetime import datetime
+from dados_sinteticos import gerar, parametros_gerados, CADASTRO_FILE
+from instrumentacao import RELATORIOS_DIR
+
+# Benchmark do pipeline sobre dados sintéticos (sem rede): cada etapa roda
+# como processo separado, na pasta data/benchmark/<linhas>, e o tempo é
+# comparado com o baseline salvo anteriormente.
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = "data/benchmark"
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+TAMANHOS = [10**5, 10**6, 10**7]
+OPERADORAS = 1500
+TOLERANCIA = 0.20   # regressão: mais de 20% acima do baseline...
+MINIMO_S = 0.5      # ...e pelo menos meio segundo a mais (ruído em etapas curtas)
+# (etapa, argumentos do script); {cadastro} é o CSV gerado junto com os dados
+ETAPAS = [
+    ('processor', ['processor.py', '--full', '--cadastro', '{cadastro}']),
+    ('aggregator', ['aggregator.py']),
+    ('db_loader', ['db_loader.py', '--fast']),
+    ('analytics_queries', ['analytics_queries.py']),
+    # Mesmo ETL + agregação + carga num processo só, sem CSVs intermediários
+    ('pipeline', ['pipeline.py', '--cadastro', '{cadastro}']),
+]
+
+def preparar_dados(linhas, operadoras=OPERADORAS):
+    """Pasta com os dados sintéticos do tamanho pedido (regerados só se os parâmetros mudaram)."""
+    pasta = os.path.join(BENCH_DIR, str(linhas))
+    if parametros_gerados(pasta) != {'linhas': linhas, 'operadoras': operadoras, 'semente': 42}:
+        print(f"Gerando {linhas} linhas sintéticas em {pasta}...")
+        shutil.rmtree(pasta, ignore_errors=True)
+        gerar(pasta, linhas, operadoras)
+    return pasta
+
+def _relatorio_mais_recente(pasta, script):
+    nome = os.path.splitext(script)[0]
+    relatorios = glob.glob(os.path.join(pasta, RELATORIOS_DIR, f"{nome}-*.json"))
+    if not relatorios:
+        return None
+    with open(max(relatorios, key=os.path.getmtime), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def medir_etapa(pasta, nome, argumentos):
+    """Roda a etapa (saída em <pasta>/<etapa>.log) e retorna {tempo_s, rss_pico_mb, ok}."""
+    comando = [sys.executable, os.path.join(SRC_DIR, argumentos[0])]
+    comando += [a.format(cadastro=CADASTRO_FILE) for a in argumentos[1:]]
+    with open(os.path.join(pasta, f"{nome}.log"), 'w', encoding='utf-8') as log:
+        inicio = time.perf_counter()
+        retorno = subprocess.run(comando, cwd=pasta, stdout=log, stderr=subprocess.STDOUT)
+        tempo = time.perf_counter() - inicio
+    relatorio = _relatorio_mais_recente(pasta, argumentos[0]) or {}
+    return {'tempo_s': round(tempo, 3), 'rss_pico_mb': relatorio.get('rss_pico_mb'), 'ok': retorno.returncode == 0}
+
+def executar(tamanhos, repeticoes=1):
+    """Mede todas as etapas em cada tamanho; com repetições, fica o menor tempo."""
+    resultados = {}
+    for linhas in tamanhos:
+        pasta = preparar_dados(linhas)
+        print(f"\n--- {linhas} linhas ---")
+        resultados[str(linhas)] = {}
+        for nome, argumentos in ETAPAS:
+            if nome == 'db_loader':
+                # Banco novo a cada medição (a carga completa é o cenário medido)
+                shutil.rmtree(os.path.join(pasta, "sql"), ignore_errors=True)
+            medidas = [medir_etapa(pasta, nome, argumentos) for _ in range(repeticoes)]
+            melhor = min(medidas, key=lambda m: m['tempo_s'])
+            melhor['ok'] = all(m['ok'] for m in medidas)
+            resultados[str(linhas)][nome] = melhor
+            status = "" if melhor['ok'] else f"  [ERRO] veja {os.path.join(pasta, nome + '.log')}"
+            print(f"   {nome:<18} {melhor['tempo_s']:>9.2f}s  {melhor['rss_pico_mb'] or 0:>8.1f} MB{status}")
+    return resultados
+
+def medir_parser(linhas, repeticoes=3):
+    """Parser monetário isolado: normalizar_valor célula a célula (apply) x normalizar_valores.
+
+    Usa os mesmos formatos de valor dos dados sintéticos; confere que os
+    dois dão o mesmo resultado e retorna os tempos (o menor de cada um).
+    """
+    import numpy as np
+    import pandas as pd
+    from processor import normalizar_valor, normalizar_valores
+    from dados_sinteticos import _formatar_valores
+
+    serie = pd.Series(_formatar_valores(np.random.default_rng(42), linhas), dtype=object)
+    tempos, resultados = {}, {}
+    for nome, funcao in (('apply', lambda: serie.apply(normalizar_valor)),
+                         ('vetorizado', lambda: normalizar_valores(serie)[0])):
+        medidas = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultados[nome] = funcao().to_numpy(dtype='float64')
+            medidas.append(time.perf_counter() - inicio)
+        tempos[nome] = min(medidas)
+    # Comparação bit a bit (distingue 0.0 de -0.0)
+    iguais = np.array_equal(resultados['apply'].view(np.int64), resultados['vetorizado'].view(np.int64))
+    ganho = tempos['apply'] / tempos['vetorizado']
+    print(f"   parser ({linhas} valores): apply {tempos['apply']:.3f}s, vetorizado {tempos['vetorizado']:.3f}s "
+          f"({ganho:.1f}x){'' if iguais else '  [ERRO] resultados diferentes'}")
+    return {'apply_s': round(tempos['apply'], 4), 'vetorizado_s': round(tempos['vetorizado'], 4),
+            'ganho': round(ganho, 1), 'iguais': bool(iguais)}
+
+def carregar_baseline(caminho=BASELINE_FILE):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f).get('tamanhos', {})
+
+def salvar_baseline(resultados, caminho=BASELINE_FILE):
+    """Atualiza o baseline com os tamanhos medidos agora (os demais são mantidos)."""
+    tamanhos = carregar_baseline(caminho)
+    tamanhos.update(resultados)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'data': datetime.now().isoformat(timespec='seconds'),
+                   'python': sys.version.split()[0], 'tamanhos': tamanhos}, f, indent=2)
+    print(f"\n[v] Baseline salvo em {caminho}")
+
+def comparar(resultados, baseline, tolerancia=TOLERANCIA):
+    """Lista de regressões (texto) das etapas mais lentas ou com mais memória que o baseline."""
+    regressoes = []
+    for linhas, etapas in resultados.items():
+        for nome, atual in etapas.items():
+            base = baseline.get(linhas, {}).get(nome)
+            if not atual['ok']:
+                regressoes.append(f"{nome} @ {linhas}: falhou")
+            if not base:
+                continue
+            if atual['tempo_s'] > base['tempo_s'] * (1 + tolerancia) and atual['tempo_s'] - base['tempo_s'] > MINIMO_S:
+                regressoes.append(f"{nome} @ {linhas}: {atual['tempo_s']:.2f}s (baseline {base['tempo_s']:.2f}s)")
+            if atual['rss_pico_mb'] and base.get('rss_pico_mb') and atual['rss_pico_mb'] > base['rss_pico_mb'] * (1 + tolerancia):
+                regressoes.append(f"{nome} @ {linhas}: {atual['rss_pico_mb']:.0f} MB de pico (baseline {base['rss_pico_mb']:.0f} MB)")
+    return regressoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline com dados sintéticos da ANS.")
+    parser.add_argument('--tamanhos', default=",".join(str(t) for t in TAMANHOS),
+                        help="Linhas por cenário, separadas por vírgula. Padrão: 100000,1000000,10000000")
+    parser.add_argument('--repeticoes', type=int, default=1, help="Execuções por etapa (vale a mais rápida). Padrão: 1")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help=f"Folga sobre o baseline antes de acusar regressão. Padrão: {TOLERANCIA}")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help=f"Arquivo de baseline. Padrão: {BASELINE_FILE}")
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava as medições como novo baseline.")
+    parser.add_argument('--parser', action='store_true',
+                        help="Só mede o parser monetário (normalizar_valor x normalizar_valores) em cada tamanho.")
+    args = parser.parse_args()
+
+    tamanhos = [int(float(t)) for t in args.tamanhos.split(',') if t.strip()]
+    if args.parser:
+        print("--- Benchmark do parser monetário ---")
+        medidas = [medir_parser(linhas, args.repeticoes) for linhas in tamanhos]
+        sys.exit(0 if all(m['iguais'] for m in medidas) else 1)
+    print("--- Benchmark do pipeline (dados sintéticos) ---")
+    resultados = executar(tamanhos, args.repeticoes)
+
+    if args.salvar_baseline:
+        salvar_baseline(resultados, args.baseline)
+        sys.exit(0)
+    baseline = carregar_baseline(args.baseline)
+    if not baseline:
+        print(f"\n[!] Sem baseline em {args.baseline}; rode com --salvar-baseline para criar.")
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    if regressoes:
+        print("\n[ERRO] Regressões em relação ao baseline:")
+        for r in regressoes:
+            print(f"   - {r}")
+        sys.exit(1)
+    if baseline:
+        print("\nSUCESSO! Nenhuma regressão em relação ao baseline.")
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import pandas as pd
+from colunar import PARQUET_DISPONIVEL
+
+# Cache local do cadastro de operadoras (já normalizado pelo processor):
+# evita varrer a pasta da ANS e baixar o CSV a cada execução.
+CACHE_DIR = "data/cache"
+# Parquet com pyarrow; sem ele, pickle do pandas (os dois carregam em milissegundos)
+CADASTRO_CACHE = os.path.join(CACHE_DIR, "cadastro.parquet" if PARQUET_DISPONIVEL else "cadastro.pkl")
+CADASTRO_META = os.path.join(CACHE_DIR, "cadastro.json")
+# Dentro deste prazo desde a última validação o cache é usado sem acessar a rede
+VALIDADE_HORAS = 24
+
+def carregar_cache():
+    """Retorna (mapa, metadados) do cache, ou (None, None) se não houver cache legível."""
+    if not (os.path.exists(CADASTRO_CACHE) and os.path.exists(CADASTRO_META)):
+        return None, None
+    try:
+        with open(CADASTRO_META, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if PARQUET_DISPONIVEL:
+            mapa = pd.read_parquet(CADASTRO_CACHE)
+            # Mesmos tipos do cadastro recém-montado (object, nulos como NaN): o
+            # hash_cadastro do manifesto não pode mudar só por vir do cache
+            mapa = mapa.astype(object).where(mapa.notna(), float('nan'))
+            mapa.index = mapa.index.astype(object)
+        else:
+            mapa = pd.read_pickle(CADASTRO_CACHE)
+        return mapa, meta
+    except (OSError, ValueError) as e:
+        print(f"   [!] Cache do cadastro ilegível, baixando novamente: {e}")
+        return None, None
+
+def _gravar_meta(meta):
+    temporario = CADASTRO_META + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, CADASTRO_META)
+
+def salvar_cache(mapa, arquivo, etag=None, last_modified=None):
+    """Grava o cadastro e os metadados da versão remota (nome do arquivo, ETag, Last-Modified)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporario = CADASTRO_CACHE + '.tmp'
+    if PARQUET_DISPONIVEL:
+        mapa.to_parquet(temporario, engine='pyarrow')
+    else:
+        mapa.to_pickle(temporario)
+    os.replace(temporario, CADASTRO_CACHE)
+    _gravar_meta({
+        'arquivo': arquivo,
+        'etag': etag,
+        'last_modified': last_modified,
+        # Colunas do CSV da ANS detectadas na montagem (não se repete ao carregar)
+        'colunas': mapa.attrs.get('colunas', {}),
+        'operadoras': len(mapa),
+        'validado_em': time.time(),
+    })
+
+def renovar_validacao(meta):
+    """Servidor confirmou que o arquivo não mudou (304): reinicia o prazo de validade."""
+    meta['validado_em'] = time.time()
+    _gravar_meta(meta)
+
+def invalidar_cache():
+    """Força a próxima execução a baixar o cadastro de novo."""
+    for caminho in (CADASTRO_CACHE, CADASTRO_META):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+def cache_recente(meta, validade_horas=VALIDADE_HORAS):
+    return bool(meta) and time.time() - meta.get('validado_em', 0) < validade_horas * 3600
+
+def cabecalhos_condicionais(meta, arquivo):
+    """If-None-Match / If-Modified-Since para revalidar o cache do mesmo arquivo remoto."""
+    if not meta or meta.get('arquivo') != arquivo:
+        return {}
+    cabecalhos = {}
+    if meta.get('etag'):
+        cabecalhos['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        cabecalhos['If-Modified-Since'] = meta['last_modified']
+    return cabecalhos
@@ -0,0 +1,101 @@
+import sys
+import time
+import json
+import argparse
+import http.client
+import subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from api import HOST, PORTA
+
+# Teste de carga da API (api.py): N clientes em paralelo, cada um com uma
+# conexão keep-alive, repetindo as rotas abaixo. Reporta p50/p99 por rota.
+ROTAS = [
+    '/operadoras?q=saude 1',
+    '/operadoras?q=123',
+    '/uf',
+    '/crescimento?inicio=1T2025&fim=3T2025&limite=10',
+    '/crescimento?inicio=4T2024&fim=2T2025&uf=SP,RJ',
+    '/despesas?limite=100',
+    '/despesas?trimestre=2T2025&limite=100&apos=1000',
+    '/agregadas?uf=SP&limite=50',
+]
+
+def _cliente(host, porta, requisicoes, deslocamento):
+    """Faz as requisições numa única conexão; retorna [(rota, status, segundos)]."""
+    conn = http.client.HTTPConnection(host, porta, timeout=30)
+    medidas = []
+    for i in range(requisicoes):
+        rota = ROTAS[(i + deslocamento) % len(ROTAS)]
+        inicio = time.perf_counter()
+        conn.request('GET', rota.replace(' ', '%20'))
+        resposta = conn.getresponse()
+        resposta.read()
+        medidas.append((rota, resposta.status, time.perf_counter() - inicio))
+    conn.close()
+    return medidas
+
+def _aguardar(host, porta, segundos=10):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            conn = http.client.HTTPConnection(host, porta, timeout=1)
+            conn.request('GET', '/versao')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def _percentis(tempos):
+    ms = np.array(tempos) * 1000
+    return {'n': len(ms), 'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p99_ms': round(float(np.percentile(ms, 99)), 2), 'max_ms': round(float(ms.max()), 2)}
+
+def executar(host=HOST, porta=PORTA, clientes=8, requisicoes=200):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as pool:
+        resultados = list(pool.map(lambda c: _cliente(host, porta, requisicoes, c), range(clientes)))
+    duracao = time.perf_counter() - inicio
+    medidas = [m for r in resultados for m in r]
+    erros = sum(1 for _, status, _ in medidas if status != 200)
+
+    relatorio = {'clientes': clientes, 'requisicoes': len(medidas), 'erros': erros,
+                 'duracao_s': round(duracao, 2), 'req_s': round(len(medidas) / duracao, 1),
+                 'geral': _percentis([t for _, _, t in medidas]),
+                 'rotas': {rota: _percentis([t for r, _, t in medidas if r == rota]) for rota in ROTAS}}
+    print(f"{'rota':<52} {'n':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for rota, p in list(relatorio['rotas'].items()) + [('(todas)', relatorio['geral'])]:
+        print(f"{rota:<52} {p['n']:>6} {p['p50_ms']:>8} {p['p99_ms']:>8}")
+    print(f"\n{len(medidas)} requisições em {duracao:.2f}s ({relatorio['req_s']} req/s), {erros} com erro.")
+    return relatorio
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API local (p50/p99 por rota).")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--clientes', type=int, default=8, help="Conexões simultâneas. Padrão: 8")
+    parser.add_argument('--requisicoes', type=int, default=200, help="Requisições por cliente. Padrão: 200")
+    parser.add_argument('--subir', action='store_true',
+                        help="Sobe o api.py (banco padrão) num subprocesso durante o teste.")
+    parser.add_argument('--json', metavar='ARQUIVO', help="Também grava o relatório em JSON.")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.subir:
+        servidor = subprocess.Popen([sys.executable, __file__.replace('carga_api.py', 'api.py'),
+                                     '--host', args.host, '--porta', str(args.porta)])
+    try:
+        if not _aguardar(args.host, args.porta):
+            print(f"[ERRO] API não respondeu em http://{args.host}:{args.porta}")
+            sys.exit(1)
+        relatorio = executar(args.host, args.porta, args.clientes, args.requisicoes)
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    if relatorio['erros']:
+        sys.exit(1)
@@ -0,0 +1,194 @@
+import os
+import shutil
+import importlib.util
+import pandas as pd
+from saida import Saida, caminho_temporario
+
+# pyarrow é opcional: sem ele o pipeline continua só com o consolidado.csv.
+# Aqui só se verifica a instalação; o import (centenas de ms) fica para
+# quando o Parquet é de fato lido ou gravado (_pyarrow()).
+PARQUET_DISPONIVEL = importlib.util.find_spec('pyarrow') is not None
+
+# Configurações
+CSV_CONSOLIDADO = "data/consolidado.csv"
+PARQUET_DIR = "data/consolidado_parquet"  # particionado em ANO=.../TRIMESTRE=...
+# Strings muito repetidas: gravadas com dicionário (category -> dictionary do Arrow)
+COLUNAS_CATEGORICAS = ['CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE', 'DESCRICAO']
+COLUNAS_PARTICAO = ['ANO', 'TRIMESTRE']
+# Textos que o pd.read_csv do consolidado.csv já lia como nulos (ex.: 'N/A' sem match)
+VALORES_NULOS_CSV = ['', 'N/A', 'NA', 'NULL', 'nan', 'NaN', 'None', '<NA>']
+LINHAS_GRUPO = 100000  # linhas acumuladas por row group do Parquet
+
+def _pyarrow():
+    """(pyarrow, pyarrow.dataset, pyarrow.parquet), importados na primeira chamada."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    return pa, ds, pq
+
+def caminho_particao(ano, tri):
+    return os.path.join(PARQUET_DIR, f"ANO={ano}", f"TRIMESTRE={tri}")
+
+class SaidaParquet(Saida):
+    """Partição ANO/TRIMESTRE gravada em row groups de até LINHAS_GRUPO linhas.
+
+    Os chunks ficam num buffer só até completar um row group. O arquivo é
+    escrito num temporário oculto dentro da partição e, no fechar(),
+    substitui o conteúdo anterior dela.
+    """
+
+    def __init__(self, ano, tri, linhas_grupo=LINHAS_GRUPO):
+        super().__init__()
+        self.pasta = caminho_particao(ano, tri)
+        self.arquivo = os.path.join(self.pasta, "parte-0.parquet")
+        self.linhas_grupo = linhas_grupo
+        self._temporario = caminho_temporario(self.arquivo)
+        self._buffer = []
+        self._no_buffer = 0
+        self._escritor = None
+        self._schema = None
+
+    def escrever(self, df):
+        if df.empty:
+            return
+        self._buffer.append(df.drop(columns=COLUNAS_PARTICAO))
+        self._no_buffer += len(df)
+        self.linhas += len(df)
+        if self._no_buffer >= self.linhas_grupo:
+            self._descarregar()
+
+    def _descarregar(self):
+        if not self._buffer:
+            return
+        df = pd.concat(self._buffer, ignore_index=True)
+        self._buffer, self._no_buffer = [], 0
+        for col in COLUNAS_CATEGORICAS:
+            df[col] = df[col].astype('category')
+        pa, _, pq = _pyarrow()
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        if self._escritor is None:
+            # Índices do dicionário em int32: o int8/int16 do primeiro grupo
+            # pode não comportar as categorias dos seguintes
+            self._schema = pa.schema([
+                campo.with_type(pa.dictionary(pa.int32(), campo.type.value_type))
+                if pa.types.is_dictionary(campo.type) else campo
+                for campo in tabela.schema], metadata=tabela.schema.metadata)
+            os.makedirs(self.pasta, exist_ok=True)
+            self._escritor = pq.ParquetWriter(self._temporario, self._schema)
+        self._escritor.write_table(tabela.cast(self._schema))
+
+    def fechar(self):
+        self._descarregar()
+        if self._escritor is None:
+            return None
+        self._escritor.close()
+        self._escritor = None
+        for nome in os.listdir(self.pasta):
+            if not nome.startswith('.'):
+                os.remove(os.path.join(self.pasta, nome))
+        os.replace(self._temporario, self.arquivo)
+        return self.arquivo
+
+    def descartar(self):
+        self._buffer, self._no_buffer = [], 0
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+def limpar_particoes(validos):
+    """Remove partições de trimestres que não existem mais em data/raw."""
+    if not os.path.isdir(PARQUET_DIR): return
+    validos = {os.path.abspath(os.path.dirname(a)) for a in validos if a}
+    for raiz, _, nomes in os.walk(PARQUET_DIR, topdown=False):
+        if nomes and os.path.abspath(raiz) not in validos:
+            shutil.rmtree(raiz)
+        elif raiz != PARQUET_DIR and not os.listdir(raiz):
+            os.rmdir(raiz)
+
+def remover_parquet():
+    """Apaga o dataset Parquet (ex.: consolidado.csv regravado por fora do processor.py)."""
+    if os.path.isdir(PARQUET_DIR):
+        shutil.rmtree(PARQUET_DIR)
+        return True
+    return False
+
+def usar_parquet():
+    return PARQUET_DISPONIVEL and os.path.isdir(PARQUET_DIR) and any(
+        not a.startswith('.') for _, _, nomes in os.walk(PARQUET_DIR) for a in nomes)
+
+def _dataset_parquet():
+    # Lista ordenada de arquivos: mesma ordem de linhas do consolidado.csv
+    arquivos = sorted(os.path.join(raiz, a) for raiz, _, nomes in os.walk(PARQUET_DIR)
+                      for a in nomes if not a.startswith('.'))
+    _, ds, _ = _pyarrow()
+    return ds.dataset(arquivos, format='parquet', partition_base_dir=PARQUET_DIR,
+                      partitioning=ds.partitioning(flavor='hive'))
+
+def _ajustar_tipos(df):
+    """Aproxima o DataFrame lido do Parquet do que o pd.read_csv devolveria."""
+    # Mesma semântica de nulos do CSV; só mexe no dicionário, não nas linhas
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            nulos = [v for v in VALORES_NULOS_CSV if v in df[col].cat.categories]
+            if nulos: df[col] = df[col].cat.remove_categories(nulos)
+    if 'ANO' in df.columns and pd.api.types.is_integer_dtype(df['ANO']):
+        df['ANO'] = df['ANO'].astype('int64')
+    return df
+
+def tipos_consolidado(df):
+    """Consolidado recém-processado (em memória) com os mesmos tipos que ler_consolidado devolve.
+
+    Strings repetidas viram category, 'N/A' vira nulo e ANO vira inteiro,
+    como na leitura do Parquet.
+    """
+    df = df.copy()
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if 'ANO' in df.columns:
+        anos = pd.to_numeric(df['ANO'], errors='coerce')
+        if anos.notna().all():
+            df['ANO'] = anos
+    return _ajustar_tipos(df)
+
+def ler_consolidado(colunas=None):
+    """Lê o consolidado, preferindo o Parquet particionado e só as colunas pedidas.
+
+    Retorna None se não houver nenhuma das saídas do processor.py.
+    """
+    if usar_parquet():
+        return _ajustar_tipos(_dataset_parquet().to_table(columns=colunas).to_pandas())
+    if os.path.exists(CSV_CONSOLIDADO):
+        return pd.read_csv(CSV_CONSOLIDADO, sep=';', encoding='utf-8', usecols=colunas)
+    return None
+
+def ler_consolidado_em_lotes(colunas=None, tamanho_lote=50000, trimestres=None):
+    """Como ler_consolidado, mas em DataFrames de até tamanho_lote linhas (memória constante).
+
+    trimestres restringe a leitura a esses valores de TRIMESTRE (no Parquet
+    só as partições correspondentes são abertas). Não gera nada se não
+    houver saída do processor.py.
+    """
+    if usar_parquet():
+        _, ds, _ = _pyarrow()
+        filtro = ds.field('TRIMESTRE').isin(list(trimestres)) if trimestres else None
+        for lote in _dataset_parquet().to_batches(columns=colunas, filter=filtro, batch_size=tamanho_lote):
+            if lote.num_rows:
+                yield _ajustar_tipos(lote.to_pandas())
+    elif os.path.exists(CSV_CONSOLIDADO):
+        usecols = colunas
+        if trimestres and colunas and 'TRIMESTRE' not in colunas:
+            usecols = colunas + ['TRIMESTRE']
+        for lote in pd.read_csv(CSV_CONSOLIDADO, sep=';', encoding='utf-8', usecols=usecols,
+                                chunksize=tamanho_lote):
+            if trimestres:
+                lote = lote[lote['TRIMESTRE'].isin(trimestres)]
+            if colunas:
+                lote = lote[[c for c in lote.columns if c in colunas]]
+            if len(lote):
+                yield lote
+
+def consolidado_disponivel():
+    return usar_parquet() or os.path.exists(CSV_CONSOLIDADO)
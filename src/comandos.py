@@ -0,0 +1,102 @@
+import argparse
+
+# Opções de linha de comando de cada script, só com a biblioteca padrão: o
+# ans.py monta o --help e valida os argumentos de qualquer comando sem
+# importar pandas, numpy, pyarrow, requests ou lxml. O script só é
+# importado depois, para executar. Cada script usa o mesmo parser no seu cli().
+
+# Padrões usados nas opções (os scripts importam daqui)
+BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/"
+WORKERS_EXTRACAO = 4  # threads para varredura e downloads
+PADRAO_DESCRICAO = 'EVENTO|SINISTRO'
+# Tratamento de CNPJ inválido aceito por processor.py e aggregator.py
+MODOS_CNPJ_INVALIDO = ('marcar', 'remover')
+
+def parser_extraction(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Download dos demonstrativos contábeis da ANS.")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help="Raiz do diretório de demonstrações contábeis (ex.: servidor local de testes).")
+    parser.add_argument('--workers', type=int, default=WORKERS_EXTRACAO,
+                        help=f"Threads para varredura e downloads. Padrão: {WORKERS_EXTRACAO}")
+    return parser
+
+def parser_processor(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="ETL dos demonstrativos contábeis da ANS.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processos em paralelo (um trimestre por processo). Padrão: 1")
+    parser.add_argument('--full', action='store_true',
+                        help="Ignora o manifesto e reprocessa todos os trimestres.")
+    parser.add_argument('--cnpj', choices=MODOS_CNPJ_INVALIDO,
+                        help="Valida o CNPJ (módulo 11) e marca (coluna CNPJ_VALIDO) ou remove as linhas inválidas.")
+    parser.add_argument('--cadastro', metavar='CSV',
+                        help="CSV local do cadastro de operadoras (no lugar do download da ANS).")
+    parser.add_argument('--atualizar-cadastro', action='store_true',
+                        help="Descarta o cache local do cadastro de operadoras e baixa de novo.")
+    parser.add_argument('--filtro', default=PADRAO_DESCRICAO, metavar='REGEX',
+                        help=f"Regex procurada na DESCRICAO (em maiúsculas). Padrão: {PADRAO_DESCRICAO}")
+    parser.add_argument('--contas', metavar='PREFIXOS',
+                        help="Prefixos de CD_CONTA_CONTABIL aceitos, separados por vírgula (ex.: 41), "
+                             "aplicados antes da regex quando o arquivo tem a coluna.")
+    return parser
+
+def parser_aggregator(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Estatísticas de despesas por Operadora/UF (Item 2.3).")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Agrega lote a lote (n, soma e M2 de Welford por grupo), com memória proporcional ao número de grupos.")
+    parser.add_argument('--cnpj', choices=MODOS_CNPJ_INVALIDO,
+                        help="Valida o CNPJ (módulo 11) e conta por grupo (QTD_CNPJ_INVALIDO) ou remove as linhas inválidas.")
+    return parser
+
+def parser_db_loader(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Cria o banco SQLite e importa os CSVs.")
+    parser.add_argument('--fast', action='store_true',
+                        help="Carga rápida: mantém o DDL, executemany em lotes numa transação e índices no final.")
+    parser.add_argument('--trimestres',
+                        help="Com --fast: recarrega só estes trimestres (ex.: 3T2025,4T2025) e atualiza o resumo deles.")
+    parser.add_argument('--compacto', action='store_true',
+                        help="Esquema compacto (chaves inteiras, centavos, dimensão de descrições); implica --fast.")
+    return parser
+
+def parser_analytics_queries(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Relatórios analíticos SQL (Item 3.4).")
+    parser.add_argument('--check-plans', action='store_true',
+                        help="Só valida o EXPLAIN QUERY PLAN dos relatórios e o filtro de UF "
+                             "(sai com 1 se houver full scan ou linha fora das UFs pedidas).")
+    parser.add_argument('--inicio', default='1T2025', help="Trimestre inicial do crescimento. Padrão: 1T2025")
+    parser.add_argument('--fim', default='3T2025', help="Trimestre final do crescimento. Padrão: 3T2025")
+    parser.add_argument('--limite', type=int, default=5, help="Linhas dos rankings. Padrão: 5")
+    parser.add_argument('--uf', metavar='UFS', help="Restringe os relatórios a estas UFs (ex.: SP,RJ).")
+    return parser
+
+def parser_pipeline(prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+        description="ETL, agregação e carga do banco num único processo, sem CSVs intermediários.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processos em paralelo no ETL (um trimestre por processo). Padrão: 1")
+    parser.add_argument('--cadastro', metavar='CSV',
+                        help="CSV local do cadastro de operadoras (no lugar do download da ANS).")
+    parser.add_argument('--atualizar-cadastro', action='store_true',
+                        help="Descarta o cache local do cadastro de operadoras e baixa de novo.")
+    parser.add_argument('--cnpj', choices=MODOS_CNPJ_INVALIDO,
+                        help="Valida o CNPJ (módulo 11) e marca ou remove as linhas inválidas.")
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help="Também grava data/consolidado.csv e data/despesas_agregadas.csv.")
+    parser.add_argument('--compacto', action='store_true',
+                        help="Banco no esquema compacto (chaves inteiras, centavos, dimensão de descrições).")
+    parser.add_argument('--consultas', action='store_true',
+                        help="Roda os relatórios do analytics_queries.py no final.")
+    parser.add_argument('--filtro', default=PADRAO_DESCRICAO, metavar='REGEX',
+                        help=f"Regex procurada na DESCRICAO (em maiúsculas). Padrão: {PADRAO_DESCRICAO}")
+    parser.add_argument('--contas', metavar='PREFIXOS',
+                        help="Prefixos de CD_CONTA_CONTABIL aceitos, separados por vírgula (ex.: 41).")
+    return parser
+
+# Script -> parser das opções dele
+PARSERS = {
+    'extraction': parser_extraction,
+    'processor': parser_processor,
+    'aggregator': parser_aggregator,
+    'db_loader': parser_db_loader,
+    'analytics_queries': parser_analytics_queries,
+    'pipeline': parser_pipeline,
+}
@@ -0,0 +1,302 @@
+import os
+import json
+import queue
+import sqlite3
+import pathlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+from schema import schema_compacto, periodo, versao_dados
+
+# Relatórios analíticos parametrizados (períodos, UFs, limites) sobre o
+# banco do db_loader, com conexões somente leitura reaproveitadas e cache
+# de resultados por consulta+parâmetros. O cache vale enquanto a versão em
+# versao_dados (incrementada a cada carga) não muda.
+DB_PATH = "sql/teste_ans.db"
+TAMANHO_POOL = 4
+TAMANHO_CACHE = 256  # resultados guardados (os mais antigos saem primeiro)
+
+# Filtro opcional de UF: a lista vai como um único parâmetro JSON
+FILTRO_UF = " AND op.uf IN (SELECT value FROM json_each(:ufs))"
+FILTRO_UF_OPERADORA = " AND t.reg_ans IN (SELECT reg_ans FROM operadoras WHERE uf IN (SELECT value FROM json_each(:ufs)))"
+
+# QUERY 1: Top N Operadoras com Maior Crescimento (%) entre dois trimestres
+# Totais por operadora/trimestre vêm do resumo materializado pelo db_loader
+QUERY_CRESCIMENTO = """
+    WITH inicio AS (
+        SELECT reg_ans, total_despesas as total FROM despesas_operadora_trimestre WHERE trimestre = :inicio
+    ),
+    fim AS (
+        SELECT reg_ans, total_despesas as total FROM despesas_operadora_trimestre WHERE trimestre = :fim
+    )
+    SELECT
+        op.razao_social,
+        inicio.total as valor_inicial,
+        fim.total as valor_final,
+        ROUND(((fim.total - inicio.total) * 1.0 / inicio.total) * 100, 2) as crescimento_pct
+    FROM inicio
+    JOIN fim ON inicio.reg_ans = fim.reg_ans
+    JOIN operadoras op ON inicio.reg_ans = op.reg_ans
+    -- Filtro para evitar distorções com valores irrisórios (ex: cresceu de R$1 pra R$10)
+    WHERE inicio.total > :valor_minimo{filtro_uf}
+    ORDER BY crescimento_pct DESC
+    LIMIT :limite;
+    """
+
+# QUERY 2: Distribuição de Despesas por UF (Top N)
+QUERY_DISTRIBUICAO_UF = """
+    SELECT
+        op.uf,
+        SUM(d.valor_despesa) as total_despesas,
+        AVG(d.valor_despesa) as media_por_lancamento,
+        -- Cálculo da média por operadora (Total do UF / Qtd Operadoras Únicas no UF)
+        SUM(d.valor_despesa) / COUNT(DISTINCT op.reg_ans) as media_por_operadora
+    FROM despesas d
+    JOIN operadoras op ON d.reg_ans = op.reg_ans
+    WHERE op.uf != 'ND'{filtro_uf}
+    GROUP BY op.uf
+    ORDER BY total_despesas DESC
+    LIMIT :limite;
+    """
+
+# QUERY 3: Operadoras acima da média em >= N trimestres
+QUERY_ACIMA_MEDIA = """
+    WITH totais_operadora_trimestre AS (
+        -- Quanto cada operadora gastou por trimestre (resumo materializado)
+        SELECT reg_ans, trimestre, total_despesas as total_op
+        FROM despesas_operadora_trimestre
+    ),
+    media_mercado_trimestre AS (
+        -- Qual foi a média do mercado naquele trimestre
+        SELECT trimestre, AVG(total_op) as media_mercado
+        FROM totais_operadora_trimestre
+        GROUP BY trimestre
+    ),
+    operadoras_acima AS (
+        -- Filtra quem ficou acima da média (a média é sempre a do mercado inteiro)
+        SELECT t.reg_ans
+        FROM totais_operadora_trimestre t
+        JOIN media_mercado_trimestre m ON t.trimestre = m.trimestre
+        WHERE t.total_op > m.media_mercado{filtro_uf}
+    )
+    -- Conta quantas vezes cada operadora apareceu acima da média e filtra >= N
+    SELECT COUNT(*) as qtd_operadoras_consistentes
+    FROM (
+        SELECT reg_ans
+        FROM operadoras_acima
+        GROUP BY reg_ans
+        HAVING COUNT(*) >= :min_trimestres
+    );
+    """
+
+# Mesmos relatórios no esquema compacto (db_loader.py --compacto): período
+# inteiro (1T2025 -> 20251) e valores em centavos, convertidos para reais
+# só no resultado final
+QUERY_CRESCIMENTO_COMPACTA = """
+    WITH inicio AS (
+        SELECT reg_ans, total_centavos as total FROM despesas_operadora_trimestre WHERE periodo = :inicio
+    ),
+    fim AS (
+        SELECT reg_ans, total_centavos as total FROM despesas_operadora_trimestre WHERE periodo = :fim
+    )
+    SELECT
+        op.razao_social,
+        inicio.total / 100.0 as valor_inicial,
+        fim.total / 100.0 as valor_final,
+        ROUND(((fim.total - inicio.total) * 1.0 / inicio.total) * 100, 2) as crescimento_pct
+    FROM inicio
+    JOIN fim ON inicio.reg_ans = fim.reg_ans
+    JOIN operadoras op ON inicio.reg_ans = op.reg_ans
+    -- valor_minimo em centavos
+    WHERE inicio.total > :valor_minimo{filtro_uf}
+    ORDER BY crescimento_pct DESC
+    LIMIT :limite;
+    """
+
+QUERY_DISTRIBUICAO_UF_COMPACTA = """
+    SELECT
+        op.uf,
+        SUM(d.valor_centavos) / 100.0 as total_despesas,
+        AVG(d.valor_centavos) / 100.0 as media_por_lancamento,
+        SUM(d.valor_centavos) / 100.0 / COUNT(DISTINCT op.reg_ans) as media_por_operadora
+    FROM despesas d
+    JOIN operadoras op ON d.reg_ans = op.reg_ans
+    WHERE op.uf != 'ND'{filtro_uf}
+    GROUP BY op.uf
+    ORDER BY total_despesas DESC
+    LIMIT :limite;
+    """
+
+QUERY_ACIMA_MEDIA_COMPACTA = """
+    WITH media_mercado_periodo AS (
+        SELECT periodo, AVG(total_centavos) as media_mercado
+        FROM despesas_operadora_trimestre
+        GROUP BY periodo
+    ),
+    operadoras_acima AS (
+        SELECT t.reg_ans
+        FROM despesas_operadora_trimestre t
+        JOIN media_mercado_periodo m ON t.periodo = m.periodo
+        WHERE t.total_centavos > m.media_mercado{filtro_uf}
+    )
+    SELECT COUNT(*) as qtd_operadoras_consistentes
+    FROM (
+        SELECT reg_ans
+        FROM operadoras_acima
+        GROUP BY reg_ans
+        HAVING COUNT(*) >= :min_trimestres
+    );
+    """
+
+QUERIES = {
+    'crescimento': QUERY_CRESCIMENTO,
+    'distribuicao_uf': QUERY_DISTRIBUICAO_UF,
+    'acima_media': QUERY_ACIMA_MEDIA,
+}
+QUERIES_COMPACTAS = {
+    'crescimento': QUERY_CRESCIMENTO_COMPACTA,
+    'distribuicao_uf': QUERY_DISTRIBUICAO_UF_COMPACTA,
+    'acima_media': QUERY_ACIMA_MEDIA_COMPACTA,
+}
+# Parâmetros de cada relatório e seus valores padrão (os do enunciado)
+PARAMETROS = {
+    'crescimento': {'inicio': '1T2025', 'fim': '3T2025', 'limite': 5, 'ufs': None, 'valor_minimo': 1000},
+    'distribuicao_uf': {'limite': 5, 'ufs': None},
+    'acima_media': {'min_trimestres': 2, 'ufs': None},
+}
+
+def normalizar_parametros(nome, params):
+    """Completa com os padrões e deixa os parâmetros hashable (chave do cache)."""
+    desconhecidos = set(params) - set(PARAMETROS[nome])
+    if desconhecidos:
+        raise TypeError(f"{nome}: parâmetros desconhecidos {sorted(desconhecidos)}")
+    valores = dict(PARAMETROS[nome], **params)
+    if valores['ufs']:
+        ufs = [valores['ufs']] if isinstance(valores['ufs'], str) else valores['ufs']
+        valores['ufs'] = tuple(sorted({uf.strip().upper() for uf in ufs}))
+    else:
+        valores['ufs'] = None
+    return tuple(sorted(valores.items()))
+
+def montar(nome, compacto, params):
+    """SQL e parâmetros nomeados de um relatório para o esquema do banco."""
+    valores = dict(params)
+    ufs = valores.pop('ufs')
+    filtro = (FILTRO_UF_OPERADORA if nome == 'acima_media' else FILTRO_UF) if ufs else ""
+    sql = (QUERIES_COMPACTAS if compacto else QUERIES)[nome].format(filtro_uf=filtro)
+    if ufs:
+        valores['ufs'] = json.dumps(list(ufs))
+    if compacto:
+        for chave in ('inicio', 'fim'):
+            if chave in valores:
+                valores[chave] = periodo(valores[chave])
+        if 'valor_minimo' in valores:
+            valores['valor_minimo'] = round(valores['valor_minimo'] * 100)
+    return sql, valores
+
+class PoolLeitura:
+    """Conexões somente leitura (mode=ro) reaproveitadas entre consultas e threads."""
+
+    def __init__(self, caminho=DB_PATH, tamanho=TAMANHO_POOL):
+        self.caminho = caminho
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    def _abrir(self):
+        uri = pathlib.Path(os.path.abspath(self.caminho)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def conexao(self):
+        with self._vagas:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                conn = self._abrir()
+            try:
+                yield conn
+            finally:
+                self._livres.put(conn)
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                return
+
+class ConsultasAnaliticas:
+    """Relatórios do banco com cache de resultados por versão dos dados.
+
+    Cada chamada lê versao_dados (uma linha, pela PK); se mudou desde a
+    última consulta, o cache inteiro é descartado. Banco sem versao_dados
+    (criado por uma versão anterior do db_loader) é consultado sem cache.
+    Os DataFrames devolvidos são cópias: podem ser alterados à vontade.
+    """
+
+    def __init__(self, caminho=DB_PATH, tamanho_pool=TAMANHO_POOL, tamanho_cache=TAMANHO_CACHE):
+        self.pool = PoolLeitura(caminho, tamanho_pool)
+        self.tamanho_cache = tamanho_cache
+        self._cache = OrderedDict()
+        self._versao = None
+        self._compacto = None
+        self._trava = threading.Lock()
+        self.acertos = self.falhas = 0
+
+    def consultar(self, nome, **params):
+        chave = (nome, normalizar_parametros(nome, params))
+        with self.pool.conexao() as conn:
+            cursor = conn.cursor()
+            versao = versao_dados(cursor)
+            with self._trava:
+                if versao is None or versao != self._versao:
+                    self._cache.clear()
+                    self._versao = versao
+                    self._compacto = schema_compacto(cursor)
+                elif chave in self._cache:
+                    self._cache.move_to_end(chave)
+                    self.acertos += 1
+                    return self._cache[chave].copy()
+                self.falhas += 1
+                compacto = self._compacto
+            sql, valores = montar(nome, compacto, chave[1])
+            df = pd.read_sql_query(sql, conn, params=valores)
+        if versao is not None:
+            with self._trava:
+                if versao == self._versao:
+                    self._cache[chave] = df
+                    if len(self._cache) > self.tamanho_cache:
+                        self._cache.popitem(last=False)
+        return df.copy()
+
+    def crescimento(self, inicio='1T2025', fim='3T2025', limite=5, ufs=None, valor_minimo=1000):
+        """Top operadoras por crescimento % entre dois trimestres (total inicial > valor_minimo)."""
+        return self.consultar('crescimento', inicio=inicio, fim=fim, limite=limite, ufs=ufs,
+                              valor_minimo=valor_minimo)
+
+    def distribuicao_uf(self, limite=5, ufs=None):
+        """UFs com maiores despesas: total, média por lançamento e por operadora."""
+        return self.consultar('distribuicao_uf', limite=limite, ufs=ufs)
+
+    def acima_media(self, min_trimestres=2, ufs=None):
+        """Quantas operadoras ficaram acima da média do mercado em >= min_trimestres trimestres."""
+        return self.consultar('acima_media', min_trimestres=min_trimestres, ufs=ufs)
+
+    def versao(self):
+        with self.pool.conexao() as conn:
+            return versao_dados(conn.cursor())
+
+    def fechar(self):
+        self.pool.fechar()
+
+_padrao = None
+
+def consultas_padrao():
+    """Instância compartilhada (pool e cache) sobre DB_PATH."""
+    global _padrao
+    if _padrao is None:
+        _padrao = ConsultasAnaliticas()
+    return _padrao
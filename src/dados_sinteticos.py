@@ -0,0 +1,127 @@
+import os
+import json
+import zipfile
+import argparse
+import numpy as np
+from validator import PESOS_DV1, PESOS_DV2, digito_verificador
+
+# Gera dados no mesmo formato dos arquivos da ANS, para rodar o pipeline e
+# o benchmark sem acesso a dadosabertos.ans.gov.br:
+#   data/raw/<ANO>_<nTANO>/<nTANO>.zip  (CSV ';' com aspas na DESCRICAO)
+#   cadastro_operadoras.csv             (cadastro de operadoras ativas)
+RAW_DIR = "data/raw"
+CADASTRO_FILE = "cadastro_operadoras.csv"
+PARAMETROS_FILE = "dados_sinteticos.json"
+TRIMESTRES = [("2024", "4T2024"), ("2025", "1T2025"), ("2025", "2T2025"), ("2025", "3T2025")]
+LOTE = 200000  # linhas formatadas por vez (memória limitada mesmo em 10^7 linhas)
+
+# (conta contábil, descrição): as de grupo 41 casam com o filtro EVENTO|SINISTRO
+CONTAS = [
+    ("411111", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS"),
+    ("411211", "Eventos indenizáveis líquidos / Sinistros retidos"),
+    ("414111", "Sinistros a liquidar"),
+    ("311111", "CONTRAPRESTAÇÕES EFETIVAS DE PLANO DE ASSISTÊNCIA À SAÚDE"),
+    ("461111", "DESPESAS ADMINISTRATIVAS"),
+    ("351111", "RECEITAS DE ASSISTÊNCIA À SAÚDE NÃO RELACIONADA COM PLANOS"),
+]
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'BA', 'SC', 'PE', 'GO', 'DF']
+MODALIDADES = ['Medicina de Grupo', 'Cooperativa Médica', 'Odontologia de Grupo', 'Autogestão', 'Seguradora Especializada em Saúde']
+
+def _cnpjs(rng, quantidade, fracao_invalidos=0.02):
+    """CNPJs com dígitos verificadores corretos, exceto uma pequena fração (para o validator)."""
+    digitos = rng.integers(0, 10, size=(quantidade, 14))
+    for pesos, pos in ((PESOS_DV1, 12), (PESOS_DV2, 13)):
+        digitos[:, pos] = digito_verificador(digitos[:, :pos], pesos)
+    invalidos = rng.random(quantidade) < fracao_invalidos
+    digitos[invalidos, 13] = (digitos[invalidos, 13] + 1) % 10
+    return [''.join(map(str, d)) for d in digitos]
+
+def gerar_cadastro(destino, operadoras, rng):
+    """Cadastro com ~95% das operadoras (o resto cai no caminho 'sem match' do processor)."""
+    cnpjs = _cnpjs(rng, operadoras)
+    linhas = ["Registro_ANS;CNPJ;Razao_Social;Nome_Fantasia;Modalidade;UF;Data_Registro_ANS"]
+    for reg in range(1, operadoras + 1):
+        if rng.random() < 0.05:
+            continue
+        cnpj = cnpjs[reg - 1]
+        cnpj_formatado = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+        linhas.append(f"{reg:06d};{cnpj_formatado};OPERADORA SAÚDE {reg} LTDA;SAÚDE {reg};"
+                      f"{MODALIDADES[reg % len(MODALIDADES)]};{UFS[reg % len(UFS)]};2000-01-01")
+    # O arquivo da ANS vem em latin1
+    with open(destino, 'w', encoding='latin1') as f:
+        f.write("\n".join(linhas) + "\n")
+
+def _formatar_valores(rng, n):
+    """Saldos nos formatos que aparecem nos arquivos: '1.234,56', '1234,56', '1234.56', inteiro e vazio."""
+    inteiros = rng.integers(-5000, 5000000, size=n)
+    centavos = rng.integers(0, 100, size=n)
+    formatos = rng.choice(5, size=n, p=[0.35, 0.35, 0.15, 0.1, 0.05])
+    valores = []
+    for i, c, fmt in zip(inteiros.tolist(), centavos.tolist(), formatos.tolist()):
+        if fmt == 0:
+            valores.append(f"{i:,}".replace(',', '.') + f",{c:02d}")
+        elif fmt == 1:
+            valores.append(f"{i},{c:02d}")
+        elif fmt == 2:
+            valores.append(f"{i}.{c:02d}")
+        elif fmt == 3:
+            valores.append(str(i))
+        else:
+            valores.append("")
+    return valores
+
+def gerar_trimestre(caminho_zip, nome_csv, linhas, operadoras, encoding, rng):
+    """Escreve o CSV direto dentro do ZIP, lote a lote."""
+    os.makedirs(os.path.dirname(caminho_zip), exist_ok=True)
+    with zipfile.ZipFile(caminho_zip, 'w', zipfile.ZIP_DEFLATED) as z:
+        with z.open(nome_csv, 'w', force_zip64=True) as f:
+            f.write("DATA;REG_ANS;CD_CONTA_CONTABIL;DESCRICAO;VL_SALDO_INICIAL;VL_SALDO_FINAL\n".encode(encoding))
+            for inicio in range(0, linhas, LOTE):
+                n = min(LOTE, linhas - inicio)
+                regs = rng.integers(1, operadoras + 1, size=n).tolist()
+                contas = rng.integers(0, len(CONTAS), size=n).tolist()
+                valores = _formatar_valores(rng, n)
+                texto = "".join(f'2025-01-01;{r:06d};{CONTAS[c][0]};"{CONTAS[c][1]}";0;{v}\n'
+                                for r, c, v in zip(regs, contas, valores))
+                f.write(texto.encode(encoding))
+
+def gerar(destino=".", linhas=100000, operadoras=1500, semente=42):
+    """Gera linhas (total, divididas entre os trimestres) em destino/data/raw e o cadastro.
+
+    Os trimestres alternam utf-8 e latin1, como nos arquivos reais.
+    Retorna o caminho do cadastro.
+    """
+    rng = np.random.default_rng(semente)
+    por_trimestre = [linhas // len(TRIMESTRES) + (1 if i < linhas % len(TRIMESTRES) else 0)
+                     for i in range(len(TRIMESTRES))]
+    for i, ((ano, tri), n) in enumerate(zip(TRIMESTRES, por_trimestre)):
+        encoding = 'latin1' if i % 2 == 0 else 'utf-8'
+        caminho_zip = os.path.join(destino, RAW_DIR, f"{ano}_{tri}", f"{tri}.zip")
+        print(f"   [v] {tri}: {n} linhas ({encoding})")
+        gerar_trimestre(caminho_zip, f"{tri}.csv", n, operadoras, encoding, rng)
+
+    caminho_cadastro = os.path.join(destino, CADASTRO_FILE)
+    gerar_cadastro(caminho_cadastro, operadoras, rng)
+    # Parâmetros usados: o benchmark só regera se mudarem
+    with open(os.path.join(destino, PARAMETROS_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'linhas': linhas, 'operadoras': operadoras, 'semente': semente}, f)
+    return caminho_cadastro
+
+def parametros_gerados(destino):
+    """Parâmetros da última geração em destino (None se não houver)."""
+    caminho = os.path.join(destino, PARAMETROS_FILE)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera demonstrativos contábeis sintéticos no layout da ANS.")
+    parser.add_argument('--destino', default=".", help="Pasta onde criar data/raw e o cadastro. Padrão: pasta atual")
+    parser.add_argument('--linhas', type=int, default=100000, help="Total de linhas (somando os trimestres). Padrão: 100000")
+    parser.add_argument('--operadoras', type=int, default=1500, help="Quantidade de operadoras. Padrão: 1500")
+    parser.add_argument('--semente', type=int, default=42, help="Semente do gerador (dados reprodutíveis). Padrão: 42")
+    args = parser.parse_args()
+    print("--- Gerando dados sintéticos ---")
+    cadastro = gerar(args.destino, args.linhas, args.operadoras, args.semente)
+    print(f"SUCESSO! Cadastro: {cadastro} (use python src/processor.py --cadastro {cadastro})")
@@ -1,17 +1,39 @@
 import sqlite3
 import pandas as pd
 import os
+import time
+from colunar import ler_consolidado, ler_consolidado_em_lotes, consolidado_disponivel
+from schema import (TABELAS, TABELAS_COMPACTAS, INDICES, INDICES_COMPACTOS, criar_tabelas, criar_indices,
+                    remover_indices, schema_compacto, periodo, marcar_versao, atualizar_busca, tabelas_divergentes)
+from processor import centavos_de_float
+from instrumentacao import etapa, anotar, salvar_relatorio
+from comandos import parser_db_loader
 
 # Configurações
 DB_PATH = "sql/teste_ans.db"
 CSV_CONSOLIDADO = "data/consolidado.csv"
 CSV_AGREGADO = "data/despesas_agregadas.csv"
+TAMANHO_LOTE = 50000
+# PRAGMAs da carga rápida
+PRAGMAS_CARGA = {
+    'cache_size': -200000,  # negativo = KiB (~200 MB)
+    'temp_store': 'MEMORY',
+}
+# Só na carga completa, que é refeita do zero se falhar: sem journal em
+# disco nem fsync a cada página. A incremental (--trimestres) grava sobre
+# dados já carregados e fica com o journal e o synchronous padrão, para um
+# crash no meio não corromper o banco.
+PRAGMAS_CARGA_COMPLETA = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+}
 # Função para conectar ao banco de dados
 def get_connection():
     return sqlite3.connect(DB_PATH)
 # Função para criar tabelas e estruturar o banco de dados
-def setup_database():
-    print("--- Configurando Banco de Dados (SQLite) ---")
+# Retorna as tabelas apagadas e recriadas (a carga seguinte tem de ser completa)
+def setup_database(compacto=False):
+    print("--- Configurando Banco de Dados (SQLite" + (", esquema compacto" if compacto else "") + ") ---")
     
     # Garante que a pasta sql existe
     os.makedirs("sql", exist_ok=True)
@@ -19,57 +41,32 @@ def setup_database():
     conn = get_connection()
     cursor = conn.cursor()
     
-    # 1. DDL - Criação das Tabelas
+    # 1. DDL - Criação das Tabelas (definições em schema.py)
     print("1. Criando tabelas...")
+    recriadas = criar_tabelas(cursor, compacto)
+    if recriadas:
+        print(f"   [!] Troca de esquema ou estrutura diferente do DDL, tabelas recriadas (vazias): {', '.join(recriadas)}")
     
-    # Tabela Operadoras (Dimensão)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS operadoras (
-        reg_ans TEXT PRIMARY KEY,
-        cnpj TEXT,
-        razao_social TEXT,
-        uf TEXT,
-        modalidade TEXT
-    );
-    """)
-    
-    # Tabela Despesas (Fatos)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS despesas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        reg_ans TEXT,
-        trimestre TEXT,
-        ano INTEGER,
-        valor_despesa REAL,
-        descricao TEXT,
-        FOREIGN KEY (reg_ans) REFERENCES operadoras(reg_ans)
-    );
-    """)
-    
-    # Tabela Agregada (Para consultas rápidas/Dashboard)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS despesas_agregadas (
-        razao_social TEXT,
-        uf TEXT,
-        total_despesas REAL,
-        media_trimestral REAL,
-        desvio_padrao REAL,
-        qtd_lancamentos INTEGER
-    );
-    """)
+    # 2. Índices de cobertura usados pelos relatórios
+    print("2. Criando índices...")
+    criar_indices(cursor, compacto)
+    marcar_versao(cursor)
     
     conn.commit()
     conn.close()
     print("   [v] Tabelas criadas com sucesso.")
+    return recriadas
 # Função para importar dados dos CSVs para o banco de dados
 def import_data():
     print("\n--- Iniciando Importação de Dados ---")
     conn = get_connection()
     
     # 1. Importar Operadoras (Normalização)
-    if os.path.exists(CSV_CONSOLIDADO):
+    colunas = ['REG_ANS', 'CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE', 'TRIMESTRE', 'ANO', 'VALOR_DESPESA', 'DESCRICAO']
+    df = ler_consolidado(colunas)
+    if df is not None:
+        anotar(linhas_entrada=len(df))
         print("1. Carregando Operadoras...")
-        df = pd.read_csv(CSV_CONSOLIDADO, sep=';', encoding='utf-8')
         
         # Extrai apenas as colunas únicas de operadoras (remove duplicatas)
         df_ops = df[['REG_ANS', 'CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE']].drop_duplicates(subset=['REG_ANS'])
@@ -79,6 +76,7 @@ def import_data():
         
         # Insere no banco
         df_ops.to_sql('operadoras', conn, if_exists='replace', index=False)
+        anotar(linhas_saida=len(df_ops))
         print(f"   [v] {len(df_ops)} operadoras importadas.")
         
         # 2. Importar Despesas
@@ -87,6 +85,7 @@ def import_data():
         df_desp.columns = ['reg_ans', 'trimestre', 'ano', 'valor_despesa', 'descricao']
         # Insere no banco
         df_desp.to_sql('despesas', conn, if_exists='replace', index=False)
+        anotar(linhas_saida=len(df_desp))
         print(f"   [v] {len(df_desp)} registros de despesas importados.")
         
     else:
@@ -100,11 +99,245 @@ def import_data():
         df_agg.columns = [c.lower() for c in df_agg.columns]
         
         df_agg.to_sql('despesas_agregadas', conn, if_exists='replace', index=False)
+        anotar(linhas_entrada=len(df_agg), linhas_saida=len(df_agg))
         print(f"   [v] {len(df_agg)} registros agregados importados.")
     
+    # O to_sql(if_exists='replace') recria as tabelas sem os índices
+    cursor = conn.cursor()
+    criar_indices(cursor)
+    atualizar_resumo_trimestral(cursor)
+    atualizar_busca(cursor)
+    marcar_versao(cursor)
+    conn.commit()
     conn.close()
     print(f"\nBanco de Dados Populado: {os.path.abspath(DB_PATH)}")
 
+def atualizar_resumo_trimestral(cursor, trimestres=None):
+    """Recalcula despesas_operadora_trimestre a partir de despesas.
+
+    Com trimestres, só esses trimestres são apagados e recalculados (carga
+    incremental); sem, a tabela inteira é refeita. No esquema compacto o
+    resumo é por período e soma centavos inteiros.
+    """
+    compacto = schema_compacto(cursor)
+    coluna = 'periodo' if compacto else 'trimestre'
+    cursor.execute((TABELAS_COMPACTAS if compacto else TABELAS)['despesas_operadora_trimestre'])
+    filtro, params = "", []
+    if trimestres:
+        filtro = f"WHERE {coluna} IN ({', '.join('?' * len(trimestres))})"
+        params = [periodo(t) for t in trimestres] if compacto else list(trimestres)
+    cursor.execute(f"DELETE FROM despesas_operadora_trimestre {filtro}", params)
+    if compacto:
+        select = """
+        INSERT INTO despesas_operadora_trimestre (reg_ans, periodo, total_centavos, qtd_lancamentos)
+        SELECT reg_ans, periodo, SUM(valor_centavos), COUNT(*)"""
+    else:
+        select = """
+        INSERT INTO despesas_operadora_trimestre (reg_ans, trimestre, ano, total_despesas, qtd_lancamentos)
+        SELECT reg_ans, trimestre, MAX(ano), SUM(valor_despesa), COUNT(*)"""
+    cursor.execute(f"""{select}
+    FROM despesas
+    {filtro}
+    GROUP BY reg_ans, {coluna}
+    """, params)
+    escopo = ', '.join(trimestres) if trimestres else 'todos os trimestres'
+    print(f"   [v] Resumo por operadora/trimestre atualizado ({escopo}): {cursor.rowcount} linhas.")
+
+def _linhas(df):
+    """Tuplas prontas para o sqlite3 (tipos nativos do Python, NaN -> NULL)."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def _inserir_lotes(cursor, sql, lotes):
+    """executemany lote a lote; retorna (linhas, segundos)."""
+    inicio = time.perf_counter()
+    total = 0
+    for lote in lotes:
+        cursor.executemany(sql, _linhas(lote))
+        total += len(lote)
+        # rowcount do executemany = linhas de fato gravadas (INSERT OR IGNORE descarta as repetidas)
+        anotar(linhas_saida=max(cursor.rowcount, 0))
+    return total, time.perf_counter() - inicio
+
+def _relatorio_carga(tabela, linhas, segundos):
+    taxa = linhas / segundos if segundos > 0 else float('inf')
+    print(f"   [v] {linhas} registros em {tabela} ({segundos:.2f}s, {taxa:,.0f} linhas/s).")
+
+def _lotes_em_memoria(df, colunas, trimestres=None):
+    """Fatias de um DataFrame já em memória no mesmo formato de ler_consolidado_em_lotes."""
+    if trimestres:
+        df = df[df['TRIMESTRE'].isin(trimestres)]
+    for inicio in range(0, len(df), TAMANHO_LOTE):
+        yield df[colunas].iloc[inicio:inicio + TAMANHO_LOTE]
+
+def _mapear(serie, funcao):
+    """Aplica funcao uma vez por valor distinto (trimestres, descrições) e mapeia o lote inteiro."""
+    valores = pd.unique(serie.astype(object))
+    return serie.astype(object).map({v: funcao(v) for v in valores})
+
+def _lote_compacto(lote, descricoes, cursor):
+    """Converte um lote do consolidado para as colunas de despesas do esquema compacto.
+
+    descricoes ({texto: id}) é atualizado com as descrições novas, que
+    são inseridas na dimensão.
+    """
+    novas = [d for d in pd.unique(lote['DESCRICAO'].astype(object)) if d not in descricoes and pd.notna(d)]
+    proximo = max(descricoes.values(), default=0) + 1
+    for i, texto in enumerate(novas):
+        descricoes[texto] = proximo + i
+    cursor.executemany("INSERT INTO descricoes (id, descricao) VALUES (?, ?)", [(descricoes[t], t) for t in novas])
+    return pd.DataFrame({
+        'reg_ans': pd.to_numeric(lote['REG_ANS'], errors='coerce').astype('Int64'),
+        'periodo': _mapear(lote['TRIMESTRE'], periodo).astype('Int64'),
+        'valor_centavos': pd.Series(centavos_de_float(lote['VALOR_DESPESA']), index=lote.index).astype('Int64'),
+        'descricao_id': lote['DESCRICAO'].astype(object).map(descricoes).astype('Int64'),
+    })
+
+def import_data_rapido(trimestres=None, consolidado=None, agregado=None):
+    """Carga em massa que preserva o DDL do setup_database.
+
+    Diferente do to_sql(if_exists='replace'), não recria as tabelas (mantém
+    PK, AUTOINCREMENT e FK): esvazia, insere em lotes com executemany numa
+    única transação e só então cria os índices secundários.
+
+    Com trimestres (ex.: ['3T2025']), a carga é incremental: só as despesas
+    desses trimestres são substituídas, operadoras novas são acrescentadas
+    e o resumo trimestral é recalculado só para eles.
+
+    consolidado e agregado (DataFrames em memória, ex.: pipeline.py)
+    substituem a leitura do consolidado e do despesas_agregadas.csv.
+
+    O formato das linhas segue o esquema do banco (setup_database): no
+    compacto, REG_ANS inteiro, período ano*10+trimestre, centavos inteiros
+    e a descrição como FK para a tabela descricoes. A carga incremental
+    é recusada (ValueError) se as tabelas não têm a estrutura do DDL.
+    """
+    incremental = bool(trimestres)
+    print("\n--- Iniciando Importação de Dados (carga rápida" + (f", trimestres {', '.join(trimestres)}" if incremental else "") + ") ---")
+    conn = get_connection()
+    conn.isolation_level = None  # transação controlada manualmente
+    cursor = conn.cursor()
+    pragmas = PRAGMAS_CARGA if incremental else dict(PRAGMAS_CARGA, **PRAGMAS_CARGA_COMPLETA)
+    for pragma, valor in pragmas.items():
+        cursor.execute(f"PRAGMA {pragma} = {valor}")
+
+    tem_consolidado = consolidado is not None or consolidado_disponivel()
+    compacto = schema_compacto(cursor)
+    divergentes = tabelas_divergentes(cursor, compacto) if incremental else []
+    if divergentes:
+        conn.close()
+        raise ValueError(f"Carga incremental recusada: {', '.join(divergentes)} sem a estrutura do DDL "
+                         "(PK/colunas). Rode setup_database() e a carga completa.")
+    try:
+        cursor.execute("BEGIN")
+        if not incremental:
+            remover_indices(cursor, compacto)
+
+        if tem_consolidado:
+            if incremental:
+                marcadores = ', '.join('?' * len(trimestres))
+                if compacto:
+                    cursor.execute(f"DELETE FROM despesas WHERE periodo IN ({marcadores})", [periodo(t) for t in trimestres])
+                else:
+                    cursor.execute(f"DELETE FROM despesas WHERE trimestre IN ({marcadores})", list(trimestres))
+            else:
+                cursor.execute("DELETE FROM despesas")
+                cursor.execute("DELETE FROM operadoras")
+                if compacto:
+                    cursor.execute("DELETE FROM descricoes")
+                else:
+                    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'despesas'")
+            # Descrições já cadastradas (carga incremental no esquema compacto)
+            descricoes = dict(cursor.execute("SELECT descricao, id FROM descricoes").fetchall()) if compacto else None
+
+            # 1 e 2. Operadoras e despesas numa única passada pelos lotes
+            print("1. Carregando Operadoras e Despesas Detalhadas...")
+            colunas_ops = ['REG_ANS', 'CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE']
+            colunas_desp = ['REG_ANS', 'TRIMESTRE', 'ANO', 'VALOR_DESPESA', 'DESCRICAO']
+            vistas = set()
+            qtd_ops = qtd_desp = 0
+            tempo_ops = tempo_desp = 0.0
+            if consolidado is not None:
+                lotes = _lotes_em_memoria(consolidado, colunas_ops + colunas_desp[1:], trimestres)
+            else:
+                lotes = ler_consolidado_em_lotes(colunas_ops + colunas_desp[1:], TAMANHO_LOTE, trimestres)
+            for lote in lotes:
+                anotar(linhas_entrada=len(lote))
+                # Primeira ocorrência de cada REG_ANS, como no drop_duplicates
+                ops = lote[colunas_ops].drop_duplicates(subset=['REG_ANS'])
+                ops = ops[~ops['REG_ANS'].isin(vistas)]
+                vistas.update(ops['REG_ANS'].tolist())
+                if compacto:
+                    ops = ops.assign(REG_ANS=pd.to_numeric(ops['REG_ANS'], errors='coerce').astype('Int64'))
+                    ops = ops[ops['REG_ANS'].notna()]
+                # Na carga incremental as operadoras já cadastradas são mantidas
+                antes = conn.total_changes
+                _, t = _inserir_lotes(cursor, "INSERT OR IGNORE INTO operadoras (reg_ans, cnpj, razao_social, uf, modalidade) "
+                                              "VALUES (?, ?, ?, ?, ?)", [ops])
+                qtd_ops, tempo_ops = qtd_ops + conn.total_changes - antes, tempo_ops + t
+                if compacto:
+                    n, t = _inserir_lotes(cursor, "INSERT INTO despesas (reg_ans, periodo, valor_centavos, descricao_id) "
+                                                  "VALUES (?, ?, ?, ?)", [_lote_compacto(lote, descricoes, cursor)])
+                else:
+                    n, t = _inserir_lotes(cursor, "INSERT INTO despesas (reg_ans, trimestre, ano, valor_despesa, descricao) "
+                                                  "VALUES (?, ?, ?, ?, ?)", [lote[colunas_desp]])
+                qtd_desp, tempo_desp = qtd_desp + n, tempo_desp + t
+            _relatorio_carga('operadoras', qtd_ops, tempo_ops)
+            _relatorio_carga('despesas', qtd_desp, tempo_desp)
+            if compacto:
+                print(f"   [v] {len(descricoes)} descrições distintas na tabela descricoes.")
+        else:
+            print(f"[ERRO] {CSV_CONSOLIDADO} não encontrado.")
+
+        # 2. Importar Agregados
+        if agregado is not None or os.path.exists(CSV_AGREGADO):
+            print("2. Carregando Dados Agregados...")
+            cursor.execute("DELETE FROM despesas_agregadas")
+            colunas_agg = ['RAZAO_SOCIAL', 'UF', 'TOTAL_DESPESAS', 'MEDIA_TRIMESTRAL', 'DESVIO_PADRAO', 'QTD_LANCAMENTOS']
+            if agregado is not None:
+                lotes = _lotes_em_memoria(agregado, colunas_agg)
+            else:
+                lotes = (l[colunas_agg] for l in pd.read_csv(CSV_AGREGADO, sep=';', encoding='utf-8', chunksize=TAMANHO_LOTE))
+            n, t = _inserir_lotes(cursor, "INSERT INTO despesas_agregadas (razao_social, uf, total_despesas, "
+                                          "media_trimestral, desvio_padrao, qtd_lancamentos) VALUES (?, ?, ?, ?, ?, ?)", lotes)
+            _relatorio_carga('despesas_agregadas', n, t)
+
+        # Índices só depois da carga: um build ordenado em vez de N atualizações
+        if not incremental:
+            inicio = time.perf_counter()
+            criar_indices(cursor, compacto)
+            qtd_indices = len(INDICES_COMPACTOS if compacto else INDICES)
+            print(f"   [v] {qtd_indices} índices secundários criados ({time.perf_counter() - inicio:.2f}s).")
+        # Resumo depois dos índices: o GROUP BY lê direto do índice de despesas
+        if tem_consolidado:
+            atualizar_resumo_trimestral(cursor, trimestres)
+            # Busca textual da API (operadoras podem ter entrado nesta carga)
+            atualizar_busca(cursor)
+        # Invalida o cache de resultados do consultas.py (junto com a carga)
+        marcar_versao(cursor)
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    print(f"\nBanco de Dados Populado: {os.path.abspath(DB_PATH)}")
+
+def cli(argv=None, prog=None):
+    args = parser_db_loader(prog).parse_args(argv)
+    with etapa('db_loader.setup'):
+        recriadas = setup_database(args.compacto)
+    if args.fast or args.compacto:
+        trimestres = [t.strip() for t in args.trimestres.split(',') if t.strip()] if args.trimestres else None
+        if trimestres and recriadas:
+            print(f"[AVISO] Tabelas recriadas ({', '.join(recriadas)}): carga completa no lugar de "
+                  f"--trimestres {','.join(trimestres)}.")
+            trimestres = None
+        with etapa('db_loader.carga', modo='rapida', trimestres=trimestres):
+            import_data_rapido(trimestres)
+    else:
+        with etapa('db_loader.carga', modo='to_sql'):
+            import_data()
+    salvar_relatorio('db_loader')
+
 if __name__ == "__main__":
-    setup_database()
-    import_data()
\ No newline at end of file
+    cli()
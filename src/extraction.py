@@ -1,21 +1,41 @@
 import os
+import time
 import requests
 from lxml import html
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from instrumentacao import etapa, anotar, salvar_relatorio, tamanho_arquivos
+from comandos import BASE_URL, WORKERS_EXTRACAO as WORKERS, parser_extraction
 
 # Configurações
-BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/"
 OUTPUT_DIR = "data/raw"
+TENTATIVAS = 5        # tentativas por download (retomando o .part)
+BACKOFF = 1.0         # segundos; dobra a cada tentativa
+TIMEOUT = (10, 60)    # (conexão, leitura)
+CHUNK_DOWNLOAD = 1024 * 1024
 
-def get_links(url):
+def criar_sessao(workers=WORKERS):
+    """Sessão com pool de conexões e retry/backoff para erros transitórios."""
+    retry = Retry(total=3, backoff_factor=BACKOFF, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=['HEAD', 'GET'])
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_links(url, session=None):
     """Retorna lista de links limpos de uma URL."""
     print(f"Varrendo: {url}")
+    session = session or criar_sessao()
     try:
-        response = requests.get(url, timeout=30)
+        response = session.get(url, timeout=TIMEOUT)
         response.raise_for_status()
         tree = html.fromstring(response.content)
         links = tree.xpath('//a/@href')
-        
+
         clean_links = []
         for l in links:
             # Ignora navegação e query strings
@@ -27,90 +47,183 @@ def get_links(url):
         print(f"Erro ao acessar {url}: {e}")
         return []
 
-def download_file(url, filename, subdir):
-    """Baixa o arquivo para data/raw/SUBDIR/filename"""
+def info_remota(session, url):
+    """HEAD no arquivo: {'tamanho', 'etag'} ou None se o servidor não responder."""
+    try:
+        r = session.head(url, timeout=TIMEOUT, allow_redirects=True)
+        r.raise_for_status()
+        tamanho = r.headers.get('Content-Length')
+        return {'tamanho': int(tamanho) if tamanho else None, 'etag': r.headers.get('ETag')}
+    except Exception as e:
+        print(f"   [!] Sem metadados do servidor ({e}).")
+        return None
+
+def arquivo_completo(filepath, remoto):
+    """Confere o arquivo local contra tamanho/ETag do servidor antes de pular o download."""
+    if remoto is None:
+        return True  # Offline: mantém o comportamento antigo (confia no arquivo existente)
+    if remoto['tamanho'] is not None and os.path.getsize(filepath) != remoto['tamanho']:
+        return False
+    caminho_etag = filepath + '.etag'
+    if remoto['etag'] and os.path.exists(caminho_etag):
+        with open(caminho_etag, 'r', encoding='utf-8') as f:
+            return f.read().strip() == remoto['etag']
+    return True
+
+def _tamanho_esperado(response):
+    """Tamanho final do arquivo segundo a resposta (Content-Range ou Content-Length)."""
+    if response.status_code == 206:
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    tamanho = response.headers.get('Content-Length')
+    return int(tamanho) if tamanho else None
+
+def download_file(url, filename, subdir, session=None):
+    """Baixa o arquivo para data/raw/SUBDIR/filename.
+
+    O download vai para filename.part e é retomado com HTTP Range em caso
+    de falha; só é renomeado quando o tamanho bate com o do servidor.
+    """
     folder_path = os.path.join(OUTPUT_DIR, subdir)
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-    
+    os.makedirs(folder_path, exist_ok=True)
+    session = session or criar_sessao()
+
     filepath = os.path.join(folder_path, filename)
-    # Verifica se já existe
+    parte = filepath + '.part'
+    remoto = info_remota(session, url)
+
+    # Verifica se já existe (e se está completo/atualizado)
     if os.path.exists(filepath):
-        print(f"   [!] Arquivo já existe (pulando): {filename}")
-        return filepath
+        if arquivo_completo(filepath, remoto):
+            print(f"   [!] Arquivo já existe (pulando): {filename}")
+            return filepath
+        print(f"   [!] {filename} difere do servidor (tamanho/ETag), baixando novamente.")
+        os.remove(filepath)
 
-    print(f"   [v] Baixando {filename}...")
-    try:
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(filepath, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        print(f"   [ok] Salvo em: {filepath}")
-        return filepath
-    except Exception as e:
-        print(f"   [x] Falha no download: {e}")
-        return None
+    for tentativa in range(1, TENTATIVAS + 1):
+        baixados = os.path.getsize(parte) if os.path.exists(parte) else 0
+        if baixados and remoto and baixados == remoto['tamanho']:
+            # .part já estava completo (ex.: processo interrompido antes do rename)
+            os.replace(parte, filepath)
+            print(f"   [ok] Salvo em: {filepath}")
+            return filepath
+        headers = {}
+        if baixados:
+            headers['Range'] = f"bytes={baixados}-"
+            # Se o arquivo mudou no servidor, If-Range faz ele mandar tudo de novo (200)
+            if remoto and remoto['etag']:
+                headers['If-Range'] = remoto['etag']
+        print(f"   [v] Baixando {filename}" + (f" (retomando de {baixados} bytes)" if baixados else "") + "...")
+        try:
+            with session.get(url, stream=True, headers=headers, timeout=TIMEOUT) as r:
+                if r.status_code == 416:
+                    # Range inválido: o .part não serve mais, recomeça do zero
+                    os.remove(parte)
+                    raise IOError("servidor recusou o Range (416)")
+                r.raise_for_status()
+                esperado = _tamanho_esperado(r)
+                modo = 'ab' if r.status_code == 206 else 'wb'
+                with open(parte, modo) as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_DOWNLOAD):
+                        f.write(chunk)
+
+            tamanho = os.path.getsize(parte)
+            if esperado is not None and tamanho != esperado:
+                raise IOError(f"download incompleto ({tamanho} de {esperado} bytes)")
+            os.replace(parte, filepath)
+            etag = r.headers.get('ETag') or (remoto and remoto['etag'])
+            if etag:
+                with open(filepath + '.etag', 'w', encoding='utf-8') as f:
+                    f.write(etag)
+            print(f"   [ok] Salvo em: {filepath}")
+            return filepath
+        except Exception as e:
+            print(f"   [x] Falha no download de {filename} (tentativa {tentativa}/{TENTATIVAS}): {e}")
+            if tentativa < TENTATIVAS:
+                time.sleep(BACKOFF * 2 ** (tentativa - 1))
+    return None
+
+def main(base_url=BASE_URL, workers=WORKERS):
+    session = criar_sessao(workers)
 
-def main():
     # 1. Identificar Anos
-    links_raiz = get_links(BASE_URL)
+    links_raiz = get_links(base_url, session)
     anos = [l.replace('/', '') for l in links_raiz if l.replace('/', '').isdigit()]
     anos.sort(reverse=True) # Começa pelos anos mais recentes (2025, 2024...)
-    
+
     candidatos = [] # Lista para guardar (Ano, Trimestre, URL_do_ZIP)
 
     print(f"Anos encontrados: {anos}")
-    
-    # 2. Para cada ano, identificar trimestres e arquivos ZIP
-    for ano in anos[:2]: 
-        url_ano = urljoin(BASE_URL, f"{ano}/")
-        itens = get_links(url_ano)
-        
-        # Inverte a lista para tentar pegar os trimestres finais primeiro (4T, 3T...) se estiverem ordenados
-        itens.sort(reverse=True) 
-        
-        for item in itens:
-            full_url = urljoin(url_ano, item)
-            
-            # CASO A: O item JÁ É o arquivo ZIP (Ex: 3T2025.zip)
-            if item.lower().endswith('.zip'):
-                trimestre = item.split('.')[0] # Pega '3T2025' do nome
-                candidatos.append({
-                    'ano': ano,
-                    'nome_arquivo': item,
-                    'identificador': trimestre,
-                    'url': full_url
-                })
-            
-            # CASO B: O item É UMA PASTA (Ex: 3T2025/)
-            elif item.endswith('/'):
-                # Entra na pasta para ver se tem zip dentro
-                sub_itens = get_links(full_url)
-                for sub in sub_itens:
-                    if sub.lower().endswith('.zip'):
-                        candidatos.append({
-                            'ano': ano,
-                            'nome_arquivo': sub,
-                            'identificador': item.replace('/', ''),
-                            'url': urljoin(full_url, sub)
-                        })
-
-    # 3. Selecionar os Top 3
-    if not candidatos:
-        print("ERRO: Nenhum arquivo ZIP encontrado.")
-        return
-
-    # Garante que não pegamos duplicatas e limitamos a 3
-    selecionados = candidatos[:3]
-    
-    print(f"\n--- Baixando os {len(selecionados)} arquivos mais recentes ---")
-    
-    for c in selecionados:
-        print(f"Alvo: {c['identificador']} ({c['nome_arquivo']})")
-        # Cria uma pasta com o nome do trimestre para organizar
-        subdir = f"{c['ano']}_{c['identificador']}"
-        download_file(c['url'], c['nome_arquivo'], subdir)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # 2. Para cada ano, identificar trimestres e arquivos ZIP
+        # (varredura em paralelo; pool.map mantém a ordem, então a seleção é a mesma)
+        urls_ano = [urljoin(base_url, f"{ano}/") for ano in anos[:2]]
+        itens_por_ano = list(pool.map(lambda u: get_links(u, session), urls_ano))
+
+        for ano, url_ano, itens in zip(anos[:2], urls_ano, itens_por_ano):
+            # Inverte a lista para tentar pegar os trimestres finais primeiro (4T, 3T...) se estiverem ordenados
+            itens.sort(reverse=True)
+            pastas = [i for i in itens if not i.lower().endswith('.zip') and i.endswith('/')]
+            sub_itens_por_pasta = dict(zip(pastas, pool.map(lambda p: get_links(urljoin(url_ano, p), session), pastas)))
+
+            for item in itens:
+                full_url = urljoin(url_ano, item)
+
+                # CASO A: O item JÁ É o arquivo ZIP (Ex: 3T2025.zip)
+                if item.lower().endswith('.zip'):
+                    trimestre = item.split('.')[0] # Pega '3T2025' do nome
+                    candidatos.append({
+                        'ano': ano,
+                        'nome_arquivo': item,
+                        'identificador': trimestre,
+                        'url': full_url
+                    })
+
+                # CASO B: O item É UMA PASTA (Ex: 3T2025/)
+                elif item.endswith('/'):
+                    # Conteúdo da pasta já varrido acima
+                    for sub in sub_itens_por_pasta[item]:
+                        if sub.lower().endswith('.zip'):
+                            candidatos.append({
+                                'ano': ano,
+                                'nome_arquivo': sub,
+                                'identificador': item.replace('/', ''),
+                                'url': urljoin(full_url, sub)
+                            })
+
+        # 3. Selecionar os Top 3
+        if not candidatos:
+            print("ERRO: Nenhum arquivo ZIP encontrado.")
+            return
+
+        # Garante que não pegamos duplicatas e limitamos a 3
+        selecionados = candidatos[:3]
+
+        print(f"\n--- Baixando os {len(selecionados)} arquivos mais recentes ---")
+
+        def baixar(c):
+            print(f"Alvo: {c['identificador']} ({c['nome_arquivo']})")
+            # Cria uma pasta com o nome do trimestre para organizar
+            subdir = f"{c['ano']}_{c['identificador']}"
+            with etapa('extraction.download', arquivo=c['nome_arquivo'], trimestre=c['identificador']) as registro:
+                caminho = download_file(c['url'], c['nome_arquivo'], subdir, session)
+                # Contadores de I/O são do processo (threads em paralelo): usa o tamanho do arquivo
+                registro['bytes_lidos'] = registro['bytes_escritos'] = tamanho_arquivos(caminho)
+            return caminho
+
+        resultados = list(pool.map(baixar, selecionados))
+
+    falhas = sum(1 for r in resultados if r is None)
+    anotar(arquivos=len(resultados) - falhas)
+    if falhas:
+        print(f"\n[AVISO] {falhas} download(s) falharam; rode novamente para retomar.")
+
+def cli(argv=None, prog=None):
+    args = parser_extraction(prog).parse_args(argv)
+    with etapa('extraction', workers=args.workers):
+        main(base_url=args.base_url, workers=args.workers)
+    salvar_relatorio('extraction')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
@@ -0,0 +1,80 @@
+import re
+import numpy as np
+import pandas as pd
+from comandos import PADRAO_DESCRICAO
+
+# Filtro das contas de despesa (EVENTO|SINISTRO), aplicado já na leitura do
+# CSV: só as colunas usadas pelo ETL são lidas, a DESCRICAO vem como
+# categoria (a regex roda uma vez por descrição distinta, não por linha) e,
+# com prefixos de conta configurados, o CD_CONTA_CONTABIL corta as linhas
+# antes da regex.
+COLUNAS_ETL = ['REG_ANS', 'DESCRICAO', 'VL_SALDO_FINAL']
+COLUNA_CONTA = 'CD_CONTA_CONTABIL'
+
+class FiltroContas:
+    """Decide quais linhas do demonstrativo entram no consolidado.
+
+    padrao é procurado na DESCRICAO em maiúsculas (como o antigo
+    str.upper().str.contains); prefixos_conta (ex.: ('41',)), quando
+    informado e o arquivo tem CD_CONTA_CONTABIL, exige que a conta comece
+    por um deles. O resultado de cada descrição/conta distinta fica em
+    cache e vale para todos os chunks e arquivos.
+    """
+
+    def __init__(self, padrao=PADRAO_DESCRICAO, prefixos_conta=None):
+        self.padrao = padrao
+        self.prefixos_conta = tuple(prefixos_conta) if prefixos_conta else ()
+        self._regex = re.compile(padrao)
+        self._descricoes = {}
+        self._contas = {}
+
+    def versao(self):
+        """Texto que identifica a configuração (entra na versão do manifesto)."""
+        texto = f"filtro={self.padrao}"
+        if self.prefixos_conta:
+            texto += f"+contas={','.join(self.prefixos_conta)}"
+        return texto
+
+    def colunas(self, cabecalho):
+        """Colunas do cabeçalho (já normalizado) que precisam ser lidas."""
+        necessarias = set(COLUNAS_ETL)
+        if self.prefixos_conta:
+            necessarias.add(COLUNA_CONTA)
+        return [c for c in cabecalho if c in necessarias]
+
+    def tipos(self, colunas):
+        """dtypes da leitura: descrição e conta como categoria (poucos valores distintos)."""
+        return {c: 'category' for c in ('DESCRICAO', COLUNA_CONTA) if c in colunas}
+
+    @staticmethod
+    def _mascara(serie, cache, decidir):
+        """Avalia decidir() uma vez por categoria nova e expande pelos códigos do chunk."""
+        if not isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype('category')
+        categorias = serie.cat.categories
+        for valor in categorias:
+            if valor not in cache:
+                cache[valor] = decidir(valor)
+        aceitas = np.fromiter((cache[v] for v in categorias), dtype=bool, count=len(categorias))
+        codigos = serie.cat.codes.to_numpy()
+        # Código -1 é nulo: str(nan) nunca casou com o filtro
+        return np.append(aceitas, False)[codigos]
+
+    def aplicar(self, chunk):
+        """Máscara booleana (numpy) das linhas do chunk que passam no filtro."""
+        mascara = np.ones(len(chunk), dtype=bool)
+        if self.prefixos_conta and COLUNA_CONTA in chunk.columns:
+            mascara &= self._mascara(chunk[COLUNA_CONTA], self._contas,
+                                     lambda v: str(v).strip().startswith(self.prefixos_conta))
+            if not mascara.any():
+                return mascara
+        mascara &= self._mascara(chunk['DESCRICAO'], self._descricoes,
+                                 lambda v: bool(self._regex.search(str(v).upper())))
+        return mascara
+
+    def __getstate__(self):
+        # Vai para os workers sem o cache e sem a regex compilada
+        return {'padrao': self.padrao, 'prefixos_conta': self.prefixos_conta}
+
+    def __setstate__(self, estado):
+        self.__init__(estado['padrao'], estado['prefixos_conta'])
@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:  # Windows: sem ru_maxrss nem CPU dos filhos
+    resource = None
+
+# Relatório JSON de cada execução (tempo, memória, linhas e bytes por etapa)
+RELATORIOS_DIR = "data/relatorios"
+# Perfis opcionais, ligados por etapa: lista separada por vírgula (prefixos
+# de nome, ex.: "processor.trimestre,aggregator") ou "*" para todas
+ENV_CPROFILE = "ANS_CPROFILE"
+ENV_TRACEMALLOC = "ANS_TRACEMALLOC"
+TOP_ALOCACOES = 10
+# Intervalo da amostragem do RSS enquanto há etapa aberta
+INTERVALO_RSS_S = 0.02
+
+_etapas = []
+_abertas = []  # pilha das etapas em andamento (para anotar())
+_inicio_execucao = datetime.now()
+_cprofile_ativo = False
+_picos_rss = {}  # id(registro) -> maior RSS amostrado com a etapa aberta
+_amostrador = None  # (thread, pid) da amostragem do RSS
+_trava_rss = threading.Lock()
+
+def _perfil_ligado(variavel, nome):
+    valor = os.environ.get(variavel, '').strip()
+    if not valor:
+        return False
+    return any(p == '*' or nome == p or nome.startswith(p + '.') for p in valor.split(','))
+
+def _rss_pico_mb():
+    """Pico de RSS do processo desde o início (ru_maxrss é KiB no Linux, bytes no macOS); None no Windows.
+
+    É a marca máxima do processo inteiro: nunca desce, então não serve
+    como memória de uma etapa que roda depois de outra mais pesada.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _rss_atual_mb():
+    """RSS atual do processo (2º campo de /proc/self/statm, em páginas); None fora do Linux."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _amostrar_rss():
+    """Atualiza o pico de cada etapa aberta até não sobrar nenhuma."""
+    while _picos_rss:
+        rss = _rss_atual_mb() or 0
+        with _trava_rss:
+            for chave, pico in _picos_rss.items():
+                if pico is not None and rss > pico:
+                    _picos_rss[chave] = rss
+        time.sleep(INTERVALO_RSS_S)
+
+def _iniciar_amostragem(registro):
+    global _amostrador
+    rss = _rss_atual_mb()
+    with _trava_rss:
+        _picos_rss[id(registro)] = rss
+    if rss is None:
+        return
+    # O pid confere se a thread é deste processo (um worker criado por fork herda o estado, não a thread)
+    if not _amostrador or _amostrador[1] != os.getpid() or not _amostrador[0].is_alive():
+        thread = threading.Thread(target=_amostrar_rss, name='rss-etapas', daemon=True)
+        _amostrador = (thread, os.getpid())
+        thread.start()
+
+def _pico_da_etapa(registro, pico_processo_inicio):
+    """Maior RSS da etapa: amostras a cada INTERVALO_RSS_S mais a leitura final.
+
+    Se a marca máxima do processo subiu durante a etapa, o pico foi nela e
+    o valor exato é o ru_maxrss (a amostragem pode perder um pico curto).
+    """
+    with _trava_rss:
+        pico = _picos_rss.pop(id(registro), None)
+    if pico is None:
+        return None
+    pico = max(pico, _rss_atual_mb() or 0)
+    pico_processo = _rss_pico_mb()
+    if pico_processo is not None and pico_processo > pico_processo_inicio:
+        pico = max(pico, pico_processo)
+    return round(pico, 1)
+
+def _cpu_s():
+    """CPU do processo mais a dos filhos já encerrados (workers do ProcessPoolExecutor); None sem o módulo resource."""
+    if resource is None:
+        return None
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + filhos.ru_utime + filhos.ru_stime
+
+def _contadores_io():
+    """Bytes lidos/escritos pelo processo (rchar/wchar de /proc/self/io); None fora do Linux."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            campos = dict(linha.split(':') for linha in f)
+        return int(campos['rchar']), int(campos['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def tamanho_arquivos(*caminhos):
+    """Soma do tamanho em disco dos caminhos que existem (None é ignorado)."""
+    return sum(os.path.getsize(c) for c in caminhos if c and os.path.exists(c))
+
+@contextmanager
+def etapa(nome, registrar=True, **detalhes):
+    """Mede uma etapa do pipeline.
+
+    Entrega um dict onde a etapa pode preencher linhas_entrada,
+    linhas_saida, bytes_lidos e bytes_escritos; os bytes que não forem
+    informados saem dos contadores de I/O do processo. rss_pico_mb é o
+    maior RSS do processo enquanto a etapa esteve aberta (amostrado numa
+    thread; None fora do Linux) e rss_processo_pico_mb a marca máxima do
+    processo até o fim da etapa, inclusive etapas anteriores. Com registrar=False
+    o registro não entra no relatório deste processo (ex.: etapa rodada num
+    worker, que devolve o dict para o processo principal chamar registrar()).
+    """
+    global _cprofile_ativo
+    registro = {'etapa': nome, **detalhes}
+    perfil = None
+    if _perfil_ligado(ENV_CPROFILE, nome) and not _cprofile_ativo:
+        perfil = cProfile.Profile()
+    medir_alocacoes = _perfil_ligado(ENV_TRACEMALLOC, nome) and not tracemalloc.is_tracing()
+
+    io_inicio = _contadores_io()
+    pico_processo_inicio = _rss_pico_mb()
+    _iniciar_amostragem(registro)
+    inicio, cpu_inicio = time.perf_counter(), _cpu_s()
+    if medir_alocacoes:
+        tracemalloc.start()
+    if perfil:
+        _cprofile_ativo = True
+        perfil.enable()
+    _abertas.append(registro)
+    try:
+        yield registro
+    except Exception as e:
+        registro['erro'] = repr(e)
+        raise
+    finally:
+        _abertas.remove(registro)
+        if perfil:
+            perfil.disable()
+            _cprofile_ativo = False
+        registro['tempo_s'] = round(time.perf_counter() - inicio, 4)
+        registro['cpu_s'] = round(_cpu_s() - cpu_inicio, 4) if cpu_inicio is not None else None
+        registro['rss_pico_mb'] = _pico_da_etapa(registro, pico_processo_inicio)
+        registro['rss_processo_pico_mb'] = _rss_pico_mb()
+        io_fim = _contadores_io()
+        if io_inicio and io_fim:
+            registro.setdefault('bytes_lidos', io_fim[0] - io_inicio[0])
+            registro.setdefault('bytes_escritos', io_fim[1] - io_inicio[1])
+        if medir_alocacoes:
+            foto = tracemalloc.take_snapshot()
+            registro['python_pico_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+            registro['top_alocacoes'] = [str(s) for s in foto.statistics('lineno')[:TOP_ALOCACOES]]
+        if perfil:
+            os.makedirs(RELATORIOS_DIR, exist_ok=True)
+            sufixo = detalhes.get('trimestre') or detalhes.get('arquivo') or os.getpid()
+            caminho = os.path.join(RELATORIOS_DIR, f"{nome}-{sufixo}.prof")
+            perfil.dump_stats(caminho)
+            registro['cprofile'] = caminho
+            print(f"   [INFO] Perfil de {nome} salvo em {caminho} (top funções por tempo acumulado):")
+            pstats.Stats(caminho).sort_stats('cumulative').print_stats(5)
+        if registrar:
+            _etapas.append(registro)
+
+def anotar(**valores):
+    """Soma contadores (ex.: linhas_entrada=len(df)) na etapa aberta mais interna; sem etapa, não faz nada."""
+    if _abertas:
+        registro = _abertas[-1]
+        for chave, valor in valores.items():
+            registro[chave] = registro.get(chave, 0) + valor
+
+def registrar(registro):
+    """Acrescenta ao relatório um registro medido em outro processo/thread."""
+    if registro:
+        _etapas.append(registro)
+
+def salvar_relatorio(comando=None):
+    """Grava o relatório da execução em data/relatorios/<comando>-<data>.json e retorna o caminho."""
+    comando = comando or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'pipeline'
+    relatorio = {
+        'comando': comando,
+        'argumentos': sys.argv[1:],
+        'inicio': _inicio_execucao.isoformat(timespec='seconds'),
+        'fim': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        # Marca máxima do processo na execução inteira (o das etapas está em cada uma)
+        'rss_pico_mb': _rss_pico_mb(),
+        'etapas': _etapas,
+    }
+    os.makedirs(RELATORIOS_DIR, exist_ok=True)
+    caminho = os.path.join(RELATORIOS_DIR, f"{comando}-{_inicio_execucao:%Y%m%d-%H%M%S}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+    print(f"[INFO] Relatório de execução: {caminho}")
+    return caminho
@@ -0,0 +1,80 @@
+import os
+import json
+import hashlib
+import pandas as pd
+
+# Configurações
+MANIFESTO_FILE = "data/manifesto.json"
+BLOCO_HASH = 1024 * 1024
+
+def carregar_manifesto(caminho=MANIFESTO_FILE):
+    """Lê o manifesto da última execução ({pasta: entrada}); vazio se não existir."""
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f).get('trimestres', {})
+    except (OSError, ValueError) as e:
+        print(f"   [!] Manifesto ilegível, reprocessando tudo: {e}")
+        return {}
+
+def salvar_manifesto(trimestres, caminho=MANIFESTO_FILE):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'trimestres': trimestres}, f, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
+
+def remover_manifesto(caminho=MANIFESTO_FILE):
+    """Descarta o manifesto: a próxima execução do processor.py reprocessa tudo."""
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+def hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(BLOCO_HASH), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def hash_cadastro(mapa_operadoras):
+    """Versão do cadastro de operadoras: muda se qualquer operadora mudar."""
+    linhas = pd.util.hash_pandas_object(mapa_operadoras.astype(str), index=True)
+    return hashlib.sha256(linhas.to_numpy().tobytes()).hexdigest()
+
+def impressao_zip(caminho_zip, anterior=None):
+    """Retorna {zip, tamanho, mtime, sha256} do ZIP bruto.
+
+    O sha256 só é recalculado quando tamanho ou mtime mudaram em relação à
+    entrada anterior (mesma ideia do git/rsync): ler o ZIP inteiro custa
+    bem menos que reprocessá-lo, mas não precisa ser feito a cada execução.
+    """
+    stat = os.stat(caminho_zip)
+    impressao = {
+        'zip': os.path.basename(caminho_zip),
+        'tamanho': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+    }
+    if anterior and all(anterior.get(k) == v for k, v in impressao.items()):
+        impressao['sha256'] = anterior.get('sha256')
+    else:
+        impressao['sha256'] = hash_arquivo(caminho_zip)
+    return impressao
+
+def trimestre_atualizado(anterior, impressao, versao_cadastro, exige_parquet=False):
+    """True se as saídas registradas (CSV parcial e Parquet) ainda valem para este ZIP e cadastro.
+
+    Só vale um trimestre que terminou com todos os CSVs processados
+    (status 'ok'); com 'erro' (ou sem status) ele é reprocessado.
+    """
+    if not anterior or anterior.get('status') != 'ok':
+        return False
+    if anterior.get('versao_cadastro') != versao_cadastro:
+        return False
+    if anterior.get('zip') != impressao['zip'] or anterior.get('sha256') != impressao['sha256']:
+        return False
+    if anterior.get('linhas') and exige_parquet and not anterior.get('parquet'):
+        return False
+    saidas = [anterior.get('parcial'), anterior.get('parquet')]
+    return all(s is None or os.path.exists(s) for s in saidas)
@@ -0,0 +1,75 @@
+import os
+from processor import processar_em_memoria, OUTPUT_FILE
+from colunar import tipos_consolidado, remover_parquet
+from manifesto import remover_manifesto
+from saida import caminho_temporario
+from aggregator import gerar_agregacao
+from db_loader import setup_database, import_data_rapido
+from analytics_queries import run_queries
+from filtro_contas import FiltroContas
+from instrumentacao import etapa, salvar_relatorio, tamanho_arquivos
+import cache_cadastro
+from comandos import parser_pipeline
+
+# Pipeline completo num único processo: o consolidado e o agregado passam
+# em memória do processor para o aggregator e o db_loader, sem gravar e
+# reler consolidado.csv / despesas_agregadas.csv (que viram exportações
+# opcionais com --exportar-csv).
+
+def exportar_consolidado(df):
+    """Grava data/consolidado.csv e invalida as saídas do processor.py que ele substitui.
+
+    O Parquet particionado (que aggregator e db_loader preferem ao CSV) e o
+    manifesto descrevem a execução anterior do processor.py, talvez com
+    outro filtro ou cadastro: o Parquet é apagado e o manifesto descartado,
+    e a próxima execução do processor.py reprocessa tudo. Exportado antes
+    da conversão de tipos: mesmo arquivo que o processor.py gera.
+    """
+    remover_manifesto()
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    temporario = caminho_temporario(OUTPUT_FILE)
+    df.to_csv(temporario, index=False, sep=';', encoding='utf-8')
+    os.replace(temporario, OUTPUT_FILE)
+    if remover_parquet():
+        print("[INFO] Parquet do processor.py removido (consolidado.csv passa a ser a fonte).")
+    print(f"[INFO] Exportado: {OUTPUT_FILE}")
+    return tamanho_arquivos(OUTPUT_FILE)
+
+def executar(workers=1, cadastro=None, cnpj_invalidos=None, exportar_csv=False, consultas=False, compacto=False,
+             filtro=None):
+    print("=== Pipeline em memória (processor -> aggregator -> db_loader) ===")
+
+    with etapa('pipeline.processor', workers=workers) as registro:
+        df = processar_em_memoria(workers, cnpj_invalidos, cadastro, filtro)
+        if df is None:
+            return
+        registro['linhas_saida'] = len(df)
+        if exportar_csv:
+            registro['bytes_escritos'] = exportar_consolidado(df)
+        # Mesmos tipos que aggregator/db_loader receberiam lendo o Parquet
+        consolidado = tipos_consolidado(df)
+        del df
+
+    print()
+    with etapa('pipeline.aggregator'):
+        agregado = gerar_agregacao(cnpj_invalidos=cnpj_invalidos, consolidado=consolidado, exportar=exportar_csv)
+
+    with etapa('pipeline.db_loader'):
+        setup_database(compacto)
+        import_data_rapido(consolidado=consolidado, agregado=agregado)
+
+    if consultas:
+        print()
+        run_queries()
+
+def cli(argv=None, prog=None):
+    args = parser_pipeline(prog).parse_args(argv)
+    if args.atualizar_cadastro:
+        cache_cadastro.invalidar_cache()
+    executar(workers=args.workers, cadastro=args.cadastro, cnpj_invalidos=args.cnpj,
+             exportar_csv=args.exportar_csv, consultas=args.consultas, compacto=args.compacto,
+             filtro=FiltroContas(args.filtro, args.contas.split(',') if args.contas else None))
+    salvar_relatorio('pipeline')
+
+if __name__ == "__main__":
+    cli()
@@ -1,19 +1,44 @@
 import os
+import sys
+import io
+import shutil
+import csv
+import codecs
 import zipfile
+import numpy as np
 import pandas as pd
-import requests
-import shutil
-from io import BytesIO, StringIO
-from lxml import html
+from io import BytesIO
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import partial
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin
+from manifesto import (carregar_manifesto, salvar_manifesto, hash_cadastro,
+                       impressao_zip, trimestre_atualizado)
+from colunar import PARQUET_DISPONIVEL, PARQUET_DIR, SaidaParquet, limpar_particoes
+from saida import SaidaCsv, SaidaMemoria, caminho_temporario
+from validator import DataValidator
+from instrumentacao import etapa, registrar, salvar_relatorio, tamanho_arquivos
+from filtro_contas import FiltroContas
+import cache_cadastro
+from comandos import parser_processor
 
 # Configurações
 RAW_DIR = "data/raw"
 OUTPUT_FILE = "data/consolidado.csv"
-TEMP_DIR = "data/temp_proc"
+PARCIAIS_DIR = "data/parciais"  # uma saída parcial por trimestre
+CHUNK_SIZE = 5000
+BLOCO_LEITURA = 1024 * 1024  # bytes descomprimidos lidos do ZIP por vez
 URL_CADASTRO_DIR = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/"
+# Resultado de um trimestre sem nenhuma linha gravada
+RESULTADO_VAZIO = {'parcial': None, 'parquet': None, 'linhas': 0, 'linhas_lidas': 0, 'sem_cnpj': 0, 'cnpj_invalidos': 0}
+# Valores usados quando o REG_ANS não existe no cadastro
+PADROES_OPERADORA = {'CNPJ': 'N/A', 'RAZAO_SOCIAL': 'N/A', 'UF': 'ND', 'MODALIDADE': 'ND'}
 
 def obter_link_cadastro():
+    # requests/lxml só quando há acesso à rede (cadastro local ou em cache dispensam)
+    import requests
+    from lxml import html
     print(f"Procurando arquivo atualizado em: {URL_CADASTRO_DIR}")
     try:
         response = requests.get(URL_CADASTRO_DIR, timeout=30)
@@ -28,58 +53,182 @@ def obter_link_cadastro():
         print(f"[Erro ao varrer pasta]: {e}")
         return None
 
-def obter_mapa_operadoras():
+def tabela_operadoras_vazia():
+    return pd.DataFrame(columns=list(PADROES_OPERADORA), index=pd.Index([], name='REG_ANS'), dtype=object)
+
+def ler_cadastro(conteudo):
+    """Monta o cadastro (bytes do CSV da ANS) como DataFrame indexado pelo REG_ANS normalizado.
+
+    As colunas detectadas ficam em mapa.attrs['colunas'] (vão para o cache).
+    """
+    # Tratamento de encoding manual (o read_csv decodifica os bytes direto, sem cópia em str)
+    try:
+        df = pd.read_csv(BytesIO(conteudo), sep=';', dtype=str, on_bad_lines='skip', encoding='utf-8')
+    except UnicodeDecodeError:
+        df = pd.read_csv(BytesIO(conteudo), sep=';', dtype=str, on_bad_lines='skip',
+                         encoding='latin1', encoding_errors='replace')
+    
+    df.columns = [c.strip().upper() for c in df.columns]
+    
+    # Mapeamento dinâmico das colunas extras (UF e Modalidade)
+    col_reg = next((c for c in df.columns if 'REGISTRO' in c and 'DATA' not in c), None)
+    col_cnpj = next((c for c in df.columns if 'CNPJ' in c), None)
+    col_nome = next((c for c in df.columns if 'RAZAO' in c or 'NOME' in c), None)
+    col_uf = next((c for c in df.columns if 'UF' == c or 'ESTADO' in c), None)
+    col_mod = next((c for c in df.columns if 'MODALIDADE' in c), None)
+    
+    print(f"   [v] Colunas extras mapeadas: UF='{col_uf}' | MODALIDADE='{col_mod}'")
+    
+    # Montagem vetorizada (antes: iterrows + dict por operadora)
+    cnpj_raw = df[col_cnpj].astype(object).astype(str).str.strip()
+    cnpj_limpo = cnpj_raw.str.replace(r'\D', '', regex=True)
+    
+    mapa = pd.DataFrame({
+        'CNPJ': cnpj_limpo.where(cnpj_limpo != '', cnpj_raw),
+        'RAZAO_SOCIAL': df[col_nome],
+        'UF': df[col_uf] if col_uf else 'ND',
+        'MODALIDADE': df[col_mod] if col_mod else 'ND'
+    }).astype(object)
+    mapa.index = pd.Index(df[col_reg].astype(object).astype(str).str.strip().str.lstrip('0'), name='REG_ANS')
+    # Em caso de REG_ANS repetido vale o último, como no dict anterior
+    mapa = mapa[~mapa.index.duplicated(keep='last')]
+    mapa.attrs['colunas'] = {'reg_ans': col_reg, 'cnpj': col_cnpj, 'razao_social': col_nome,
+                             'uf': col_uf, 'modalidade': col_mod}
+    
+    print(f"   [v] {len(mapa)} operadoras carregadas.")
+    return mapa
+
+def obter_mapa_operadoras(caminho_local=None):
+    """Retorna o cadastro como DataFrame indexado pelo REG_ANS normalizado.
+
+    Com caminho_local, lê o CSV do disco (ex.: dados sintéticos) em vez de
+    baixar da ANS. Senão usa o cache local (cache_cadastro.py): dentro da
+    validade nem acessa a rede; depois dela, revalida com ETag/Last-Modified
+    e só baixa o CSV se o arquivo mudou. Sem rede, o cache é usado mesmo
+    vencido.
+    """
+    if caminho_local:
+        print(f"Lendo cadastro local: {caminho_local}")
+        with open(caminho_local, 'rb') as f:
+            return ler_cadastro(f.read())
+
+    cache, meta = cache_cadastro.carregar_cache()
+    if cache is not None and cache_cadastro.cache_recente(meta):
+        print(f"   [v] Cadastro em cache ({meta['arquivo']}): {len(cache)} operadoras.")
+        return cache
+
     url_csv = obter_link_cadastro()
-    if not url_csv: return {}
+    if not url_csv:
+        if cache is not None:
+            print(f"   [!] ANS indisponível: usando cadastro em cache ({meta['arquivo']}).")
+            return cache
+        return tabela_operadoras_vazia()
 
+    import requests
+    arquivo = url_csv.rsplit('/', 1)[-1]
     print("Baixando dados cadastrais...")
     try:
-        response = requests.get(url_csv, timeout=60)
+        response = requests.get(url_csv, timeout=60,
+                                headers=cache_cadastro.cabecalhos_condicionais(meta, arquivo) if cache is not None else {})
+        if response.status_code == 304:
+            cache_cadastro.renovar_validacao(meta)
+            print(f"   [v] Cadastro inalterado no servidor: usando cache ({len(cache)} operadoras).")
+            return cache
         response.raise_for_status()
-        
-        # Tratamento de encoding manual
-        try:
-            conteudo_texto = response.content.decode('utf-8')
-        except UnicodeDecodeError:
-            conteudo_texto = response.content.decode('latin1', errors='replace')
-        
-        df = pd.read_csv(
-            StringIO(conteudo_texto), 
-            sep=';', 
-            dtype=str,
-            on_bad_lines='skip'
-        )
-        
-        df.columns = [c.strip().upper() for c in df.columns]
-        
-        # Mapeamento dinâmico das colunas extras (UF e Modalidade)
-        col_reg = next((c for c in df.columns if 'REGISTRO' in c and 'DATA' not in c), None)
-        col_cnpj = next((c for c in df.columns if 'CNPJ' in c), None)
-        col_nome = next((c for c in df.columns if 'RAZAO' in c or 'NOME' in c), None)
-        col_uf = next((c for c in df.columns if 'UF' == c or 'ESTADO' in c), None)
-        col_mod = next((c for c in df.columns if 'MODALIDADE' in c), None)
-        
-        print(f"   [v] Colunas extras mapeadas: UF='{col_uf}' | MODALIDADE='{col_mod}'")
-        
-        mapa = {}
-        for _, row in df.iterrows():
-            reg = str(row[col_reg]).strip().lstrip('0')
-            cnpj_raw = str(row[col_cnpj]).strip()
-            cnpj_limpo = ''.join(filter(str.isdigit, cnpj_raw))
-            
-            mapa[reg] = {
-                'CNPJ': cnpj_limpo if cnpj_limpo else cnpj_raw, 
-                'RAZAO_SOCIAL': row[col_nome],
-                'UF': row[col_uf] if col_uf else 'ND',
-                'MODALIDADE': row[col_mod] if col_mod else 'ND'
-            }
-        
-        print(f"   [v] {len(mapa)} operadoras carregadas.")
+        mapa = ler_cadastro(response.content)
+        cache_cadastro.salvar_cache(mapa, arquivo, response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'))
         return mapa
 
     except Exception as e:
         print(f"   [ERRO] Falha ao baixar cadastro: {e}")
-        return {}
+        if cache is not None:
+            print(f"   [!] Usando cadastro em cache ({meta['arquivo']}).")
+            return cache
+        return tabela_operadoras_vazia()
+
+def enriquecer_operadoras(df, mapa_operadoras):
+    """Preenche CNPJ, RAZAO_SOCIAL, UF e MODALIDADE com um único reindex."""
+    dados = mapa_operadoras.reindex(df['REG_ANS'].to_numpy())
+    sem_match = ~df['REG_ANS'].isin(mapa_operadoras.index).to_numpy()
+    for col, padrao in PADROES_OPERADORA.items():
+        valores = dados[col].to_numpy(dtype=object, copy=True)
+        valores[sem_match] = padrao
+        df[col] = valores
+    return df
+class LeitorTextoIncremental(io.TextIOBase):
+    """Decodifica um stream binário sob demanda, com fallback utf-8 -> latin1.
+
+    Substitui o antigo f.read().decode(): só um bloco de BLOCO_LEITURA bytes
+    fica em memória por vez. Começa em utf-8 e, no primeiro bloco inválido,
+    passa a decodificar o restante do arquivo como latin1.
+    """
+
+    def __init__(self, binario, tamanho_bloco=BLOCO_LEITURA):
+        self._binario = binario
+        self._tamanho_bloco = tamanho_bloco
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._fim = False
+        self.encoding_detectado = 'utf-8'
+
+    def readable(self):
+        return True
+
+    def _decodificar(self, dados, final):
+        pendente = self._decoder.getstate()[0]
+        try:
+            return self._decoder.decode(dados, final)
+        except UnicodeDecodeError:
+            # Fallback para latin1 (inclui bytes que o decoder utf-8 segurava)
+            self._decoder = codecs.getincrementaldecoder('latin1')(errors='replace')
+            self.encoding_detectado = 'latin1'
+            return self._decoder.decode(pendente + dados, final)
+
+    def _preencher(self):
+        dados = self._binario.read(self._tamanho_bloco)
+        self._fim = not dados
+        self._buffer += self._decodificar(dados, final=self._fim)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while not self._fim:
+                self._preencher()
+            texto, self._buffer = self._buffer, ''
+            return texto
+        while len(self._buffer) < size and not self._fim:
+            self._preencher()
+        texto, self._buffer = self._buffer[:size], self._buffer[size:]
+        return texto
+
+    def readline(self, size=-1):
+        while '\n' not in self._buffer and not self._fim:
+            self._preencher()
+        pos = self._buffer.find('\n')
+        fim_linha = len(self._buffer) if pos == -1 else pos + 1
+        if size is not None and size >= 0:
+            fim_linha = min(fim_linha, size)
+        texto, self._buffer = self._buffer[:fim_linha], self._buffer[fim_linha:]
+        return texto
+
+def ler_chunks_zip(z, membro, chunksize=CHUNK_SIZE, filtro=None):
+    """Lê um CSV de dentro do ZIP em chunks, sem extrair para disco.
+
+    Com filtro (FiltroContas), o cabeçalho é lido antes e normalizado
+    (strip/upper), e o read_csv só converte as colunas que o filtro pede,
+    com os dtypes dele (descrição como categoria).
+    """
+    with z.open(membro) as binario:
+        leitor = LeitorTextoIncremental(binario)
+        if filtro is None:
+            yield from pd.read_csv(leitor, sep=';', chunksize=chunksize, on_bad_lines='skip')
+            return
+        cabecalho = next(csv.reader([leitor.readline()], delimiter=';'), [])
+        nomes = [c.lstrip('\ufeff').strip().upper() for c in cabecalho]
+        colunas = filtro.colunas(nomes)
+        yield from pd.read_csv(leitor, sep=';', header=None, names=nomes, usecols=colunas,
+                               dtype=filtro.tipos(colunas), chunksize=chunksize, on_bad_lines='skip')
+
 # Normaliza valores monetários    
 def normalizar_valor(valor):
     if pd.isna(valor): return 0.0
@@ -92,83 +241,456 @@ def normalizar_valor(valor):
     except:
         return 0.0
 
-def processar_dados():
-    mapa_operadoras = obter_mapa_operadoras()
+def _converter_ascii(texto):
+    """Converte um array numpy de bytes (dtype S) em mantissa inteira + casas decimais.
+
+    Percorre as colunas de caracteres (largura do maior valor, ~15 passos)
+    aplicando Horner em vetores de N linhas. Se há vírgula ela é o separador
+    decimal e os pontos são de milhar; senão o ponto é o decimal.
+    Retorna (mantissa sem sinal, casas, negativo, valido); texto vazio é
+    zero. Linhas fora do padrão (letras, dois separadores, sinal no meio,
+    mais de 15 dígitos) voltam com valido=False para o caminho lento.
+    """
+    n, largura = len(texto), texto.dtype.itemsize
+    colunas = np.ascontiguousarray(texto).view(np.uint8).reshape(n, largura).T.copy()
+    digito = (colunas >= ord('0')) & (colunas <= ord('9'))
+    virgula = colunas == ord(',')
+    ponto = colunas == ord('.')
+    separador = np.where(virgula.any(axis=0), virgula, ponto)
+
+    permitido = digito | virgula | ponto | (colunas == 0)
+    negativo = colunas[0] == ord('-') if largura else np.zeros(n, dtype=bool)
+    if largura:
+        permitido[0] |= negativo
+    qtd_digitos = digito.sum(axis=0)
+    # Célula vazia (ou só espaços) vale 0 sem contar como falha, como em normalizar_valor
+    vazio = (colunas == 0).all(axis=0)
+    valido = vazio | (permitido.all(axis=0) & (separador.sum(axis=0) <= 1)
+                      & (qtd_digitos > 0) & (qtd_digitos <= 15))
+
+    mantissa = np.zeros(n, dtype=np.int64)
+    casas = np.zeros(n, dtype=np.int64)
+    apos_separador = np.zeros(n, dtype=bool)
+    for j in range(largura):
+        d = digito[j]
+        mantissa = np.where(d, mantissa * 10 + (colunas[j].astype(np.int64) - ord('0')), mantissa)
+        casas += d & apos_separador
+        apos_separador |= separador[j]
+    return mantissa, casas, negativo, valido
+
+def _centavos_texto(texto):
+    """Centavos exatos (meio centavo arredonda para longe do zero) de um texto aceito por float(); None se não der."""
+    try:
+        return int((Decimal(texto) * 100).to_integral_value(ROUND_HALF_UP))
+    except (InvalidOperation, OverflowError, ValueError):
+        return None
+
+def centavos_de_float(valores):
+    """Centavos (float64 inteiro, NaN preservado) de valores em reais já convertidos para float.
+
+    Mesma regra do _centavos_texto: meio centavo arredonda para longe do
+    zero. float * 100 não basta (1.005 * 100 = 100.4999...): perto de meio
+    centavo a decisão sai do repr do float, que é o decimal original.
+    """
+    valores = np.asarray(valores, dtype='float64')
+    escalados = np.abs(valores) * 100
+    resultado = np.sign(valores) * np.floor(escalados + 0.5)
+    duvidosos = np.flatnonzero(np.abs(escalados - np.floor(escalados) - 0.5) < 1e-6)
+    for i in duvidosos:
+        resultado[i] = _centavos_texto(repr(float(valores[i])))
+    return resultado
+
+def normalizar_valores(serie, centavos=False):
+    """Versão vetorizada de normalizar_valor para uma coluna inteira.
+
+    Aceita o formato brasileiro (1.234,56), decimais simples e negativos.
+    Retorna (valores, falhas): valores em float64 (ou int64 em centavos) e
+    a quantidade de células não nulas que não puderam ser convertidas
+    (viram 0, como antes). Os floats são os mesmos de normalizar_valor
+    (inclusive o -0.0 de '-0,00'); em centavos, meio centavo arredonda
+    para longe do zero nos dois caminhos ('0,005' -> 1).
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        # O pandas já converteu a coluna (chunk sem vírgulas decimais)
+        valores = serie.astype('float64').fillna(0.0)
+        if centavos:
+            return pd.Series(centavos_de_float(valores), index=serie.index, name=serie.name).astype('int64'), 0
+        return valores, 0
+
+    bruto = serie.to_numpy(dtype=object, copy=True)
+    nulos = pd.isna(bruto)
+    bruto[nulos] = '0'
+    try:
+        texto = bruto.astype('S')
+    except UnicodeEncodeError:
+        # Caracteres fora do ASCII viram '?' e a linha cai no caminho lento
+        texto = np.char.encode(bruto.astype(str), 'ascii', 'replace')
+    texto = np.char.strip(texto)
+    mantissa, casas, negativo, valido = _converter_ascii(texto)
+
+    if centavos:
+        escala = 10 ** np.abs(casas - 2)
+        resultado = np.where(casas <= 2, mantissa * escala, (mantissa + escala // 2) // escala)
+        resultado = np.where(negativo, -resultado, resultado)
+    else:
+        resultado = mantissa / 10.0 ** casas
+        # Sinal aplicado no float: '-0,00' continua -0.0
+        resultado = np.where(negativo, -resultado, resultado)
+
+    falhas = 0
+    if not valido.all():
+        # Caminho lento, só para as linhas fora do padrão: mesma regra de normalizar_valor
+        resto = pd.Series(bruto[~valido], dtype=object).astype(str).str.strip()
+        simples = resto.str.replace('.', '', regex=False).str.replace('-', '', regex=False).str.isdigit()
+        brasileiro = resto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        normalizados = resto.where(simples, brasileiro)
+        convertidos = pd.to_numeric(normalizados, errors='coerce').astype('float64')
+        if centavos:
+            # Decimal em vez de float * 100: o mesmo arredondamento exato do caminho rápido
+            exatos = [_centavos_texto(t) if pd.notna(v) else None for t, v in zip(normalizados, convertidos)]
+            convertidos = pd.Series([np.nan if c is None else c for c in exatos], dtype=object)
+        falhas = int(convertidos.isna().sum())
+        resultado[~valido] = convertidos.fillna(0).to_numpy(dtype=resultado.dtype)
+
+    valores = pd.Series(resultado, index=serie.index, name=serie.name)
+    return valores.astype('int64' if centavos else 'float64'), falhas
+
+COLUNAS_SAIDA = ['REG_ANS', 'CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE', 'TRIMESTRE', 'ANO', 'VALOR_DESPESA', 'DESCRICAO']
+
+# Cadastro de operadoras (e opções) do processo worker, recebidos uma única vez no initializer
+_mapa_worker = None
+_cnpj_invalidos_worker = None
+_filtro_worker = None
+
+def _iniciar_worker(mapa_operadoras, cnpj_invalidos=None, filtro=None):
+    global _mapa_worker, _cnpj_invalidos_worker, _filtro_worker
+    _mapa_worker = mapa_operadoras
+    _cnpj_invalidos_worker = cnpj_invalidos
+    _filtro_worker = filtro
+
+def _processar_trimestre_worker(pasta, gravar=True):
+    return processar_trimestre_medido(pasta, _mapa_worker, _cnpj_invalidos_worker, gravar, _filtro_worker)
+
+def membros_csv(z):
+    """CSVs da raiz do ZIP, em ordem (os mesmos que o extractall + os.listdir antigo lia).
+
+    Ignora pastas, arquivos em subpastas (ex.: __MACOSX/._1T2025.csv) e
+    arquivos ocultos, que não são demonstrativos.
+    """
+    return sorted(m.filename for m in z.infolist()
+                  if not m.is_dir() and '/' not in m.filename
+                  and not m.filename.startswith('.') and m.filename.lower().endswith('.csv'))
+
+def localizar_zip(pasta):
+    caminho_pasta = os.path.join(RAW_DIR, pasta)
+    zip_file = next((f for f in sorted(os.listdir(caminho_pasta)) if f.lower().endswith('.zip')), None)
+    return os.path.join(caminho_pasta, zip_file) if zip_file else None
+
+class ErroTrimestre(RuntimeError):
+    """Falha ao processar um CSV do trimestre: as saídas dele foram descartadas."""
+
+def _chunks_tratados(z, membro, pasta, ano, tri, mapa_operadoras, filtro, validador, cnpj_invalidos, colunas):
+    """Lê, filtra e enriquece os chunks de um CSV do ZIP.
+
+    Gera (df, linhas_lidas, linhas_filtradas, falhas_valor, cnpj_invalidos)
+    por chunk. Linhas malformadas são puladas pelo read_csv e valores
+    inválidos viram 0 (contados em falhas_valor); qualquer outro erro de
+    leitura do CSV vira ErroTrimestre e derruba o trimestre inteiro.
+    """
+    csv_nome = os.path.basename(membro)
+    try:
+        for chunk in ler_chunks_zip(z, membro, filtro=filtro):
+            # Filtra linhas com 'EVENTO' ou 'SINISTRO' na descrição (uma regex por descrição distinta)
+            df_filtrado = chunk[filtro.aplicar(chunk)].copy()
+            aceitas = len(df_filtrado)
+            if df_filtrado.empty:
+                yield df_filtrado, len(chunk), 0, 0, 0
+                continue
+
+            df_filtrado['REG_ANS'] = df_filtrado['REG_ANS'].astype(str).str.strip().str.lstrip('0')
+
+            # Mapeamentos
+            enriquecer_operadoras(df_filtrado, mapa_operadoras)
+            df_filtrado['TRIMESTRE'] = tri
+            df_filtrado['ANO'] = ano
+            df_filtrado['VALOR_DESPESA'], falhas = normalizar_valores(df_filtrado['VL_SALDO_FINAL'])
+            df_filtrado['DESCRICAO'] = df_filtrado['DESCRICAO'].astype(str).str.strip()
+
+            invalidos = 0
+            if validador:
+                # Validação do CNPJ (módulo 11), com cache por CNPJ distinto
+                df_filtrado, invalidos = validador.aplicar(df_filtrado, cnpj_invalidos)
+            yield df_filtrado[colunas], len(chunk), aceitas, falhas, invalidos
+    except Exception as e:
+        raise ErroTrimestre(f"{pasta}/{csv_nome}: {e}") from e
+
+def processar_trimestre(pasta, mapa_operadoras, cnpj_invalidos=None, gravar=True, filtro=None):
+    """Processa o ZIP de uma pasta de data/raw e grava as saídas do trimestre.
+
+    Grava o CSV parcial e, com pyarrow instalado, a partição Parquet, chunk
+    a chunk (saida.py): o trimestre nunca fica inteiro em memória e os
+    arquivos anteriores só são substituídos se o trimestre terminar sem
+    erro. cnpj_invalidos ('marcar' ou 'remover') aplica o DataValidator em cada
+    chunk; filtro (FiltroContas, padrão EVENTO|SINISTRO) seleciona as
+    linhas já na leitura. Retorna {parcial, parquet, linhas, linhas_lidas,
+    sem_cnpj, cnpj_invalidos, filtro}; os caminhos são None quando o
+    trimestre não gerou nenhuma linha e 'filtro' traz a seletividade de
+    cada CSV. Com gravar=False nada vai para o disco e o DataFrame do
+    trimestre vem em resultado['df'].
+
+    Um CSV que não pôde ser lido ou uma falha de escrita interrompem o
+    trimestre (ErroTrimestre / OSError): as saídas são descartadas e as
+    da execução anterior ficam como estavam.
+    """
+    print(f"Processando: {pasta}")
+    try:
+        partes = pasta.split('_')
+        ano, tri = partes[0], partes[1] if len(partes)>1 else "N/A"
+    except: ano, tri = "Unknown", "Unknown"
+
+    caminho_zip = localizar_zip(pasta)
+    if not caminho_zip: return dict(RESULTADO_VAZIO)
     
-    if os.path.exists(TEMP_DIR): shutil.rmtree(TEMP_DIR)
-    os.makedirs(TEMP_DIR)
+    filtro = filtro or FiltroContas()
+    seletividade = {}
+    validador = DataValidator() if cnpj_invalidos else None
+    colunas = COLUNAS_SAIDA + (['CNPJ_VALIDO'] if cnpj_invalidos == 'marcar' else [])
+    qtd_invalidos = 0
+    linhas_lidas = 0
+    sem_cnpj = 0
+    if gravar:
+        saidas = [SaidaCsv(os.path.join(PARCIAIS_DIR, f"{pasta}.csv"), colunas)]
+        if PARQUET_DISPONIVEL:
+            saidas.append(SaidaParquet(ano, tri))
+    else:
+        saidas = [SaidaMemoria()]
+    with ExitStack() as pilha, zipfile.ZipFile(caminho_zip, 'r') as z:
+        for saida in saidas:
+            pilha.enter_context(saida)
+        # Lê os CSVs direto do ZIP (streaming), sem extrair para disco
+        membros = membros_csv(z)
+        
+        for membro in membros:
+            csv_nome = os.path.basename(membro)
+            count = 0
+            falhas_valor = 0
+            lidas_arquivo = 0
+            aceitas_arquivo = 0
+            for df_filtrado, lidas, aceitas, falhas, invalidos in _chunks_tratados(
+                    z, membro, pasta, ano, tri, mapa_operadoras, filtro, validador, cnpj_invalidos, colunas):
+                linhas_lidas += lidas
+                lidas_arquivo += lidas
+                aceitas_arquivo += aceitas
+                falhas_valor += falhas
+                qtd_invalidos += invalidos
+                if df_filtrado.empty: continue
+                # Erro de escrita não é tratado aqui: sobe e o ExitStack descarta as saídas
+                for saida in saidas:
+                    saida.escrever(df_filtrado)
+                sem_cnpj += int((df_filtrado['CNPJ'] == 'N/A').sum())
+                count += len(df_filtrado)
+            taxa = aceitas_arquivo / lidas_arquivo if lidas_arquivo else 0.0
+            seletividade[csv_nome] = {'linhas_lidas': lidas_arquivo, 'linhas_filtradas': aceitas_arquivo,
+                                      'seletividade': round(taxa, 4)}
+            print(f"   -> {csv_nome}: {count} linhas (filtro: {aceitas_arquivo} de {lidas_arquivo}, {taxa:.1%}).")
+            if falhas_valor:
+                print(f"   [!] {csv_nome}: {falhas_valor} valores monetários inválidos (gravados como 0).")
+
+    if validador:
+        acao = 'removidas' if cnpj_invalidos == 'remover' else 'marcadas'
+        print(f"   [!] {pasta}: {qtd_invalidos} linhas com CNPJ inválido ({acao}).")
+    resultado = dict(RESULTADO_VAZIO, linhas=saidas[0].linhas, linhas_lidas=linhas_lidas, sem_cnpj=sem_cnpj,
+                     cnpj_invalidos=qtd_invalidos, filtro=seletividade)
+    if not saidas[0].linhas:
+        return resultado
+    if not gravar:
+        return dict(resultado, df=saidas[0].df)
+    resultado['parcial'] = saidas[0].caminho
+    if PARQUET_DISPONIVEL:
+        resultado['parquet'] = saidas[1].arquivo
+    return resultado
+
+def processar_trimestre_medido(pasta, mapa_operadoras, cnpj_invalidos=None, gravar=True, filtro=None):
+    """processar_trimestre com métricas da etapa em resultado['metricas'] (também nos workers).
+
+    A seletividade do filtro por CSV vai só para as métricas (não para o
+    manifesto). Um trimestre que falhou (ErroTrimestre ou erro de escrita)
+    não derruba os demais: volta sem linhas e com a mensagem em
+    resultado['erro'].
+    """
+    with etapa('processor.trimestre', registrar=False, trimestre=pasta) as registro:
+        try:
+            resultado = processar_trimestre(pasta, mapa_operadoras, cnpj_invalidos, gravar, filtro)
+        except (ErroTrimestre, OSError) as e:
+            print(f"   [ERRO] {pasta}: {e}")
+            registro['erro'] = str(e)
+            resultado = dict(RESULTADO_VAZIO, erro=str(e))
+        registro['linhas_entrada'] = resultado['linhas_lidas']
+        registro['filtro'] = resultado.pop('filtro', {})
+        registro['linhas_saida'] = resultado['linhas']
+        registro['bytes_lidos'] = tamanho_arquivos(localizar_zip(pasta))
+        registro['bytes_escritos'] = tamanho_arquivos(resultado['parcial'], resultado['parquet'])
+    resultado['metricas'] = registro
+    return resultado
+
+def juntar_parciais(parciais, destino):
+    """Concatena as saídas parciais (na ordem recebida) mantendo um único cabeçalho.
+
+    Copia em blocos (memória constante) para um temporário, que só substitui
+    o destino no final.
+    """
+    temporario = caminho_temporario(destino)
+    try:
+        with open(temporario, 'wb') as saida:
+            for i, caminho in enumerate(parciais):
+                with open(caminho, 'rb') as parcial:
+                    cabecalho = parcial.readline()
+                    if i == 0:
+                        saida.write(cabecalho)
+                    shutil.copyfileobj(parcial, saida)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def processar_dados(workers=1, completo=False, cnpj_invalidos=None, cadastro=None, filtro=None):
+    """ETL completo; retorna o total de linhas do consolidado."""
+    filtro = filtro or FiltroContas()
+    with etapa('processor.cadastro') as registro:
+        mapa_operadoras = obter_mapa_operadoras(cadastro)
+        registro['linhas_saida'] = len(mapa_operadoras)
+    versao_cadastro = hash_cadastro(mapa_operadoras)
+    if cnpj_invalidos:
+        # O tratamento de CNPJ muda a saída: entra na versão guardada no manifesto
+        versao_cadastro += f"+cnpj={cnpj_invalidos}"
+    if filtro.versao() != FiltroContas().versao():
+        # Idem para um filtro de contas diferente do padrão
+        versao_cadastro += f"+{filtro.versao()}"
     
-    dados_consolidados = []
     pastas = sorted([p for p in os.listdir(RAW_DIR) if os.path.isdir(os.path.join(RAW_DIR, p))])
     
     print(f"\n--- Iniciando Processamento ETL ---")
 
+    # Manifesto: só reprocessa trimestres com ZIP novo/alterado ou cadastro diferente
+    anterior = {} if completo else carregar_manifesto()
+    manifesto = {}
+    pendentes = []
     for pasta in pastas:
-        print(f"Processando: {pasta}")
-        try:
-            partes = pasta.split('_')
-            ano, tri = partes[0], partes[1] if len(partes)>1 else "N/A"
-        except: ano, tri = "Unknown", "Unknown"
+        caminho_zip = localizar_zip(pasta)
+        if not caminho_zip: continue
+        impressao = impressao_zip(caminho_zip, anterior.get(pasta))
+        if trimestre_atualizado(anterior.get(pasta), impressao, versao_cadastro, PARQUET_DISPONIVEL):
+            print(f"Sem alterações (reaproveitando): {pasta}")
+            manifesto[pasta] = dict(anterior[pasta], **impressao)
+        else:
+            manifesto[pasta] = dict(impressao, versao_cadastro=versao_cadastro)
+            pendentes.append(pasta)
 
-        caminho_pasta = os.path.join(RAW_DIR, pasta)
-        zip_file = next((f for f in os.listdir(caminho_pasta) if f.lower().endswith('.zip')), None)
-        if not zip_file: continue
-        
-        with zipfile.ZipFile(os.path.join(caminho_pasta, zip_file), 'r') as z:
-            z.extractall(TEMP_DIR)
-            csvs = [f for f in os.listdir(TEMP_DIR) if f.lower().endswith('.csv')]
-            
-            for csv_nome in csvs:
-                path_csv = os.path.join(TEMP_DIR, csv_nome)
-                try:
-                    with open(path_csv, 'rb') as f:
-                        raw_data = f.read()
-                    # Tratamento de encoding manual
-                    try:
-                        conteudo_csv = raw_data.decode('utf-8')
-                    except UnicodeDecodeError:
-                        conteudo_csv = raw_data.decode('latin1', errors='replace')
-                    
-                    chunks = pd.read_csv(StringIO(conteudo_csv), sep=';', chunksize=5000, on_bad_lines='skip')
-                    count = 0
-                    for chunk in chunks:
-                        chunk.columns = [c.strip().upper() for c in chunk.columns]
-
-                        # Filtra linhas com 'EVENTO' ou 'SINISTRO' na descrição
-                        filtro = chunk['DESCRICAO'].astype(str).str.upper().str.contains('EVENTO|SINISTRO')
-                        df_filtrado = chunk[filtro].copy()
-                        if df_filtrado.empty: continue
-                        
-                        df_filtrado['REG_ANS'] = df_filtrado['REG_ANS'].astype(str).str.strip().str.lstrip('0')
-                        
-                        # Mapeamentos
-                        df_filtrado['CNPJ'] = df_filtrado['REG_ANS'].map(lambda x: mapa_operadoras.get(x, {}).get('CNPJ', 'N/A'))
-                        df_filtrado['RAZAO_SOCIAL'] = df_filtrado['REG_ANS'].map(lambda x: mapa_operadoras.get(x, {}).get('RAZAO_SOCIAL', 'N/A'))
-                        df_filtrado['UF'] = df_filtrado['REG_ANS'].map(lambda x: mapa_operadoras.get(x, {}).get('UF', 'ND'))
-                        df_filtrado['MODALIDADE'] = df_filtrado['REG_ANS'].map(lambda x: mapa_operadoras.get(x, {}).get('MODALIDADE', 'ND'))     
-                        df_filtrado['TRIMESTRE'] = tri
-                        df_filtrado['ANO'] = ano
-                        df_filtrado['VALOR_DESPESA'] = df_filtrado['VL_SALDO_FINAL'].apply(normalizar_valor)
-                        df_filtrado['DESCRICAO'] = df_filtrado['DESCRICAO'].astype(str).str.strip()
-                        
-                        cols = ['REG_ANS', 'CNPJ', 'RAZAO_SOCIAL', 'UF', 'MODALIDADE', 'TRIMESTRE', 'ANO', 'VALOR_DESPESA', 'DESCRICAO']
-                        
-                        dados_consolidados.append(df_filtrado[cols])
-                        count += len(df_filtrado)
-                    print(f"   -> {csv_nome}: {count} linhas.")
-                except Exception as e: print(f"   [ERRO] {csv_nome}: {e}")
-            for f in os.listdir(TEMP_DIR): os.remove(os.path.join(TEMP_DIR, f))
-
-    if dados_consolidados:
-        df_final = pd.concat(dados_consolidados, ignore_index=True)
-        df_final.to_csv(OUTPUT_FILE, index=False, sep=';', encoding='utf-8')
-        print(f"\nSUCESSO! Arquivo gerado: {OUTPUT_FILE}")
-        
-        sem_cnpj = len(df_final[df_final['CNPJ'] == 'N/A'])
-        print(f"[INFO] Linhas sem match de CNPJ: {sem_cnpj} de {len(df_final)}")
+    if workers > 1 and len(pendentes) > 1:
+        # Um processo por trimestre; o cadastro vai uma vez para cada worker
+        print(f"[INFO] Processando {len(pendentes)} trimestres com {workers} processos.")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                 initargs=(mapa_operadoras, cnpj_invalidos, filtro)) as pool:
+            resultados = list(pool.map(_processar_trimestre_worker, pendentes))
+    else:
+        resultados = [processar_trimestre_medido(pasta, mapa_operadoras, cnpj_invalidos, filtro=filtro)
+                      for pasta in pendentes]
+
+    falhas = {}
+    for pasta, resultado in zip(pendentes, resultados):
+        registrar(resultado.pop('metricas'))
+        manifesto[pasta].update(resultado)
+        if 'erro' in resultado:
+            # Fica no manifesto como erro (sem saídas): a próxima execução reprocessa
+            manifesto[pasta]['status'] = 'erro'
+            falhas[pasta] = resultado['erro']
+        else:
+            manifesto[pasta]['status'] = 'ok'
+    if falhas:
+        # As saídas anteriores (parciais, Parquet e consolidado) ficam como estavam
+        salvar_manifesto(manifesto)
+        raise ErroTrimestre(f"{len(falhas)} trimestre(s) com erro, consolidado não atualizado: "
+                            + '; '.join(f"{p}: {e}" for p, e in falhas.items()))
+    if PARQUET_DISPONIVEL:
+        limpar_particoes(manifesto[p].get('parquet') for p in manifesto)
+
+    # Junta na ordem das pastas: a saída é a mesma do modo serial/completo
+    parciais = [manifesto[p]['parcial'] for p in sorted(manifesto) if manifesto[p]['parcial']]
+    total = sum(manifesto[p]['linhas'] for p in manifesto)
+    sem_cnpj = sum(manifesto[p]['sem_cnpj'] for p in manifesto)
+
+    if parciais:
+        if pendentes or not os.path.exists(OUTPUT_FILE) or set(manifesto) != set(anterior):
+            with etapa('processor.juntar', linhas_saida=total) as registro:
+                juntar_parciais(parciais, OUTPUT_FILE)
+                registro['bytes_escritos'] = tamanho_arquivos(OUTPUT_FILE)
+            print(f"\nSUCESSO! Arquivo gerado: {OUTPUT_FILE}")
+            if PARQUET_DISPONIVEL:
+                print(f"[INFO] Saída colunar (Parquet) por ANO/TRIMESTRE em: {PARQUET_DIR}")
+        else:
+            print(f"\nNenhum trimestre alterado: {OUTPUT_FILE} já está atualizado.")
+        print(f"[INFO] Linhas sem match de CNPJ: {sem_cnpj} de {total}")
+        if cnpj_invalidos:
+            invalidos = sum(manifesto[p].get('cnpj_invalidos', 0) for p in manifesto)
+            acao = 'removidas' if cnpj_invalidos == 'remover' else 'marcadas em CNPJ_VALIDO'
+            print(f"[INFO] Linhas com CNPJ inválido (módulo 11): {invalidos} ({acao}).")
+    else:
+        print("\n[AVISO] Nada encontrado.")
+    salvar_manifesto(manifesto)
+    return total
+
+def processar_em_memoria(workers=1, cnpj_invalidos=None, cadastro=None, filtro=None):
+    """Processa todos os trimestres sem gravar nada e devolve o consolidado como DataFrame.
+
+    Mesmas linhas e ordem do consolidado.csv; usado pelo pipeline.py, que
+    passa o resultado direto para a agregação e a carga do banco. Retorna
+    None se não houver nenhuma linha.
+    """
+    with etapa('processor.cadastro') as registro:
+        mapa_operadoras = obter_mapa_operadoras(cadastro)
+        registro['linhas_saida'] = len(mapa_operadoras)
+
+    pastas = sorted(p for p in os.listdir(RAW_DIR)
+                    if os.path.isdir(os.path.join(RAW_DIR, p)) and localizar_zip(p))
+    print(f"\n--- Iniciando Processamento ETL (em memória) ---")
+    if workers > 1 and len(pastas) > 1:
+        print(f"[INFO] Processando {len(pastas)} trimestres com {workers} processos.")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                 initargs=(mapa_operadoras, cnpj_invalidos, filtro)) as pool:
+            resultados = list(pool.map(partial(_processar_trimestre_worker, gravar=False), pastas))
     else:
+        resultados = [processar_trimestre_medido(pasta, mapa_operadoras, cnpj_invalidos, gravar=False, filtro=filtro)
+                      for pasta in pastas]
+
+    partes = []
+    for resultado in resultados:
+        registrar(resultado.pop('metricas'))
+        if 'erro' in resultado:
+            raise ErroTrimestre(resultado['erro'])
+        if 'df' in resultado:
+            partes.append(resultado['df'])
+    if not partes:
         print("\n[AVISO] Nada encontrado.")
+        return None
+    df = pd.concat(partes, ignore_index=True)
+    print(f"[INFO] Linhas sem match de CNPJ: {sum(r['sem_cnpj'] for r in resultados)} de {len(df)}")
+    return df
+
+def cli(argv=None, prog=None):
+    args = parser_processor(prog).parse_args(argv)
+    if args.atualizar_cadastro:
+        cache_cadastro.invalidar_cache()
+    filtro = FiltroContas(args.filtro, args.contas.split(',') if args.contas else None)
+    try:
+        with etapa('processor', workers=args.workers) as registro:
+            registro['linhas_saida'] = processar_dados(workers=args.workers, completo=args.full,
+                                                       cnpj_invalidos=args.cnpj, cadastro=args.cadastro,
+                                                       filtro=filtro)
+    except ErroTrimestre as e:
+        print(f"\n[ERRO] {e}")
+        salvar_relatorio('processor')
+        sys.exit(1)
+    salvar_relatorio('processor')
 
 if __name__ == "__main__":
-    processar_dados()
-    if os.path.exists(TEMP_DIR): shutil.rmtree(TEMP_DIR)
\ No newline at end of file
+    cli()
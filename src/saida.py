@@ -0,0 +1,98 @@
+import os
+import pandas as pd
+
+# Destinos das linhas processadas, escritos chunk a chunk: o processor não
+# acumula o trimestre inteiro em memória para gravar no final. Os arquivos
+# são escritos num temporário e só trocados pelo definitivo (os.replace) se
+# tudo der certo; com erro, o arquivo anterior continua intacto.
+
+class Saida:
+    """Interface das saídas: escrever(df) por chunk e fechar() (ou descartar()) no fim.
+
+    Como context manager, fecha ao sair normalmente e descarta se houver
+    exceção. fechar() retorna o caminho gravado (None se nenhuma linha
+    foi escrita).
+    """
+
+    def __init__(self):
+        self.linhas = 0
+
+    def escrever(self, df):
+        raise NotImplementedError
+
+    def fechar(self):
+        raise NotImplementedError
+
+    def descartar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+def caminho_temporario(caminho):
+    """Temporário na mesma pasta (o os.replace precisa do mesmo sistema de arquivos)."""
+    pasta, nome = os.path.split(caminho)
+    return os.path.join(pasta, f".{nome}.tmp")
+
+class SaidaCsv(Saida):
+    """CSV ';' utf-8 escrito chunk a chunk: cabeçalho só no primeiro, troca atômica no fechar()."""
+
+    def __init__(self, caminho, colunas=None):
+        super().__init__()
+        self.caminho = caminho
+        self.colunas = colunas
+        self._temporario = caminho_temporario(caminho)
+        self._arquivo = None
+
+    def escrever(self, df):
+        if df.empty:
+            return
+        if self._arquivo is None:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            self._arquivo = open(self._temporario, 'w', encoding='utf-8', newline='')
+        df.to_csv(self._arquivo, index=False, sep=';', columns=self.colunas, header=self.linhas == 0)
+        self.linhas += len(df)
+
+    def fechar(self):
+        if self._arquivo is None:
+            return None
+        self._arquivo.close()
+        self._arquivo = None
+        os.replace(self._temporario, self.caminho)
+        return self.caminho
+
+    def descartar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+class SaidaMemoria(Saida):
+    """Junta os chunks num DataFrame (pipeline em memória); fechar() não grava nada."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self.df = None
+
+    def escrever(self, df):
+        if not df.empty:
+            self._partes.append(df)
+            self.linhas += len(df)
+
+    def fechar(self):
+        if self._partes:
+            self.df = pd.concat(self._partes, ignore_index=True)
+        self._partes = []
+        return None
+
+    def descartar(self):
+        self._partes = []
@@ -0,0 +1,255 @@
+import sqlite3
+
+# DDL do banco (SQLite) e índices usados pelos relatórios do analytics_queries.py
+
+# Tabelas na ordem de criação (operadoras antes de despesas por causa da FK)
+TABELAS = {
+    # Tabela Operadoras (Dimensão)
+    'operadoras': """
+    CREATE TABLE IF NOT EXISTS operadoras (
+        reg_ans TEXT PRIMARY KEY,
+        cnpj TEXT,
+        razao_social TEXT,
+        uf TEXT,
+        modalidade TEXT
+    );
+    """,
+    # Tabela Despesas (Fatos)
+    'despesas': """
+    CREATE TABLE IF NOT EXISTS despesas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reg_ans TEXT,
+        trimestre TEXT,
+        ano INTEGER,
+        valor_despesa REAL,
+        descricao TEXT,
+        FOREIGN KEY (reg_ans) REFERENCES operadoras(reg_ans)
+    );
+    """,
+    # Resumo materializado por operadora/trimestre (mantido pelo db_loader):
+    # é o que as queries 1 e 3 agregavam a partir de despesas a cada execução
+    'despesas_operadora_trimestre': """
+    CREATE TABLE IF NOT EXISTS despesas_operadora_trimestre (
+        reg_ans TEXT,
+        trimestre TEXT,
+        ano INTEGER,
+        total_despesas REAL,
+        qtd_lancamentos INTEGER,
+        PRIMARY KEY (reg_ans, trimestre)
+    );
+    """,
+    # Tabela Agregada (Para consultas rápidas/Dashboard)
+    'despesas_agregadas': """
+    CREATE TABLE IF NOT EXISTS despesas_agregadas (
+        razao_social TEXT,
+        uf TEXT,
+        total_despesas REAL,
+        media_trimestral REAL,
+        desvio_padrao REAL,
+        qtd_lancamentos INTEGER
+    );
+    """,
+}
+
+# Índices secundários (cobrindo os acessos das queries 1-3). A carga rápida
+# remove todos antes de inserir e recria no final.
+INDICES = {
+    # GROUP BY reg_ans, trimestre + SUM(valor_despesa) do resumo trimestral e
+    # o lado despesas do JOIN da query 2: tudo sai do índice, sem ler a tabela
+    'idx_despesas_reg_ans_trimestre':
+        "CREATE INDEX IF NOT EXISTS idx_despesas_reg_ans_trimestre ON despesas (reg_ans, trimestre, valor_despesa)",
+    # JOIN por reg_ans trazendo razao_social (query 1), mesmo sem a PK da
+    # tabela (o import_data via to_sql recria operadoras sem ela)
+    'idx_operadoras_reg_ans':
+        "CREATE INDEX IF NOT EXISTS idx_operadoras_reg_ans ON operadoras (reg_ans, razao_social)",
+    # Filtro/agrupamento por UF com COUNT(DISTINCT reg_ans) (query 2)
+    'idx_operadoras_uf':
+        "CREATE INDEX IF NOT EXISTS idx_operadoras_uf ON operadoras (uf, reg_ans)",
+    # Filtro por trimestre e média de mercado sobre o resumo (queries 1 e 3)
+    'idx_resumo_trimestre':
+        "CREATE INDEX IF NOT EXISTS idx_resumo_trimestre ON despesas_operadora_trimestre (trimestre, total_despesas, reg_ans)",
+    'idx_despesas_agregadas_uf':
+        "CREATE INDEX IF NOT EXISTS idx_despesas_agregadas_uf ON despesas_agregadas (uf)",
+    # Busca por CNPJ (completo ou prefixo) na API
+    'idx_operadoras_cnpj':
+        "CREATE INDEX IF NOT EXISTS idx_operadoras_cnpj ON operadoras (cnpj)",
+}
+
+# Esquema compacto (db_loader.py --compacto): chaves inteiras, período
+# ano*10+trimestre (1T2025 -> 20251), valores em centavos inteiros e a
+# descrição numa dimensão própria, em vez de texto repetido em cada linha.
+TABELAS_COMPACTAS = {
+    'operadoras': """
+    CREATE TABLE IF NOT EXISTS operadoras (
+        reg_ans INTEGER PRIMARY KEY,
+        cnpj TEXT,
+        razao_social TEXT,
+        uf TEXT,
+        modalidade TEXT
+    );
+    """,
+    # Dimensão das descrições de conta (poucas dezenas de textos distintos)
+    'descricoes': """
+    CREATE TABLE IF NOT EXISTS descricoes (
+        id INTEGER PRIMARY KEY,
+        descricao TEXT UNIQUE
+    );
+    """,
+    'despesas': """
+    CREATE TABLE IF NOT EXISTS despesas (
+        id INTEGER PRIMARY KEY,
+        reg_ans INTEGER,
+        periodo INTEGER,
+        valor_centavos INTEGER,
+        descricao_id INTEGER,
+        FOREIGN KEY (reg_ans) REFERENCES operadoras(reg_ans),
+        FOREIGN KEY (descricao_id) REFERENCES descricoes(id)
+    );
+    """,
+    'despesas_operadora_trimestre': """
+    CREATE TABLE IF NOT EXISTS despesas_operadora_trimestre (
+        reg_ans INTEGER,
+        periodo INTEGER,
+        total_centavos INTEGER,
+        qtd_lancamentos INTEGER,
+        PRIMARY KEY (reg_ans, periodo)
+    ) WITHOUT ROWID;
+    """,
+    'despesas_agregadas': TABELAS['despesas_agregadas'],
+}
+
+# reg_ans é a própria rowid de operadoras: o JOIN não precisa de índice extra
+INDICES_COMPACTOS = {
+    'idx_despesas_reg_ans_periodo':
+        "CREATE INDEX IF NOT EXISTS idx_despesas_reg_ans_periodo ON despesas (reg_ans, periodo, valor_centavos)",
+    'idx_operadoras_uf':
+        "CREATE INDEX IF NOT EXISTS idx_operadoras_uf ON operadoras (uf, reg_ans)",
+    'idx_resumo_periodo':
+        "CREATE INDEX IF NOT EXISTS idx_resumo_periodo ON despesas_operadora_trimestre (periodo, total_centavos, reg_ans)",
+    'idx_despesas_agregadas_uf': INDICES['idx_despesas_agregadas_uf'],
+    'idx_operadoras_cnpj': INDICES['idx_operadoras_cnpj'],
+}
+
+# Versão dos dados: uma linha, incrementada a cada carga/troca de esquema
+# (fora de TABELAS/TABELAS_COMPACTAS para não ser apagada na troca). O
+# cache de resultados do consultas.py é invalidado quando ela muda.
+TABELA_VERSAO = """
+    CREATE TABLE IF NOT EXISTS versao_dados (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL,
+        atualizado_em TEXT
+    );
+    """
+
+# Índice de texto (FTS5) da razão social para a busca da API, refeito pelo
+# db_loader a cada carga. Sem acentos: "saude" encontra "SAÚDE".
+TABELA_BUSCA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS operadoras_busca USING fts5(
+        razao_social, reg_ans UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """
+
+def periodo(trimestre):
+    """'1T2025' -> 20251 (chave inteira do esquema compacto); None se o formato for outro."""
+    texto = str(trimestre)
+    if len(texto) == 6 and texto[1] in 'Tt' and texto[0].isdigit() and texto[2:].isdigit():
+        return int(texto[2:]) * 10 + int(texto[0])
+    return None
+
+def schema_compacto(cursor):
+    """True se o banco já foi criado com o esquema compacto."""
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'descricoes'").fetchone() is not None
+
+def _definicoes(compacto):
+    return (TABELAS_COMPACTAS, INDICES_COMPACTOS) if compacto else (TABELAS, INDICES)
+
+def _estrutura(cursor, tabela):
+    """Colunas da tabela como (nome, tipo, posição na PK); [] se ela não existe."""
+    return [(c[1], c[2].upper(), c[5]) for c in cursor.execute(f"PRAGMA table_info({tabela})")]
+
+def tabelas_divergentes(cursor, compacto=False):
+    """Tabelas existentes com colunas ou PK diferentes do DDL.
+
+    Ex.: operadoras e despesas recriadas pelo to_sql do import_data, sem
+    PK; nelas o INSERT OR IGNORE da carga incremental não deduplica nada.
+    """
+    tabelas, _ = _definicoes(compacto)
+    modelo = sqlite3.connect(':memory:')
+    try:
+        divergentes = []
+        for nome, ddl in tabelas.items():
+            modelo.execute(ddl)
+            atual = _estrutura(cursor, nome)
+            if atual and atual != _estrutura(modelo.cursor(), nome):
+                divergentes.append(nome)
+        return divergentes
+    finally:
+        modelo.close()
+
+def criar_tabelas(cursor, compacto=False):
+    """Cria as tabelas que faltam; retorna as que foram apagadas e recriadas (com os dados perdidos).
+
+    Na troca de esquema (normal <-> compacto) todas as tabelas são
+    recriadas; fora dela, só as com estrutura diferente do DDL
+    (tabelas_divergentes). Nos dois casos a carga seguinte precisa ser
+    completa.
+    """
+    tabelas, _ = _definicoes(compacto)
+    recriadas = []
+    if schema_compacto(cursor) != compacto:
+        # Troca de esquema: as tabelas antigas têm outras colunas e todas são recriadas
+        recriadas = [nome for nome in TABELAS_COMPACTAS if _estrutura(cursor, nome)]
+        for nome in reversed(list(TABELAS_COMPACTAS)):
+            cursor.execute(f"DROP TABLE IF EXISTS {nome}")
+    else:
+        recriadas = tabelas_divergentes(cursor, compacto)
+        for nome in reversed(recriadas):
+            cursor.execute(f"DROP TABLE {nome}")
+    for ddl in tabelas.values():
+        cursor.execute(ddl)
+    cursor.execute(TABELA_VERSAO)
+    return recriadas
+
+def marcar_versao(cursor):
+    """Incrementa a versão dos dados (chamar na mesma transação da carga)."""
+    cursor.execute(TABELA_VERSAO)
+    cursor.execute("""
+    INSERT INTO versao_dados (id, versao, atualizado_em) VALUES (1, 1, datetime('now'))
+    ON CONFLICT (id) DO UPDATE SET versao = versao + 1, atualizado_em = excluded.atualizado_em
+    """)
+
+def atualizar_busca(cursor):
+    """Refaz operadoras_busca a partir de operadoras; False se o SQLite não tiver FTS5."""
+    try:
+        cursor.execute(TABELA_BUSCA)
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("DELETE FROM operadoras_busca")
+    cursor.execute("""
+    INSERT INTO operadoras_busca (razao_social, reg_ans)
+    SELECT razao_social, reg_ans FROM operadoras WHERE razao_social IS NOT NULL
+    """)
+    return True
+
+def busca_disponivel(cursor):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'operadoras_busca'").fetchone() is not None
+
+def versao_dados(cursor):
+    """Versão atual dos dados; None em banco criado antes da tabela versao_dados."""
+    try:
+        linha = cursor.execute("SELECT versao FROM versao_dados WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return linha[0] if linha else 0
+
+def criar_indices(cursor, compacto=False):
+    _, indices = _definicoes(compacto)
+    for ddl in indices.values():
+        cursor.execute(ddl)
+    # Estatísticas para o planejador escolher os índices acima
+    cursor.execute("ANALYZE")
+
+def remover_indices(cursor, compacto=False):
+    _, indices = _definicoes(compacto)
+    for nome in indices:
+        cursor.execute(f"DROP INDEX IF EXISTS {nome}")
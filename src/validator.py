@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Pesos do módulo 11 para o 1º e o 2º dígito verificador do CNPJ
+PESOS_DV1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_DV2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+def digito_verificador(digitos, pesos):
+    """Dígito verificador (módulo 11) de cada linha de uma matriz de dígitos com len(pesos) colunas."""
+    resto = digitos @ pesos % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+def _normalizar(serie):
+    """CNPJ como texto só com dígitos, completando zeros à esquerda (perdidos quando o CSV vira número)."""
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype('Int64')
+    texto = serie.astype(object).where(serie.notna(), '').astype(str)
+    digitos = texto.str.replace(r'\D', '', regex=True)
+    return digitos.where(digitos == '', digitos.str.zfill(14))
+
+def validar_cnpjs_array(cnpjs):
+    """Valida um array de CNPJs (só dígitos) de uma vez, via matriz N x 14.
+
+    Os dois dígitos verificadores são calculados com produto escalar contra
+    os pesos; CNPJ com tamanho diferente de 14 ou dígitos todos iguais é
+    inválido.
+    """
+    cnpjs = np.asarray(cnpjs, dtype=object)
+    validos = np.zeros(len(cnpjs), dtype=bool)
+    tamanho_ok = np.fromiter((len(c) == 14 for c in cnpjs), dtype=bool, count=len(cnpjs))
+    if not tamanho_ok.any():
+        return validos
+
+    digitos = np.array(cnpjs[tamanho_ok].tolist(), dtype='S14').view(np.uint8).reshape(-1, 14).astype(np.int64) - ord('0')
+    dv1 = digito_verificador(digitos[:, :12], PESOS_DV1)
+    dv2 = digito_verificador(digitos[:, :13], PESOS_DV2)
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+    validos[tamanho_ok] = (digitos[:, 12] == dv1) & (digitos[:, 13] == dv2) & ~repetidos
+    return validos
+
+class DataValidator:
+    """Validação matemática de CNPJ (módulo 11) em lote, com cache por CNPJ.
+
+    As mesmas poucas milhares de operadoras se repetem em milhões de linhas:
+    cada CNPJ distinto é calculado uma única vez por instância.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def validar_cnpjs(self, serie):
+        """Retorna uma Series booleana (mesmo índice) dizendo se cada CNPJ é válido."""
+        normalizados = _normalizar(serie)
+        distintos = pd.unique(normalizados.to_numpy(dtype=object))
+        novos = [c for c in distintos if c not in self._cache]
+        if novos:
+            self._cache.update(zip(novos, validar_cnpjs_array(novos).tolist()))
+        return normalizados.map(self._cache).astype(bool)
+
+    def aplicar(self, df, modo, coluna='CNPJ'):
+        """Marca (coluna CNPJ_VALIDO) ou remove as linhas com CNPJ inválido.
+
+        Retorna (df, qtd_invalidos).
+        """
+        validos = self.validar_cnpjs(df[coluna])
+        invalidos = int((~validos).sum())
+        if modo == 'remover':
+            return df[validos], invalidos
+        df = df.copy()
+        df['CNPJ_VALIDO'] = validos
+        return df, invalidos
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os scripts de src/ se importam pelo nome (python src/<script>.py): mesmo caminho nos testes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
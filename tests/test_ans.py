@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+
+import ans
+from comandos import PARSERS
+
+
+@pytest.mark.parametrize('argumentos', list(ans._casos().values()), ids=list(ans._casos()))
+def test_help_nao_importa_modulos_pesados(argumentos):
+    assert ans.modulos_pesados_na_partida(argumentos) == []
+
+
+def test_todo_comando_tem_parser_leve():
+    assert {modulo for modulo, _ in ans.COMANDOS.values()} <= set(PARSERS)
+
+
+def test_falhas_partida_limite_e_baseline():
+    medicao = {'comandos': {'ans --help': {'acrescimo_s': 0.02},
+                            'ans process --help': {'acrescimo_s': 0.5}},
+               'modulos_pesados': {'ans process --help': ['pandas']}}
+    baseline = {'ans --help': {'acrescimo_s': 0.02}, 'ans process --help': {'acrescimo_s': 0.02}}
+    falhas = ans.falhas_partida(medicao, baseline)
+    assert len(falhas) == 3
+    assert all(f.startswith('ans process --help') for f in falhas)
+    assert ans.falhas_partida({'comandos': {'ans': {'acrescimo_s': 0.02}}, 'modulos_pesados': {}}) == []
+
+
+@pytest.mark.parametrize('argumentos', [[], ['--help']], ids=['ans', 'ans --help'])
+def test_partida_dentro_do_limite(argumentos):
+    # Acréscimo medido (mediana de processos novos) sobre um python -c pass
+    base = ans._tempo_mediano([sys.executable, '-c', 'pass'], ans.REPETICOES)
+    tempo = ans._tempo_mediano(ans._executavel() + argumentos, ans.REPETICOES)
+    assert tempo - base < ans.LIMITE_PARTIDA_S
@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import api
+
+
+class ApiFalsa:
+    """Só o responder(): registra os caminhos pedidos, sem banco."""
+
+    def __init__(self):
+        self.caminhos = []
+
+    def responder(self, caminho, params):
+        self.caminhos.append(caminho)
+        return 200, {'caminho': caminho}
+
+
+def _conversar(dados):
+    """Manda os bytes numa conexão só e devolve (respostas lidas até o servidor fechar, caminhos atendidos)."""
+    falsa = ApiFalsa()
+
+    async def rodar():
+        executor = ThreadPoolExecutor(max_workers=1)
+        servidor = await asyncio.start_server(partial(api.atender, falsa, executor), '127.0.0.1', 0)
+        porta = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+            escritor.write(dados)
+            await escritor.drain()
+            resposta = await asyncio.wait_for(leitor.read(), timeout=5)
+            escritor.close()
+        executor.shutdown()
+        return resposta
+
+    resposta = asyncio.run(rodar())
+    return [b'HTTP/1.1 ' + r for r in resposta.split(b'HTTP/1.1 ')[1:]], falsa.caminhos
+
+
+def test_corpo_do_post_nao_vira_requisicao():
+    embutida = b"GET /embutida HTTP/1.1\r\nHost: x\r\n\r\n"
+    dados = (b"POST /versao HTTP/1.1\r\nHost: x\r\nContent-Length: " + str(len(embutida)).encode()
+             + b"\r\n\r\n" + embutida
+             + b"GET /versao HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+    respostas, caminhos = _conversar(dados)
+    assert caminhos == ['/versao']
+    assert [r.split(b'\r\n')[0] for r in respostas] == [b'HTTP/1.1 405 Method Not Allowed', b'HTTP/1.1 200 OK']
+
+
+def test_corpo_chunked_fecha_a_conexao():
+    dados = (b"POST /versao HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n"
+             b"1c\r\nGET /embutida HTTP/1.1\r\n\r\n\r\n0\r\n\r\n")
+    respostas, caminhos = _conversar(dados)
+    assert caminhos == []
+    assert len(respostas) == 1 and b'Connection: close' in respostas[0]
+
+
+def test_cabecalho_grande_demais_fecha_a_conexao():
+    dados = (b"GET /versao HTTP/1.1\r\nX-Grande: " + b'a' * (api.TAMANHO_MAX_CABECALHO + 10)
+             + b"\r\n\r\nGET /embutida HTTP/1.1\r\n\r\n")
+    respostas, caminhos = _conversar(dados)
+    assert caminhos == []
+    assert len(respostas) == 1 and respostas[0].startswith(b'HTTP/1.1 431')
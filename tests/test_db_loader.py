@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+import db_loader
+from aggregator import gerar_agregacao
+from test_planos import _consolidado
+
+
+@pytest.fixture
+def pragmas(tmp_path, monkeypatch):
+    """PRAGMAs executados pela carga (trace das conexões do db_loader)."""
+    monkeypatch.chdir(tmp_path)
+    executados = []
+
+    def conectar():
+        conn = sqlite3.connect(db_loader.DB_PATH)
+        conn.set_trace_callback(lambda sql: executados.append(sql) if sql.startswith('PRAGMA') else None)
+        return conn
+
+    monkeypatch.setattr(db_loader, 'get_connection', conectar)
+    return executados
+
+
+def test_journal_desligado_so_na_carga_completa(pragmas):
+    consolidado = _consolidado()
+    agregado = gerar_agregacao(consolidado=consolidado, exportar=False)
+    db_loader.setup_database()
+    db_loader.import_data_rapido(consolidado=consolidado, agregado=agregado)
+    assert "PRAGMA journal_mode = MEMORY" in pragmas and "PRAGMA synchronous = OFF" in pragmas
+
+    pragmas.clear()
+    db_loader.import_data_rapido(trimestres=['3T2025'], consolidado=consolidado, agregado=agregado)
+    assert not [p for p in pragmas if 'journal_mode' in p or 'synchronous' in p]
+    conn = sqlite3.connect(db_loader.DB_PATH)
+    assert conn.execute("SELECT COUNT(*) FROM despesas").fetchone()[0] == len(consolidado)
+    conn.close()
@@ -0,0 +1,147 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import extraction
+
+# Diretório da ANS em miniatura: anos com ZIP solto e com pasta do trimestre
+PAGINAS = {
+    '/': ['2025/', '2024/'],
+    '/2025/': ['1T2025.zip', '2T2025/'],
+    '/2025/2T2025/': ['2T2025.zip'],
+    '/2024/': ['4T2024.zip'],
+}
+ARQUIVOS = {
+    '/2025/1T2025.zip': b'1T' * 300_000,
+    '/2025/2T2025/2T2025.zip': b'2T' * 200_000,
+    '/2024/4T2024.zip': b'4T' * 100_000,
+}
+# Onde o main() grava cada arquivo (data/raw/<ano>_<trimestre>/<nome>)
+DESTINOS = {
+    '/2025/1T2025.zip': 'data/raw/2025_1T2025/1T2025.zip',
+    '/2025/2T2025/2T2025.zip': 'data/raw/2025_2T2025/2T2025.zip',
+    '/2024/4T2024.zip': 'data/raw/2024_4T2024/4T2024.zip',
+}
+
+
+class ServidorANS(BaseHTTPRequestHandler):
+    """Listagens HTML e ZIPs com ETag, Content-Length e Range; registra os GETs de arquivo."""
+
+    arquivos = {}
+    etags = {}
+    downloads = []
+    retomadas = []  # GETs respondidos com 206: (caminho, byte inicial)
+
+    def log_message(self, *args):
+        pass
+
+    def _cabecalhos_arquivo(self, caminho):
+        self.send_header('ETag', self.etags[caminho])
+        self.send_header('Accept-Ranges', 'bytes')
+
+    def do_HEAD(self):
+        if self.path in self.arquivos:
+            self.send_response(200)
+            self._cabecalhos_arquivo(self.path)
+            self.send_header('Content-Length', str(len(self.arquivos[self.path])))
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path in PAGINAS:
+            corpo = ''.join(f'<a href="{l}">{l}</a>' for l in ['../'] + PAGINAS[self.path]).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            return
+        if self.path not in self.arquivos:
+            self.send_error(404)
+            return
+        self.downloads.append(self.path)
+        dados = self.arquivos[self.path]
+        intervalo = self.headers.get('Range')
+        if intervalo and self.headers.get('If-Range', self.etags[self.path]) == self.etags[self.path]:
+            inicio = int(intervalo.split('=')[1].split('-')[0])
+            self.retomadas.append((self.path, inicio))
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {inicio}-{len(dados) - 1}/{len(dados)}")
+            dados = dados[inicio:]
+        else:
+            self.send_response(200)
+        self._cabecalhos_arquivo(self.path)
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    """Servidor local em porta livre; o teste roda com cwd em tmp_path (data/raw relativo)."""
+    ServidorANS.arquivos = dict(ARQUIVOS)
+    ServidorANS.etags = {c: f'"v1-{i}"' for i, c in enumerate(ARQUIVOS)}
+    ServidorANS.downloads = []
+    ServidorANS.retomadas = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ServidorANS)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(extraction, 'BACKOFF', 0)
+    yield f"http://127.0.0.1:{httpd.server_port}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read()
+
+
+def test_download_novo(servidor):
+    extraction.main(base_url=servidor, workers=2)
+    assert sorted(ServidorANS.downloads) == sorted(ARQUIVOS)
+    for caminho, destino in DESTINOS.items():
+        assert _ler(destino) == ARQUIVOS[caminho]
+        assert _ler(destino + '.etag') == ServidorANS.etags[caminho].encode()
+        assert not os.path.exists(destino + '.part')
+
+
+def test_pula_arquivo_com_mesmo_etag_e_tamanho(servidor):
+    extraction.main(base_url=servidor, workers=2)
+    ServidorANS.downloads.clear()
+    extraction.main(base_url=servidor, workers=2)
+    assert ServidorANS.downloads == []
+
+
+def test_baixa_de_novo_arquivo_truncado(servidor):
+    extraction.main(base_url=servidor, workers=2)
+    destino = DESTINOS['/2025/1T2025.zip']
+    with open(destino, 'r+b') as f:
+        f.truncate(1000)
+    ServidorANS.downloads.clear()
+    extraction.main(base_url=servidor, workers=2)
+    assert ServidorANS.downloads == ['/2025/1T2025.zip']
+    assert _ler(destino) == ARQUIVOS['/2025/1T2025.zip']
+
+
+def test_baixa_de_novo_quando_etag_muda(servidor):
+    extraction.main(base_url=servidor, workers=2)
+    novo = b'XX' * 100_000
+    ServidorANS.arquivos['/2024/4T2024.zip'] = novo
+    ServidorANS.etags['/2024/4T2024.zip'] = '"v2"'
+    ServidorANS.downloads.clear()
+    extraction.main(base_url=servidor, workers=2)
+    assert ServidorANS.downloads == ['/2024/4T2024.zip']
+    assert _ler(DESTINOS['/2024/4T2024.zip']) == novo
+
+
+def test_retoma_part_com_range(servidor):
+    destino = DESTINOS['/2025/2T2025/2T2025.zip']
+    os.makedirs(os.path.dirname(destino))
+    with open(destino + '.part', 'wb') as f:
+        f.write(ARQUIVOS['/2025/2T2025/2T2025.zip'][:5000])
+    extraction.main(base_url=servidor, workers=2)
+    assert ServidorANS.retomadas == [('/2025/2T2025/2T2025.zip', 5000)]
+    assert _ler(destino) == ARQUIVOS['/2025/2T2025/2T2025.zip']
@@ -0,0 +1,19 @@
+import sys
+
+import numpy as np
+import pytest
+
+import instrumentacao
+
+
+# RSS amostrado de /proc/self/statm: só existe no Linux
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="sem /proc/self/statm")
+def test_rss_pico_e_da_etapa_e_nao_do_processo():
+    with instrumentacao.etapa('teste.grande', registrar=False) as grande:
+        bloco = np.ones(40_000_000)  # ~300 MB
+        del bloco
+    with instrumentacao.etapa('teste.pequena', registrar=False) as pequena:
+        pass
+    assert grande['rss_pico_mb'] - pequena['rss_pico_mb'] > 200
+    assert pequena['rss_processo_pico_mb'] >= grande['rss_pico_mb']
+    assert not instrumentacao._picos_rss
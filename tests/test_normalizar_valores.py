@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from processor import normalizar_valor, normalizar_valores, centavos_de_float
+from dados_sinteticos import _formatar_valores
+
+# Conjunto de referência: a versão vetorizada tem de devolver exatamente o
+# mesmo float que normalizar_valor (a implementação original, por célula)
+CASOS_OURO = [
+    '1.234,56', '-1.234,56', '1234,56', '1234.56', '-1234.56', '12', '-12', '0', '-0',
+    '0,00', '-0,00', '-0.00', '0,005', '-0,005', '1,005', '3,14159', '1.234.567,89',
+    '  42,10 ', '', '   ', '999999999999999', '1234567890123,005', '0,0050000000000000',
+    'abc', '12a', '1,2,3', '-', ',', 'R$ 10,00', 'ÇÃO', None, np.nan,
+]
+# Textos em que normalizar_valor levantava ValueError (o float() fora do
+# try): a versão vetorizada grava 0 e conta a falha
+CASOS_ERRO_ORIGINAL = ['--5', '5-', '1.234.567', '1-2']
+
+def _bits(valores):
+    """Representação exata dos floats (distingue 0.0 de -0.0)."""
+    return np.asarray(valores, dtype='float64').view(np.int64).tolist()
+
+def _referencia(valores):
+    return [normalizar_valor(v) for v in valores]
+
+def test_casos_ouro_iguais_a_normalizar_valor():
+    valores, _ = normalizar_valores(pd.Series(CASOS_OURO, dtype=object))
+    assert _bits(valores) == _bits(_referencia(CASOS_OURO))
+
+def test_sinal_do_zero_preservado():
+    valores, falhas = normalizar_valores(pd.Series(['-0,00', '-0', '0,00'], dtype=object))
+    assert np.signbit(valores.to_numpy()).tolist() == [True, True, False]
+    assert falhas == 0
+
+def test_valores_sinteticos_iguais_a_normalizar_valor():
+    textos = _formatar_valores(np.random.default_rng(7), 20000)
+    valores, falhas = normalizar_valores(pd.Series(textos, dtype=object))
+    assert _bits(valores) == _bits(_referencia(textos))
+    assert falhas == 0
+
+def test_erros_da_versao_original_viram_falha():
+    for texto in CASOS_ERRO_ORIGINAL:
+        with pytest.raises(ValueError):
+            normalizar_valor(texto)
+    valores, falhas = normalizar_valores(pd.Series(CASOS_ERRO_ORIGINAL, dtype=object))
+    assert valores.tolist() == [0.0] * len(CASOS_ERRO_ORIGINAL)
+    assert falhas == len(CASOS_ERRO_ORIGINAL)
+
+def test_falhas_contadas():
+    # Vazio e nulo valem 0 sem contar como falha; texto não numérico conta
+    _, falhas = normalizar_valores(pd.Series(['', '  ', None, np.nan, 'abc', '1,2,3', '10,00'], dtype=object))
+    assert falhas == 2
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('0,005', 1), ('-0,005', -1), ('0,004', 0), ('1,005', 101), ('2,675', 268),
+    ('1.234,565', 123457), ('-0,00', 0), ('12', 1200), ('', 0),
+])
+def test_centavos_meio_centavo_longe_do_zero(texto, esperado):
+    centavos, _ = normalizar_valores(pd.Series([texto], dtype=object), centavos=True)
+    assert centavos.tolist() == [esperado]
+
+@pytest.mark.parametrize('rapido, lento', [
+    # Mais de 15 dígitos força o caminho lento para o mesmo valor
+    ('0,005', '0,0050000000000000'),
+    ('-0,005', '-0,0050000000000000'),
+    ('1,005', '1,0050000000000000'),
+    ('2,675', '2,6750000000000000'),
+])
+def test_centavos_mesmo_arredondamento_nos_dois_caminhos(rapido, lento):
+    centavos, falhas = normalizar_valores(pd.Series([rapido, lento], dtype=object), centavos=True)
+    assert centavos.iloc[0] == centavos.iloc[1]
+    assert falhas == 0
+
+def test_centavos_de_coluna_numerica():
+    centavos, _ = normalizar_valores(pd.Series([0.5, -0.5, 12.34, np.nan]), centavos=True)
+    assert centavos.tolist() == [50, -50, 1234, 0]
+
+def test_centavos_de_float_iguais_ao_texto():
+    # O float de '1,005' é 1.00499999...: float * 100 arredondado daria 100
+    textos = ['1,005', '2,675', '-1,005', '0,125', '1.234,565', '1.000.000.000,005', '12,34', '-0,00']
+    esperados, _ = normalizar_valores(pd.Series(textos, dtype=object), centavos=True)
+    floats, _ = normalizar_valores(pd.Series(textos, dtype=object))
+    assert centavos_de_float(floats).astype('int64').tolist() == esperados.tolist()
+    assert normalizar_valores(floats, centavos=True)[0].tolist() == esperados.tolist()
+    assert np.isnan(centavos_de_float([np.nan])[0])
+
+def test_carga_compacta_usa_centavos_exatos():
+    import sqlite3
+    from db_loader import _lote_compacto
+    cursor = sqlite3.connect(':memory:').cursor()
+    cursor.execute("CREATE TABLE descricoes (id INTEGER PRIMARY KEY, descricao TEXT UNIQUE)")
+    lote = pd.DataFrame({'REG_ANS': ['1', '2', '3'], 'TRIMESTRE': '1T2025', 'DESCRICAO': 'EVENTOS',
+                         'VALOR_DESPESA': [1.005, -2.675, np.nan]})
+    linhas = _lote_compacto(lote, {}, cursor)
+    assert linhas['valor_centavos'].tolist() == [101, -268, pd.NA]
@@ -0,0 +1,69 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import db_loader
+from aggregator import gerar_agregacao
+from analytics_queries import planos_de_execucao, queries_do_banco, varreduras_completas
+from colunar import tipos_consolidado
+from consultas import PARAMETROS
+from processor import COLUNAS_SAIDA
+from schema import remover_indices, schema_compacto
+
+TRIMESTRES = [('2024', '4T2024'), ('2025', '1T2025'), ('2025', '2T2025'), ('2025', '3T2025')]
+UFS = ['SP', 'RJ', 'MG', 'RS', 'PR']
+OPERADORAS = 300
+LINHAS_POR_TRIMESTRE = 3000
+
+
+def _consolidado():
+    rng = np.random.default_rng(7)
+    partes = []
+    for ano, tri in TRIMESTRES:
+        reg = rng.integers(100000, 100000 + OPERADORAS, LINHAS_POR_TRIMESTRE)
+        partes.append(pd.DataFrame({
+            'REG_ANS': reg.astype(str),
+            'CNPJ': [f"{r:014d}" for r in reg],
+            'RAZAO_SOCIAL': [f"OPERADORA {r}" for r in reg],
+            'UF': [UFS[r % len(UFS)] for r in reg],
+            'MODALIDADE': 'Medicina de Grupo',
+            'TRIMESTRE': tri,
+            'ANO': ano,
+            'VALOR_DESPESA': rng.integers(1, 10**7, LINHAS_POR_TRIMESTRE) / 100,
+            'DESCRICAO': 'EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS',
+        }, columns=COLUNAS_SAIDA))
+    return tipos_consolidado(pd.concat(partes, ignore_index=True))
+
+
+@pytest.fixture(params=[False, True], ids=['normal', 'compacto'])
+def banco(request, tmp_path, monkeypatch):
+    """Banco carregado pelo db_loader (esquema normal ou compacto) em tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    consolidado = _consolidado()
+    agregado = gerar_agregacao(consolidado=consolidado, exportar=False)
+    db_loader.setup_database(request.param)
+    db_loader.import_data_rapido(consolidado=consolidado, agregado=agregado)
+    conn = sqlite3.connect(db_loader.DB_PATH)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('ufs', [None, ['SP', 'RJ']], ids=['todas', 'com_uf'])
+def test_relatorios_sem_full_scan(banco, ufs):
+    parametros = {nome: {'ufs': ufs} for nome in PARAMETROS} if ufs else None
+    queries = queries_do_banco(banco, parametros)
+    planos = planos_de_execucao(banco, parametros)
+    assert set(planos) == set(PARAMETROS)
+    for nome, plano in planos.items():
+        assert plano
+        assert varreduras_completas(queries[nome][0], plano) == [], nome
+
+
+def test_sem_indices_acusa_full_scan(banco):
+    # Garante que a verificação acima falharia se os índices sumissem
+    remover_indices(banco.cursor(), schema_compacto(banco.cursor()))
+    queries = queries_do_banco(banco)
+    planos = planos_de_execucao(banco)
+    assert any(varreduras_completas(queries[nome][0], plano) for nome, plano in planos.items())
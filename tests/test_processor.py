@@ -0,0 +1,41 @@
+import os
+import zipfile
+
+import processor
+
+CSV_TRIMESTRE = ('DATA;REG_ANS;CD_CONTA_CONTABIL;DESCRICAO;VL_SALDO_INICIAL;VL_SALDO_FINAL\n'
+                 '2025-01-01;123456;411111;"EVENTOS/ SINISTROS CONHECIDOS";0;1.234,56\n'
+                 '2025-01-01;123456;311111;"CONTRAPRESTAÇÕES EFETIVAS";0;10,00\n')
+
+
+def _zip_trimestre(tmp_path, membros):
+    pasta = tmp_path / processor.RAW_DIR / '2025_1T2025'
+    pasta.mkdir(parents=True)
+    with zipfile.ZipFile(pasta / '1T2025.zip', 'w') as z:
+        for nome, conteudo in membros.items():
+            z.writestr(nome, conteudo)
+    return '2025_1T2025'
+
+
+def test_membros_csv_ignora_subpastas_e_ocultos(tmp_path):
+    caminho = tmp_path / 'a.zip'
+    with zipfile.ZipFile(caminho, 'w') as z:
+        for nome in ['1T2025.csv', 'B.CSV', '__MACOSX/', '__MACOSX/._1T2025.csv', '._1T2025.csv',
+                     'sub/outro.csv', 'leiame.txt']:
+            z.writestr(nome, '')
+    with zipfile.ZipFile(caminho) as z:
+        assert processor.membros_csv(z) == ['1T2025.csv', 'B.CSV']
+
+
+def test_trimestre_com_lixo_do_macos_no_zip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Resource fork do macOS: binário, sem as colunas do demonstrativo
+    pasta = _zip_trimestre(tmp_path, {'1T2025.csv': CSV_TRIMESTRE,
+                                      '__MACOSX/._1T2025.csv': b'\x00\x05\x16\x07' + b'\x00' * 60,
+                                      '._1T2025.csv': b'\x00\x05\x16\x07'})
+    resultado = processor.processar_trimestre(pasta, processor.tabela_operadoras_vazia(), gravar=False)
+    assert 'erro' not in resultado
+    assert resultado['linhas'] == 1
+    assert list(resultado['filtro']) == ['1T2025.csv']
+    assert resultado['df']['VALOR_DESPESA'].tolist() == [1234.56]
+    assert not os.path.exists(processor.PARCIAIS_DIR)